@@ -4,17 +4,25 @@
 # application routes including authentication, dashboard, exercise search API
 # integration, saved exercises management, and health check endpoints.
 
-from flask import Flask, render_template, request, redirect, session, url_for, flash
+from flask import (
+    Flask, Response, render_template, request, redirect, session, url_for, flash,
+    stream_with_context,
+)
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.exc import OperationalError
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime
 import time
 import os
-import requests
 
-# Initialize SQLAlchemy globally
-db = SQLAlchemy()
+from .database import RoutingSession, engine_options, replica_binds, replica_router
+
+# Initialize SQLAlchemy globally (reads may go to a replica, see app/database.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+from .metrics import StartupTimer, metrics  # noqa: E402
+from .admission import admission  # noqa: E402
+from .profiling import profiler  # noqa: E402
 
 
 # Attempts to connect to the MySQL database multiple times before failing.
@@ -32,11 +40,20 @@ def connect_with_retry(app, retries=10, delay=3):
     raise RuntimeError("Could not connect to database after several attempts.")
 
 
+# Called in each Gunicorn worker after fork when the app is preloaded
+# (see gunicorn.conf.py): connections opened by the master must not be shared.
+def reset_after_fork(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
 # Summary: Application Factory
 # Description:
 # Creates the Flask application instance, configures database settings,
 # initializes SQLAlchemy, creates tables, and registers all routes.
 def create_app():
+    timer = StartupTimer()
     app = Flask(__name__)
     app.secret_key = os.environ.get("SECRET_KEY", "super-secret-key")
 
@@ -46,7 +63,10 @@ def create_app():
     db_host = os.environ.get("DB_HOST", "shviki-fitness-mysql")
     db_name = os.environ.get("DB_NAME", "shviki_db")
 
-    if db_user and db_pass and db_host and db_name:
+    if os.environ.get("SQLALCHEMY_DATABASE_URI"):
+        # Full URI override (docker-compose, benchmarks)
+        app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["SQLALCHEMY_DATABASE_URI"]
+    elif db_user and db_pass and db_host and db_name:
         app.config["SQLALCHEMY_DATABASE_URI"] = (
             f"mysql+pymysql://{db_user}:{db_pass}@{db_host}:3306/{db_name}"
         )
@@ -55,20 +75,182 @@ def create_app():
         app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///shviki.db"
 
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-        "pool_pre_ping": True,
-        "pool_recycle": 280,
-        "pool_size": 5,
-        "max_overflow": 10,
+    # "create": wait for MySQL and create missing tables at boot (local/dev default)
+    # "lazy":   no DB I/O at boot; schema is managed by `flask db-upgrade` (app/migrations.py)
+    app.config["DB_STARTUP_MODE"] = os.environ.get("DB_STARTUP_MODE", "create")
+    app.config["HEALTH_CACHE_SECONDS"] = float(os.environ.get("HEALTH_CACHE_SECONDS", 5))
+    app.config["HEALTH_POOL_SATURATION"] = float(os.environ.get("HEALTH_POOL_SATURATION", 0.9))
+    app.config["BULK_HASH_WORKERS"] = int(os.environ.get("BULK_HASH_WORKERS", 2))
+    # Members deleted/deactivated per transaction by admin mass actions
+    app.config["BULK_PURGE_CHUNK_SIZE"] = int(os.environ.get("BULK_PURGE_CHUNK_SIZE", 500))
+
+    # --------- Session Configuration --------- #
+    # "cookie" (signed cookie), "memory" or "database" (server-side, revocable); see app/sessions.py
+    app.config["SESSION_BACKEND"] = os.environ.get("SESSION_BACKEND", "cookie")
+    app.config["SESSION_TTL"] = int(os.environ.get("SESSION_TTL", 7 * 86400))
+    app.config["SESSION_TOUCH_SECONDS"] = int(os.environ.get("SESSION_TOUCH_SECONDS", 300))
+    app.config["SESSION_LOCAL_TTL"] = float(os.environ.get("SESSION_LOCAL_TTL", 300))
+    app.config["SESSION_REVOCATION_POLL"] = float(os.environ.get("SESSION_REVOCATION_POLL", 2))
+    app.config["SESSION_MAX_ENTRIES"] = int(os.environ.get("SESSION_MAX_ENTRIES", 10000))
+
+    # --------- Password Hashing Configuration --------- #
+    app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    app.config["PASSWORD_HASH_MAX_QUEUE"] = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", 8))
+    app.config["PASSWORD_HASH_TIMEOUT"] = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+
+    # --------- Serving Mode --------- #
+    # "sync" or "gevent"; must match the Gunicorn worker class (see gunicorn.conf.py)
+    app.config["SERVING_MODE"] = os.environ.get("SERVING_MODE", "sync")
+    cooperative = app.config["SERVING_MODE"] == "gevent"
+
+    # --------- Connection Pools and Read Replicas --------- #
+    # Pool sizes per worker model, optionally capped by DB_CONNECTION_BUDGET / DB_POOL_PROCESSES
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(os.environ, app.config["SERVING_MODE"])
+    # DB_REPLICA_HOSTS (or DB_REPLICA_URIS) adds replica binds for read-only endpoints
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(os.environ, db_user, db_pass, db_name)
+    app.config["DB_REPLICA_STICKY_SECONDS"] = float(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+
+    # --------- Exercise API Configuration --------- #
+    app.config["EXERCISE_API_URL"] = os.environ.get(
+        "EXERCISE_API_URL", "https://exercisedb.p.rapidapi.com"
+    )
+    app.config["EXERCISE_API_HEADERS"] = {
+        "x-rapidapi-key": os.environ.get("EXERCISE_API_KEY"),
+        "x-rapidapi-host": os.environ.get("EXERCISE_API_HOST"),
     }
+    app.config["EXERCISE_API_CONNECT_TIMEOUT"] = float(os.environ.get("EXERCISE_API_CONNECT_TIMEOUT", 3.05))
+    app.config["EXERCISE_API_READ_TIMEOUT"] = float(os.environ.get("EXERCISE_API_READ_TIMEOUT", 10))
+    app.config["EXERCISE_API_SEARCH_TIMEOUT"] = float(os.environ.get("EXERCISE_API_SEARCH_TIMEOUT", 15))
+    app.config["EXERCISE_API_RETRIES"] = int(os.environ.get("EXERCISE_API_RETRIES", 2))
+    app.config["EXERCISE_API_BACKOFF"] = float(os.environ.get("EXERCISE_API_BACKOFF", 0.3))
+    app.config["EXERCISE_API_POOL_SIZE"] = int(
+        os.environ.get("EXERCISE_API_POOL_SIZE", 100 if cooperative else 10)
+    )
+    # Upstream protection (app/upstream.py); a rate limit of 0 disables the quota bucket
+    app.config["EXERCISE_API_BREAKER_FAILURES"] = int(os.environ.get("EXERCISE_API_BREAKER_FAILURES", 5))
+    app.config["EXERCISE_API_BREAKER_RESET"] = float(os.environ.get("EXERCISE_API_BREAKER_RESET", 30))
+    app.config["EXERCISE_API_RATE_LIMIT"] = float(os.environ.get("EXERCISE_API_RATE_LIMIT", 0))
+    app.config["EXERCISE_API_RATE_BURST"] = int(os.environ.get("EXERCISE_API_RATE_BURST", 10))
+    app.config["EXERCISE_API_RATE_BACKEND"] = os.environ.get("EXERCISE_API_RATE_BACKEND", "database")
+    app.config["EXERCISE_CATALOG_REFRESH_SECONDS"] = int(
+        os.environ.get("EXERCISE_CATALOG_REFRESH_SECONDS", 300)
+    )
+
+    # --------- Exercise Cache Configuration --------- #
+    app.config["EXERCISE_CACHE_BACKEND"] = os.environ.get("EXERCISE_CACHE_BACKEND", "memory")
+    app.config["EXERCISE_CACHE_MAX_ENTRIES"] = int(os.environ.get("EXERCISE_CACHE_MAX_ENTRIES", 1024))
+    app.config["EXERCISE_CACHE_TTL"] = int(os.environ.get("EXERCISE_CACHE_TTL", 3600))
+    app.config["EXERCISE_CACHE_STALE_TTL"] = int(os.environ.get("EXERCISE_CACHE_STALE_TTL", 86400))
+    app.config["EXERCISE_CACHE_NEGATIVE_TTL"] = int(os.environ.get("EXERCISE_CACHE_NEGATIVE_TTL", 300))
+
+    # --------- Rendering Configuration --------- #
+    # Rendered search-result cards kept per worker (app/rendering.py)
+    app.config["RENDER_FRAGMENT_CACHE_SIZE"] = int(os.environ.get("RENDER_FRAGMENT_CACHE_SIZE", 4096))
+
+    # --------- Media Cache Configuration --------- #
+    # Proxied exercise GIFs (app/media.py); empty MEDIA_CACHE_DIR means <instance>/media
+    app.config["MEDIA_CACHE_DIR"] = os.environ.get("MEDIA_CACHE_DIR", "")
+    app.config["MEDIA_CACHE_MAX_BYTES"] = int(os.environ.get("MEDIA_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+    app.config["MEDIA_MAX_ITEM_BYTES"] = int(os.environ.get("MEDIA_MAX_ITEM_BYTES", 5 * 1024 * 1024))
+    app.config["MEDIA_MAX_AGE"] = int(os.environ.get("MEDIA_MAX_AGE", 7 * 86400))
+    app.config["MEDIA_THUMBNAIL_SIZE"] = int(os.environ.get("MEDIA_THUMBNAIL_SIZE", 180))
+
+    # --------- Profiling Configuration --------- #
+    # Admins profile a request with `X-Profile: 1` or `?_profile=1`; see app/profiling.py
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    app.config["PROFILE_SLOW_SECONDS"] = float(os.environ.get("PROFILE_SLOW_SECONDS", 1.0))
+    app.config["PROFILE_BUFFER_SIZE"] = int(os.environ.get("PROFILE_BUFFER_SIZE", 50))
+    app.config["PROFILE_SAMPLE_INTERVAL"] = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+    app.config["PROFILE_MAX_QUERIES"] = int(os.environ.get("PROFILE_MAX_QUERIES", 200))
+    # "sample" (stack sampler thread) or "cprofile"; empty picks cProfile under gevent
+    app.config["PROFILE_MODE"] = os.environ.get("PROFILE_MODE", "")
+
+    # --------- JSON API Configuration --------- #
+    # /api/v1 bodies smaller than this go out uncompressed (app/api.py)
+    app.config["API_COMPRESS_MIN_BYTES"] = int(os.environ.get("API_COMPRESS_MIN_BYTES", 1024))
+    app.config["API_GZIP_LEVEL"] = int(os.environ.get("API_GZIP_LEVEL", 6))
+    app.config["API_BROTLI_QUALITY"] = int(os.environ.get("API_BROTLI_QUALITY", 5))
+    app.config["API_COMPRESSED_CACHE_SIZE"] = int(os.environ.get("API_COMPRESSED_CACHE_SIZE", 256))
+
+    # --------- Admission Control Configuration --------- #
+    # Per-route-class concurrency caps with a short queue, then 503 (app/admission.py).
+    # Empty ADMISSION_LIMITS / ADMISSION_BACKEND pick defaults for SERVING_MODE and WEB_CONCURRENCY.
+    app.config["ADMISSION_ENABLED"] = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+    app.config["ADMISSION_BACKEND"] = os.environ.get("ADMISSION_BACKEND", "")
+    app.config["ADMISSION_LIMITS"] = os.environ.get("ADMISSION_LIMITS", "")
+    if os.environ.get("ADMISSION_TOTAL_LIMIT"):
+        app.config["ADMISSION_TOTAL_LIMIT"] = int(os.environ["ADMISSION_TOTAL_LIMIT"])
+    app.config["ADMISSION_QUEUE_SIZE"] = int(os.environ.get("ADMISSION_QUEUE_SIZE", 8))
+    app.config["ADMISSION_QUEUE_TIMEOUT"] = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 0.5))
+    app.config["ADMISSION_RETRY_AFTER"] = int(os.environ.get("ADMISSION_RETRY_AFTER", 2))
+    app.config["ADMISSION_USER_RATES"] = os.environ.get("ADMISSION_USER_RATES", "search=120/60,auth=20/60")
+    app.config["ADMISSION_STATE_FILE"] = os.environ.get("ADMISSION_STATE_FILE", "")
+    app.config["WEB_CONCURRENCY"] = int(os.environ.get("WEB_CONCURRENCY", 2))
+
+    # --------- Reverse Proxy --------- #
+    # Proxies in front of the app (load balancer, ingress) that set X-Forwarded-For/-Proto;
+    # 0 trusts none, so request.remote_addr stays the direct peer
+    app.config["PROXY_FIX_HOPS"] = int(os.environ.get("PROXY_FIX_HOPS", 0))
+    if app.config["PROXY_FIX_HOPS"]:
+        hops = app.config["PROXY_FIX_HOPS"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    timer.mark("config")
 
     # Initialize database with app context
     db.init_app(app)
-
-    from .models import User, UserExercise
-    with app.app_context():
-        connect_with_retry(app)
-        db.create_all()
+    replica_router.init_app(app)
+    metrics.init_app(app, db)
+    admission.init_app(app)
+    profiler.init_app(app, db)
+
+    from .models import User
+    from .member_queries import count_members, member_page, parse_member_filters
+    from .saved_exercises import MAX_BATCH, delete_many, delete_saved, save_for_user, save_many, saved_page
+    from .plans import DAYS, parse_plan_fields, plan_by_day, plan_summary, update_plan_entry
+    from . import bulk
+    from .passwords import password_hasher
+    from .catalog import exercise_catalog
+    from .cache import exercise_cache
+    from .exercise_api import exercise_api
+    from .health import health_checks
+    from . import migrations
+    from . import sessions
+    from . import analytics
+    from . import schedule
+    from .media import media_cache
+    from .api import api_encoder, search_exercises
+    from .rendering import conditional, fragment_cache, not_modified, page_etag, render_page
+    exercise_catalog.init_app(app)
+    exercise_cache.init_app(app)
+    exercise_api.init_app(app)
+    bulk.init_app(app)
+    password_hasher.init_app(app)
+    health_checks.init_app(app)
+    migrations.init_app(app)
+    sessions.init_app(app)
+    analytics.init_app(app)
+    fragment_cache.init_app(app)
+    media_cache.init_app(app)
+    schedule.timetable.init_app(app)
+    api_encoder.init_app(app)
+    timer.mark("extensions")
+
+    if app.config["DB_STARTUP_MODE"] == "create":
+        with app.app_context():
+            connect_with_retry(app)
+            db.create_all()
+            with db.engine.begin() as conn:
+                schedule.seed_default_classes(conn)
+                # create_all() leaves the rollups empty; the dashboard total reads them
+                analytics.ensure_built(conn)
+    elif app.config["DB_STARTUP_MODE"] == "lazy":
+        # Readiness stays false until the migrations have been applied
+        app.extensions["schema_pending"] = True
+    else:
+        raise RuntimeError(f"Unknown DB_STARTUP_MODE: {app.config['DB_STARTUP_MODE']}")
+    timer.mark("schema")
 
     # ---------------- ROUTES ---------------- #
 
@@ -93,7 +275,7 @@ def create_app():
                 last_name=request.form["last_name"],
                 national_id=request.form["national_id"],
                 email=request.form["email"],
-                password_hash=generate_password_hash(request.form["password"]),
+                password_hash=password_hasher.hash(request.form["password"]),
                 age=int(request.form["age"]),
                 gender=request.form["gender"],
                 subscription=request.form["subscription"],
@@ -111,7 +293,11 @@ def create_app():
     def login():
         if request.method == "POST":
             user = User.query.filter_by(email=request.form["email"]).first()
-            if user and check_password_hash(user.password_hash, request.form["password"]):
+            if user and password_hasher.check(user, request.form["password"]):
+                db.session.commit()  # persists an upgraded hash, if any
+                if not user.active:
+                    flash("This account has been deactivated.", "danger")
+                    return render_template("login.html")
                 session["user_id"] = user.id
                 session["role"] = user.role
                 return redirect(url_for("dashboard" if user.role == "admin" else "user_home"))
@@ -126,30 +312,8 @@ def create_app():
             flash("Please log in first.", "danger")
             return redirect(url_for("login"))
 
-        # Sample class list (static)
-        classes = [
-            {
-                "name": "HIIT 45",
-                "description": "High-intensity cardio intervals.",
-                "days": "Sun, Tue, Thu",
-                "time": "18:00",
-                "duration": "45m",
-                "level": "All",
-                "coach": "Dana",
-                "room": "A",
-            },
-            {
-                "name": "Barbell Basics",
-                "description": "Learn squat, bench, and deadlift safely.",
-                "days": "Mon, Wed",
-                "time": "19:30",
-                "duration": "60m",
-                "level": "Beginner",
-                "coach": "Yair",
-                "room": "B",
-            },
-        ]
-        return render_template("user_home.html", classes=classes)
+        # Timetable from memory; one query each for seat counts and the member's bookings
+        return render_template("user_home.html", classes=schedule.upcoming(session["user_id"]))
 
     # --------- Admin Dashboard --------- #
     @app.route("/dashboard")
@@ -161,8 +325,33 @@ def create_app():
             flash("Access denied.", "danger")
             return redirect(url_for("user_home"))
 
-        users = User.query.all()
-        return render_template("dashboard.html", users=users)
+        filters = parse_member_filters(request.args)
+        sort = request.args.get("sort", "id")
+        order = request.args.get("order", "asc")
+        users, next_cursor = member_page(
+            filters,
+            sort=sort,
+            order=order,
+            after=request.args.get("after"),
+            per_page=request.args.get("per_page", type=int),
+        )
+        # Unfiltered total comes from the analytics rollup instead of COUNT(*)
+        total = None if any(filters.values()) else analytics.total_members()
+        if total is None:
+            total = count_members(filters)
+
+        # Query args without the cursor, reused by the pager links
+        page_args = {k: v for k, v in request.args.items() if k != "after"}
+        return render_page(
+            "dashboard.html",
+            users=users,
+            total=total,
+            filters=request.args,
+            sort=sort,
+            order=order,
+            next_cursor=next_cursor,
+            page_args=page_args,
+        )
 
     # --------- Admin: Edit User --------- #
     @app.route("/admin/edit_user/<int:user_id>", methods=["GET", "POST"])
@@ -180,8 +369,12 @@ def create_app():
             user_to_edit.age = int(request.form["age"])
             user_to_edit.gender = request.form["gender"]
             user_to_edit.subscription = request.form["subscription"]
+            role_changed = user_to_edit.role != request.form["role"]
             user_to_edit.role = request.form["role"]
             db.session.commit()
+            if role_changed:
+                # Sessions carry the role; make the member sign in again
+                sessions.revoke_user(user_to_edit.id)
             flash(f"User {user_to_edit.email} has been updated.", "success")
             return redirect(url_for("dashboard"))
 
@@ -207,7 +400,7 @@ def create_app():
                 last_name=request.form["last_name"],
                 national_id=request.form["national_id"],
                 email=request.form["email"],
-                password_hash=generate_password_hash(request.form["password"]),
+                password_hash=password_hasher.hash(request.form["password"]),
                 age=int(request.form["age"]),
                 gender=request.form["gender"],
                 subscription=request.form["subscription"],
@@ -220,6 +413,49 @@ def create_app():
 
         return render_template("create_user.html")
 
+    # --------- Admin: Bulk Import Users --------- #
+    @app.route("/admin/import_users", methods=["GET", "POST"])
+    def import_users():
+        if session.get("role") != "admin":
+            flash("Access denied.", "danger")
+            return redirect(url_for("user_home"))
+
+        report = None
+        if request.method == "POST":
+            upload = request.files.get("file")
+            if not upload or not upload.filename:
+                flash("Choose a CSV or JSONL file to import.", "danger")
+                return redirect(url_for("import_users"))
+
+            fmt = request.form.get("format") or bulk.detect_format(upload.filename)
+            report = bulk.import_users(
+                bulk.read_rows(upload.stream, fmt),
+                hash_workers=app.config["BULK_HASH_WORKERS"],
+                hash_method=password_hasher.method,
+            )
+            flash(
+                f"Imported {report['created']} of {report['rows']} rows "
+                f"({len(report['errors'])} rejected).",
+                "success" if not report["errors"] else "warning",
+            )
+
+        return render_template("import_users.html", report=report)
+
+    # --------- Admin: Export Users (streamed) --------- #
+    @app.route("/admin/export_users")
+    def export_users():
+        if session.get("role") != "admin":
+            flash("Access denied.", "danger")
+            return redirect(url_for("user_home"))
+
+        fmt = "jsonl" if request.args.get("format") == "jsonl" else "csv"
+        filters = parse_member_filters(request.args)
+        return Response(
+            stream_with_context(bulk.export_members(fmt, filters)),
+            mimetype="application/x-ndjson" if fmt == "jsonl" else "text/csv",
+            headers={"Content-Disposition": f"attachment; filename=members.{fmt}"},
+        )
+
     # --------- Admin: Delete User --------- #
     @app.route("/admin/delete_user/<int:user_id>", methods=["POST"])
     def delete_user(user_id):
@@ -227,13 +463,43 @@ def create_app():
             flash("Access denied.", "danger")
             return redirect(url_for("user_home"))
 
-        user = User.query.get_or_404(user_id)
-        db.session.delete(user)
+        User.query.get_or_404(user_id)
+        # Set-based: saved exercises and plan rows go by ON DELETE CASCADE, unloaded
+        bulk.delete_members([user_id])
         db.session.commit()
+        sessions.revoke_user(user_id)
         flash("User deleted.", "info")
 
         return redirect(url_for("dashboard"))
 
+    # --------- Admin: Mass Delete / Deactivate --------- #
+    @app.route("/admin/users/bulk", methods=["POST"])
+    def bulk_users():
+        if session.get("role") != "admin":
+            flash("Access denied.", "danger")
+            return redirect(url_for("user_home"))
+
+        action = request.form.get("action")
+        if request.form.get("scope") == "filtered":
+            # Every member matching the dashboard filters, not just this page
+            filters, user_ids = parse_member_filters(request.form), None
+        else:
+            filters, user_ids = {}, request.form.getlist("user_ids", type=int)
+        try:
+            if user_ids == []:
+                raise ValueError("select members or set a filter first")
+            changed = bulk.purge_members(
+                action, filters, user_ids,
+                keep_ids=[session["user_id"]],
+                chunk_size=app.config["BULK_PURGE_CHUNK_SIZE"],
+            )
+        except ValueError as exc:
+            flash(f"Nothing changed: {exc}.", "danger")
+            return redirect(url_for("dashboard"))
+
+        flash(f"{changed} member(s) {'deleted' if action == 'delete' else 'deactivated'}.", "info")
+        return redirect(url_for("dashboard"))
+
     # --------- Logout --------- #
     @app.route("/logout")
     def logout():
@@ -241,12 +507,6 @@ def create_app():
         return redirect(url_for("index"))
 
     # --------- Exercise API Integration --------- #
-    EXERCISE_API_URL = "https://exercisedb.p.rapidapi.com"
-    EXERCISE_HEADERS = {
-        "x-rapidapi-key": os.environ.get("EXERCISE_API_KEY"),
-        "x-rapidapi-host": os.environ.get("EXERCISE_API_HOST"),
-    }
-
     @app.route("/exercises", methods=["GET", "POST"])
     def exercises():
         if "user_id" not in session:
@@ -256,37 +516,33 @@ def create_app():
         exercise_list = []
         selected = None
 
-        # Handle search queries
-        if request.method == "POST":
-            query = request.form.get("muscle") or request.form.get("body_part")
-            if query:
-                selected = query
-                normalized = query.lower().replace(" ", "-").replace("_", "-")
-
-                # Try multiple API endpoints for best match
-                endpoints = [
-                    f"/exercises/name/{normalized}",
-                    f"/exercises/bodyPart/{normalized}",
-                    f"/exercises/target/{normalized}",
-                ]
-
-                for endpoint in endpoints:
-                    response = requests.get(EXERCISE_API_URL + endpoint, headers=EXERCISE_HEADERS)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if isinstance(data, list) and data:
-                            # Add Google search links to each result
-                            for ex in data:
-                                search_query = ex.get("name", "").replace(" ", "+")
-                                ex["searchUrl"] = (
-                                    f"https://www.google.com/search?q={search_query}+exercise"
-                                )
-                            exercise_list = data
-                            break
-                    else:
-                        print(f"[WARN] API returned {response.status_code} for {endpoint}")
-
-        return render_template("exercises.html", exercises=exercise_list, selected=selected)
+        # Handle search queries (GET keeps results cacheable; POST is still accepted)
+        query = request.values.get("muscle") or request.values.get("body_part")
+        if query:
+            selected = query
+            # Answer from the local catalog first; the API endpoints are probed in parallel as a fallback
+            exercise_list = search_exercises(query)
+
+        etag = page_etag("exercises", selected, [ex["cardKey"] for ex in exercise_list])
+        if request.method == "GET" and not_modified(etag):
+            return conditional(Response(status=304), etag)
+        return conditional(
+            render_page("exercises.html", exercises=exercise_list, selected=selected), etag
+        )
+
+    # --------- Exercise Autocomplete --------- #
+    @app.route("/exercises/suggest")
+    def exercise_suggest():
+        if "user_id" not in session:
+            return {"error": "login required"}, 401
+
+        prefix = request.args.get("q", "")[:100]
+        limit = max(1, min(request.args.get("limit", 10, type=int), 25))
+        exercise_catalog.ensure_loaded()
+        return {"suggestions": [
+            {"id": ex["id"], "name": ex.get("name"), "target": ex.get("target")}
+            for ex in exercise_catalog.suggest(prefix, limit)
+        ]}, 200
 
     # --------- Save Exercise --------- #
     @app.route("/save_exercise/<exercise_id>", methods=["POST"])
@@ -295,16 +551,14 @@ def create_app():
             flash("Please log in to save exercises", "danger")
             return redirect(url_for("login"))
 
-        ex = UserExercise(
-            user_id=session["user_id"],
-            exercise_id=exercise_id,
+        save_for_user(
+            session["user_id"],
+            exercise_id,
             exercise_name=request.form.get("name"),
             target=request.form.get("target"),
             equipment=request.form.get("equipment"),
             gif_url=request.form.get("gifUrl"),
         )
-        db.session.add(ex)
-        db.session.commit()
 
         flash("Exercise saved to your plan.", "success")
         return redirect(url_for("exercises"))
@@ -315,11 +569,22 @@ def create_app():
         if "user_id" not in session:
             return redirect(url_for("login"))
 
-        saved_exercises = UserExercise.query.filter_by(
-            user_id=session["user_id"]
-        ).all()
+        saved_exercises, next_cursor = saved_page(
+            session["user_id"],
+            after=request.args.get("after"),
+            per_page=request.args.get("per_page", type=int),
+        )
 
-        return render_template("my_exercises.html", exercises=saved_exercises)
+        etag = page_etag("my_exercises", request.args.get("after"), next_cursor, [
+            (ex.id, ex.exercise_name, ex.target, ex.equipment, ex.created_at) for ex in saved_exercises
+        ])
+        last_modified = max((ex.created_at for ex in saved_exercises if ex.created_at), default=None)
+        if not_modified(etag, last_modified):
+            return conditional(Response(status=304), etag, last_modified)
+        return conditional(
+            render_page("my_exercises.html", exercises=saved_exercises, next_cursor=next_cursor),
+            etag, last_modified,
+        )
 
     # --------- Delete Exercise --------- #
     @app.route("/delete_exercise/<int:exercise_id>", methods=["POST"])
@@ -327,20 +592,96 @@ def create_app():
         if "user_id" not in session:
             return redirect(url_for("login"))
 
-        ex = UserExercise.query.filter_by(
-            id=exercise_id, user_id=session["user_id"]
-        ).first()
-
-        if ex:
-            db.session.delete(ex)
-            db.session.commit()
+        if delete_saved(session["user_id"], exercise_id):
             flash("Exercise deleted.", "info")
 
         return redirect(url_for("my_exercises"))
 
+    # --------- Workout Plan --------- #
+    @app.route("/plan")
+    def plan():
+        if "user_id" not in session:
+            return redirect(url_for("login"))
+
+        return render_template(
+            "plan.html",
+            summary=plan_summary(session["user_id"]),
+            days=plan_by_day(session["user_id"]),
+            day_names=DAYS,
+        )
+
+    @app.route("/plan/<int:saved_id>", methods=["POST"])
+    def update_plan(saved_id):
+        if "user_id" not in session:
+            return redirect(url_for("login"))
+
+        try:
+            fields = parse_plan_fields(request.form)
+        except ValueError:
+            flash("Sets, reps and day must be numbers in range.", "danger")
+            return redirect(url_for("plan"))
+        if update_plan_entry(session["user_id"], saved_id, **fields):
+            flash("Plan updated.", "success")
+        return redirect(url_for("plan"))
+
+    # Batch endpoints: JSON bodies for API clients, form posts from My Exercises
+    @app.route("/plan/batch_save", methods=["POST"])
+    def plan_batch_save():
+        if "user_id" not in session:
+            return {"error": "login required"}, 401
+
+        payload = request.get_json(silent=True) or {}
+        entries = payload.get("exercises")
+        if not isinstance(entries, list) or not 0 < len(entries) <= MAX_BATCH:
+            return {"error": f"exercises must be a list of 1-{MAX_BATCH} items"}, 400
+        try:
+            # Accepts ExerciseDB-shaped results (id, name, gifUrl) as well as our own field names
+            rows = [dict(
+                parse_plan_fields(entry),
+                exercise_id=entry.get("exercise_id") or entry["id"],
+                exercise_name=entry.get("exercise_name") or entry["name"],
+                target=entry.get("target"),
+                equipment=entry.get("equipment"),
+                gif_url=entry.get("gif_url") or entry.get("gifUrl"),
+            ) for entry in entries]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return {"error": "each exercise needs an id and a name; sets/reps/day must be in range"}, 400
+
+        return {"saved": save_many(session["user_id"], rows)}, 200
+
+    @app.route("/plan/batch_delete", methods=["POST"])
+    def plan_batch_delete():
+        if "user_id" not in session:
+            return {"error": "login required"}, 401
+
+        payload = request.get_json(silent=True)
+        ids = payload.get("ids") if isinstance(payload, dict) else request.form.getlist("ids")
+        try:
+            if not isinstance(ids, list) or len(ids) > MAX_BATCH:
+                raise ValueError
+            removed = delete_many(session["user_id"], ids)
+        except (TypeError, ValueError):
+            return {"error": f"ids must be a list of up to {MAX_BATCH} saved exercise ids"}, 400
+
+        if payload is not None:
+            return {"removed": removed}, 200
+        flash(f"Removed {removed} exercise(s).", "info")
+        return redirect(url_for("my_exercises"))
+
+    # --------- Admin: Exercise Cache Stats --------- #
+    @app.route("/admin/cache_stats")
+    def cache_stats():
+        if session.get("role") != "admin":
+            return {"error": "forbidden"}, 403
+        return exercise_cache.snapshot(), 200
+
     # --------- Health Check Endpoint --------- #
+    # Kept for existing monitors; probes use /health/live and /health/ready (app/health.py)
     @app.route("/health")
     def health():
         return {"status": "ok"}, 200
 
+    timer.mark("routes")
+    timer.report()
+    app.extensions["startup"] = timer
     return app
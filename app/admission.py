@@ -0,0 +1,354 @@
+# Summary: Admission Control and Load Shedding
+# Description:
+# Keeps one slow kind of traffic from starving the rest. Every request is put
+# in a route class:
+#   - search: ExerciseDB searches and image downloads (slow upstream calls)
+#   - auth:   login, registration and admin member creation/import (hashing)
+#   - admin:  dashboard, /admin pages and /api/v1/admin
+#   - read:   everything else (member pages, saves, cheap JSON)
+# Each class has a concurrency cap. A request over the cap waits in a short
+# bounded queue (ADMISSION_QUEUE_SIZE waiters, ADMISSION_QUEUE_TIMEOUT
+# seconds) and is otherwise shed with 503 + Retry-After. Health probes,
+# /metrics and static files are never queued or shed.
+#
+# Slots are counted per pod for sync workers: each worker runs one request at
+# a time, so the caps only mean something across the workers. The counts live
+# in a small flock-protected file that the workers share. By default every
+# worker may take a request, but searches and admin pages get at most half of
+# them and sign-ins all but one, so no single slow class fills the pod.
+# Gevent workers count per process instead.
+#
+# Members (or, signed out, client addresses) are also held to per-class
+# request rates over an in-memory sliding window (ADMISSION_USER_RATES,
+# e.g. "auth=20/60"); going over answers 429 + Retry-After. Only form posts
+# count against the auth rate, not views of the sign-in pages. Client
+# addresses come from X-Forwarded-For when PROXY_FIX_HOPS is set (see
+# app/__init__.py), so clients behind the load balancer don't share a bucket.
+
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+from flask import g, request, session
+
+from .metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_SHED, ADMISSION_WAIT
+
+
+ROUTE_CLASSES = ("search", "auth", "admin", "read")
+BYPASS_ENDPOINTS = frozenset({"health", "health_live", "health_ready", "metrics", "static"})
+SEARCH_ENDPOINTS = frozenset({"exercises", "media", "api.exercises"})
+AUTH_ENDPOINTS = frozenset({"login", "register", "create_user", "import_users"})
+MAX_RATE_KEYS = 10000
+
+
+def route_class(endpoint, path):
+    """The route class of a request, or None for endpoints that are always admitted."""
+    if endpoint in BYPASS_ENDPOINTS:
+        return None
+    if endpoint in SEARCH_ENDPOINTS:
+        return "search"
+    if endpoint in AUTH_ENDPOINTS:
+        return "auth"
+    if endpoint == "dashboard" or path.startswith(("/admin/", "/api/v1/admin/")):
+        return "admin"
+    return "read"
+
+
+def default_limits(serving_mode, workers):
+    """({route class: concurrent requests}, total cap or 0) for a worker model."""
+    if serving_mode == "gevent":
+        # Per worker process, each serving hundreds of requests at once
+        return {"search": 100, "auth": 8, "admin": 10, "read": 200}, 0
+    # Per pod: every worker may take a request, but searches and admin pages only half of
+    # them and sign-ins all but one, so the other classes always have a worker left
+    workers = max(1, workers)
+    free = max(1, workers - 1)
+    half = max(1, workers // 2)
+    return {"search": half, "auth": free, "admin": half, "read": workers}, workers
+
+
+def _pairs(value):
+    for part in filter(None, (item.strip() for item in (value or "").split(","))):
+        name, _, spec = part.partition("=")
+        yield name.strip(), spec.strip()
+
+
+def parse_limits(value):
+    """"search=2,auth=4" -> {"search": 2, "auth": 4}."""
+    return {name: int(spec) for name, spec in _pairs(value)}
+
+
+def parse_rates(value):
+    """"auth=20/60" -> {"auth": (20, 60.0)}: at most 20 requests in any 60 seconds."""
+    rates = {}
+    for name, spec in _pairs(value):
+        count, _, window = spec.partition("/")
+        rates[name] = (int(count), float(window or 60))
+    return rates
+
+
+# ------------------------------
+# MemorySlots
+# Slot counts for the threads or greenlets of
+# one worker process.
+# ------------------------------
+class MemorySlots:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = Counter()
+        self._waiting = Counter()
+
+    def try_enter(self, cls, limit, total_limit=0):
+        with self._cond:
+            if self._active[cls] >= limit:
+                return False
+            if total_limit and sum(self._active.values()) >= total_limit:
+                return False
+            self._active[cls] += 1
+            return True
+
+    def leave(self, cls):
+        with self._cond:
+            self._active[cls] -= 1
+            self._cond.notify_all()
+
+    def enqueue(self, cls, max_waiting):
+        with self._cond:
+            if self._waiting[cls] >= max_waiting:
+                return False
+            self._waiting[cls] += 1
+            return True
+
+    def dequeue(self, cls):
+        with self._cond:
+            self._waiting[cls] -= 1
+
+    def wait(self, timeout):
+        with self._cond:
+            self._cond.wait(timeout)
+
+
+# ------------------------------
+# SharedSlots
+# Slot counts shared by the worker processes of
+# one pod through a flock-protected JSON file.
+# Entries are the holders' pids, so slots of a
+# worker that died are reclaimed.
+# ------------------------------
+class SharedSlots:
+    poll_interval = 0.02
+
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @contextmanager
+    def _state(self):
+        with open(self.path, "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                raw = fh.read()
+                state = json.loads(raw) if raw else {"active": {}, "waiting": {}}
+                alive = {}
+                for kind in ("active", "waiting"):
+                    for cls, pids in state[kind].items():
+                        state[kind][cls] = [
+                            pid for pid in pids if alive.setdefault(pid, self._alive(pid))
+                        ]
+                yield state
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps(state))
+                fh.flush()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def try_enter(self, cls, limit, total_limit=0):
+        with self._state() as state:
+            active = state["active"]
+            if len(active.get(cls, [])) >= limit:
+                return False
+            if total_limit and sum(len(pids) for pids in active.values()) >= total_limit:
+                return False
+            active.setdefault(cls, []).append(os.getpid())
+            return True
+
+    def leave(self, cls):
+        self._remove("active", cls)
+
+    def enqueue(self, cls, max_waiting):
+        with self._state() as state:
+            waiting = state["waiting"].setdefault(cls, [])
+            if len(waiting) >= max_waiting:
+                return False
+            waiting.append(os.getpid())
+            return True
+
+    def dequeue(self, cls):
+        self._remove("waiting", cls)
+
+    def _remove(self, kind, cls):
+        with self._state() as state:
+            pids = state[kind].get(cls, [])
+            if os.getpid() in pids:
+                pids.remove(os.getpid())
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.poll_interval))
+
+
+# ------------------------------
+# SlidingWindowLimiter
+# Per-identity request timestamps over the last
+# window seconds; least recently seen identities
+# are dropped beyond MAX_RATE_KEYS.
+# ------------------------------
+class SlidingWindowLimiter:
+    def __init__(self, rates=None, max_keys=MAX_RATE_KEYS):
+        self.rates = rates or {}
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, identity, cls, now=None):
+        """Count a request; returns 0 if it is allowed, else seconds until one will be."""
+        rate = self.rates.get(cls)
+        if rate is None:
+            return 0
+        limit, window = rate
+        now = time.monotonic() if now is None else now
+        key = (identity, cls)
+        with self._lock:
+            hits = self._hits.pop(key, None) or deque()
+            self._hits[key] = hits
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return hits[0] + window - now
+            hits.append(now)
+            if len(self._hits) > self.max_keys:
+                self._hits.popitem(last=False)
+            return 0
+
+
+# ------------------------------
+# AdmissionControl
+# Request hooks that admit, queue or shed each
+# request by route class.
+# ------------------------------
+class AdmissionControl:
+    def __init__(self):
+        self.enabled = True
+        self.limits, self.total_limit = default_limits("sync", 2)
+        self.queue_size = 8
+        self.queue_timeout = 0.5
+        self.retry_after = 2
+        self.store = MemorySlots()
+        self.rate_limiter = SlidingWindowLimiter()
+
+    def init_app(self, app):
+        """Read ADMISSION_* settings, pick the slot store and install the request hooks."""
+        serving_mode = app.config.get("SERVING_MODE", "sync")
+        limits, total_limit = default_limits(serving_mode, app.config.get("WEB_CONCURRENCY", 2))
+        limits.update(parse_limits(app.config.get("ADMISSION_LIMITS")))
+        self.limits = limits
+        configured_total = app.config.get("ADMISSION_TOTAL_LIMIT")
+        self.total_limit = total_limit if configured_total is None else configured_total
+        self.enabled = app.config.get("ADMISSION_ENABLED", True)
+        self.queue_size = app.config.get("ADMISSION_QUEUE_SIZE", self.queue_size)
+        self.queue_timeout = app.config.get("ADMISSION_QUEUE_TIMEOUT", self.queue_timeout)
+        self.retry_after = app.config.get("ADMISSION_RETRY_AFTER", self.retry_after)
+        self.rate_limiter = SlidingWindowLimiter(parse_rates(app.config.get("ADMISSION_USER_RATES")))
+
+        backend = app.config.get("ADMISSION_BACKEND") or ("memory" if serving_mode == "gevent" else "shared")
+        if backend == "shared":
+            # Workers forked from one master share the file (its pid is their parent)
+            path = app.config.get("ADMISSION_STATE_FILE") or os.path.join(
+                tempfile.gettempdir(), f"shviki-admission-{os.getppid()}.json"
+            )
+            self.store = SharedSlots(path)
+        elif backend == "memory":
+            self.store = MemorySlots()
+        else:
+            raise ValueError(f"Unknown ADMISSION_BACKEND: {backend}")
+
+        app.extensions["admission"] = self
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+
+    # ---------- Request Hooks ---------- #
+    def _before_request(self):
+        cls = route_class(request.endpoint, request.path)
+        if cls is None:
+            return None
+
+        if cls != "auth" or request.method == "POST":
+            identity = session.get("user_id") or f"ip:{request.remote_addr}"
+            wait = self.rate_limiter.hit(identity, cls)
+            if wait:
+                return self._shed(cls, "rate_limited", 429, wait)
+
+        limit = self.limits.get(cls, self.limits.get("read", 1))
+        if not self.store.try_enter(cls, limit, self.total_limit):
+            if not self.store.enqueue(cls, self.queue_size):
+                return self._shed(cls, "queue_full", 503, self.retry_after)
+            if not self._wait_for_slot(cls, limit):
+                return self._shed(cls, "timeout", 503, self.retry_after)
+
+        g.admission_class = cls
+        ADMISSION_IN_FLIGHT.inc(route_class=cls)
+        return None
+
+    def _wait_for_slot(self, cls, limit):
+        ADMISSION_QUEUE_DEPTH.inc(route_class=cls)
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.store.wait(remaining)
+                if self.store.try_enter(cls, limit, self.total_limit):
+                    return True
+        finally:
+            self.store.dequeue(cls)
+            ADMISSION_QUEUE_DEPTH.dec(route_class=cls)
+            ADMISSION_WAIT.observe(time.monotonic() - started, route_class=cls)
+
+    def _teardown_request(self, error=None):
+        cls = g.pop("admission_class", None) if g else None
+        if cls is not None:
+            self.store.leave(cls)
+            ADMISSION_IN_FLIGHT.dec(route_class=cls)
+
+    @staticmethod
+    def _shed(cls, reason, status, retry_after):
+        ADMISSION_SHED.inc(route_class=cls, reason=reason)
+        seconds = max(1, math.ceil(retry_after))
+        headers = {"Retry-After": str(seconds)}
+        if request.is_json or request.accept_mimetypes.best == "application/json":
+            error = "rate limited" if status == 429 else "overloaded"
+            return {"error": error, "retry_after": seconds}, status, headers
+        message = "Too many requests" if status == 429 else "The server is busy"
+        return f"{message}; please try again in {seconds} seconds.", status, headers
+
+
+admission = AdmissionControl()
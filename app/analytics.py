@@ -0,0 +1,341 @@
+# Summary: Materialized Admin Analytics
+# Description:
+# Membership statistics for the admin dashboard, kept in the
+# analytics_rollups table as (dimension, value) -> count rows:
+#   - members:      total member count (value "")
+#   - subscription, gender, role, age_band: member mix
+#   - signup_day:   members created per day (YYYY-MM-DD)
+#   - exercise:     how many members saved each exercise (label = name)
+# Counters move in the same transaction as the change that caused them:
+# ORM changes to users and saved exercises (register, create, edit, delete)
+# are picked up by SQLAlchemy flush events; Core bulk paths (bulk import,
+# saved-exercise upserts, set-based member deletes) call record() or
+# forget_members() themselves. `flask compact-analytics` rebuilds every
+# rollup from the source tables, fixing any drift and pruning old signup
+# days; run it periodically (see the Helm CronJob). The JSON
+# endpoints read only rollup rows, so they cost the same for any table size.
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import click
+from flask import request, session
+from sqlalchemy import delete, event, func, inspect, insert, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import AnalyticsRollup, User, UserExercise
+
+
+MEMBER_FIELDS = ("subscription", "gender", "role")
+MEMBER_DEFAULTS = {"role": "user"}
+AGE_BANDS = ((18, "<18"), (25, "18-24"), (35, "25-34"), (45, "35-44"), (55, "45-54"), (65, "55-64"))
+MAX_SIGNUP_DAYS = 366
+MAX_TOP_EXERCISES = 50
+
+
+# Age band label for an age ("unknown" when missing).
+def age_band(age):
+    if age is None:
+        return "unknown"
+    for upper, label in AGE_BANDS:
+        if age < upper:
+            return label
+    return "65+"
+
+
+def _value(value):
+    return str(value if value is not None else "")[:100]
+
+
+def member_keys(get):
+    """(dimension, value) keys counted for one member; `get(field)` reads a field."""
+    created = get("created_at") or datetime.utcnow()
+    keys = [("members", "")]
+    # role's column default is only applied at INSERT time
+    keys += [(field, _value(get(field) or MEMBER_DEFAULTS.get(field))) for field in MEMBER_FIELDS]
+    keys.append(("age_band", age_band(get("age"))))
+    keys.append(("signup_day", created.date().isoformat()))
+    return keys
+
+
+# ---------- Writing Counters ---------- #
+def _increment_statement(dialect, rows):
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as upsert
+        stmt = upsert(AnalyticsRollup).values(rows)
+        return stmt.on_duplicate_key_update(
+            count=AnalyticsRollup.count + stmt.inserted.count,
+            label=func.coalesce(stmt.inserted.label, AnalyticsRollup.label),
+            updated_at=stmt.inserted.updated_at,
+        )
+
+    from sqlalchemy.dialects.sqlite import insert as upsert
+    stmt = upsert(AnalyticsRollup).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["dimension", "value"],
+        set_={
+            "count": AnalyticsRollup.count + stmt.excluded.count,
+            "label": func.coalesce(stmt.excluded.label, AnalyticsRollup.label),
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def _rows(deltas, labels):
+    now = datetime.utcnow()
+    return [
+        {"dimension": dimension, "value": value, "count": delta,
+         "label": labels.get((dimension, value)), "updated_at": now}
+        for (dimension, value), delta in sorted(deltas.items()) if delta
+    ]
+
+
+def record(deltas, labels=None, connection=None):
+    """
+    Apply counter deltas {(dimension, value): +/-n} in the current
+    transaction; the caller commits. `labels` names exercise rows.
+    """
+    rows = _rows(deltas, labels or {})
+    if not rows:
+        return
+    conn = connection if connection is not None else db.session
+    dialect = conn.get_bind().dialect.name if connection is None else conn.dialect.name
+    conn.execute(_increment_statement(dialect, rows))
+
+
+def record_members(members, sign=1):
+    """Count plain member dicts (e.g. bulk-imported rows) in or out."""
+    deltas = Counter()
+    for values in members:
+        for key in member_keys(values.get):
+            deltas[key] += sign
+    record(deltas)
+
+
+def record_exercises(added=(), removed=()):
+    """Count saved exercises in or out; `added` holds (exercise_id, name) pairs."""
+    deltas = Counter()
+    labels = {}
+    for exercise_id, name in added:
+        deltas[("exercise", _value(exercise_id))] += 1
+        labels[("exercise", _value(exercise_id))] = (name or "")[:255] or None
+    for exercise_id in removed:
+        deltas[("exercise", _value(exercise_id))] -= 1
+    record(deltas, labels)
+
+
+def saved_exercise_counts(user_ids, connection=None):
+    """{("exercise", id): saves} over the given members' saved exercises, in one grouped query."""
+    conn = connection if connection is not None else db.session
+    rows = conn.execute(
+        select(UserExercise.exercise_id, func.count())
+        .where(UserExercise.user_id.in_(list(user_ids)))
+        .group_by(UserExercise.exercise_id)
+    )
+    return Counter({("exercise", _value(exercise_id)): count for exercise_id, count in rows})
+
+
+def forget_members(user_ids):
+    """
+    Count members and their saved exercises out before a set-based DELETE
+    (which the flush events don't see); the caller deletes and commits.
+    """
+    deltas = saved_exercise_counts(user_ids)
+    rows = db.session.execute(
+        select(User.subscription, User.gender, User.role, User.age, User.created_at)
+        .where(User.id.in_(list(user_ids)))
+    ).mappings()
+    for values in rows:
+        for key in member_keys(values.get):
+            deltas[key] += 1
+    record({key: -count for key, count in deltas.items()})
+
+
+# ---------- ORM Flush Events ---------- #
+def _original(state, field):
+    """A field's value as loaded from the database, before pending changes."""
+    history = state.attrs[field].load_history()
+    if history.deleted:
+        return history.deleted[0]
+    if history.added:
+        # Changed from NULL (counted fields load their old value, see User)
+        return None
+    return history.unchanged[0] if history.unchanged else None
+
+
+def _collect_deltas(db_session, flush_context, instances):
+    deltas = db_session.info.setdefault("analytics_deltas", Counter())
+    labels = db_session.info.setdefault("analytics_labels", {})
+
+    for obj in db_session.new:
+        if isinstance(obj, User):
+            for key in member_keys(lambda field: getattr(obj, field)):
+                deltas[key] += 1
+        elif isinstance(obj, UserExercise):
+            key = ("exercise", _value(obj.exercise_id))
+            deltas[key] += 1
+            labels[key] = (obj.exercise_name or "")[:255] or None
+
+    deleted_members = {obj.id for obj in db_session.deleted if isinstance(obj, User)}
+    for obj in db_session.deleted:
+        state = inspect(obj)
+        if isinstance(obj, User):
+            for key in member_keys(lambda field: _original(state, field)):
+                deltas[key] -= 1
+        elif isinstance(obj, UserExercise) and _original(state, "user_id") not in deleted_members:
+            deltas[("exercise", _value(_original(state, "exercise_id")))] -= 1
+    if deleted_members:
+        # Their saves go with them through ON DELETE CASCADE, unloaded (passive_deletes)
+        for key, count in saved_exercise_counts(deleted_members, db_session).items():
+            deltas[key] -= count
+
+    for obj in db_session.dirty:
+        if isinstance(obj, User) and db_session.is_modified(obj):
+            state = inspect(obj)
+            before = member_keys(lambda field: _original(state, field))
+            after = member_keys(lambda field: getattr(obj, field))
+            for key in before:
+                deltas[key] -= 1
+            for key in after:
+                deltas[key] += 1
+
+
+def _apply_deltas(db_session, flush_context):
+    deltas = db_session.info.pop("analytics_deltas", None)
+    labels = db_session.info.pop("analytics_labels", {})
+    if deltas:
+        record(deltas, labels, connection=db_session.connection())
+
+
+def _discard_deltas(db_session, previous_transaction=None):
+    db_session.info.pop("analytics_deltas", None)
+    db_session.info.pop("analytics_labels", None)
+
+
+# ---------- Compaction ---------- #
+def rebuild(conn, keep_days=MAX_SIGNUP_DAYS, chunk_size=1000):
+    """Recompute every rollup from users and user_exercises; returns the row count."""
+    deltas = Counter()
+    labels = {}
+
+    deltas[("members", "")] = conn.execute(select(func.count(User.id))).scalar()
+    for field in MEMBER_FIELDS:
+        column = getattr(User, field)
+        for value, count in conn.execute(select(column, func.count()).group_by(column)):
+            deltas[(field, _value(value))] += count
+    for age, count in conn.execute(select(User.age, func.count()).group_by(User.age)):
+        deltas[("age_band", age_band(age))] += count
+
+    since = datetime.combine(date.today() - timedelta(days=keep_days), datetime.min.time())
+    day = func.date(User.created_at)
+    for value, count in conn.execute(
+        select(day, func.count()).where(User.created_at >= since).group_by(day)
+    ):
+        deltas[("signup_day", str(value)[:10])] += count
+
+    for exercise_id, name, count in conn.execute(
+        select(UserExercise.exercise_id, func.max(UserExercise.exercise_name), func.count())
+        .group_by(UserExercise.exercise_id)
+    ):
+        deltas[("exercise", _value(exercise_id))] += count
+        labels[("exercise", _value(exercise_id))] = (name or "")[:255] or None
+
+    conn.execute(delete(AnalyticsRollup))
+    rows = _rows(deltas, labels)
+    for offset in range(0, len(rows), chunk_size):
+        conn.execute(insert(AnalyticsRollup), rows[offset:offset + chunk_size])
+    return len(rows)
+
+
+def ensure_built(conn):
+    """Build empty rollups from the source tables (databases made by create_all, not the migrations)."""
+    if conn.execute(select(func.count()).select_from(AnalyticsRollup)).scalar():
+        return
+    rebuild(conn)
+
+
+@click.command("compact-analytics")
+@click.option("--keep-days", default=MAX_SIGNUP_DAYS, show_default=True, help="Signup days to keep.")
+def compact_analytics_command(keep_days):
+    """Rebuild the admin analytics rollups from the source tables."""
+    with db.engine.begin() as conn:
+        count = rebuild(conn, keep_days=keep_days)
+    click.echo(f"Analytics rebuilt: {count} rollup rows.")
+
+
+# ---------- JSON Endpoints ---------- #
+def _forbidden():
+    return {"error": "forbidden"}, 403
+
+
+def _dimension(name):
+    rows = db.session.execute(
+        select(AnalyticsRollup.value, AnalyticsRollup.count)
+        .where(AnalyticsRollup.dimension == name, AnalyticsRollup.count > 0)
+        .order_by(AnalyticsRollup.count.desc())
+    )
+    return {value or "unspecified": count for value, count in rows}
+
+
+def summary_view():
+    if session.get("role") != "admin":
+        return _forbidden()
+    updated_at = db.session.execute(select(func.max(AnalyticsRollup.updated_at))).scalar()
+    return {
+        "members": total_members() or 0,
+        "subscription": _dimension("subscription"),
+        "gender": _dimension("gender"),
+        "role": _dimension("role"),
+        "age_band": _dimension("age_band"),
+        "updated_at": updated_at.isoformat() if updated_at else None,
+    }, 200
+
+
+def signups_view():
+    if session.get("role") != "admin":
+        return _forbidden()
+    days = max(1, min(request.args.get("days", 30, type=int), MAX_SIGNUP_DAYS))
+    start = date.today() - timedelta(days=days - 1)
+    rows = dict(db.session.execute(
+        select(AnalyticsRollup.value, AnalyticsRollup.count)
+        .where(AnalyticsRollup.dimension == "signup_day", AnalyticsRollup.value >= start.isoformat())
+    ).all())
+    # Every day in the range, zero-filled, oldest first
+    series = [(start + timedelta(days=n)).isoformat() for n in range(days)]
+    return {"days": [{"day": day, "signups": rows.get(day, 0)} for day in series]}, 200
+
+
+def top_exercises_view():
+    if session.get("role") != "admin":
+        return _forbidden()
+    limit = max(1, min(request.args.get("limit", 10, type=int), MAX_TOP_EXERCISES))
+    rows = db.session.execute(
+        select(AnalyticsRollup.value, AnalyticsRollup.label, AnalyticsRollup.count)
+        .where(AnalyticsRollup.dimension == "exercise", AnalyticsRollup.count > 0)
+        .order_by(AnalyticsRollup.count.desc())
+        .limit(limit)
+    )
+    return {"exercises": [
+        {"exercise_id": value, "name": label, "saves": count} for value, label, count in rows
+    ]}, 200
+
+
+def total_members():
+    """Member count from the rollup (None until the table has been built)."""
+    return db.session.execute(
+        select(AnalyticsRollup.count)
+        .where(AnalyticsRollup.dimension == "members", AnalyticsRollup.value == "")
+    ).scalar()
+
+
+def init_app(app):
+    """Register the flush listeners, the compaction command and the JSON endpoints."""
+    if not event.contains(Session, "before_flush", _collect_deltas):
+        event.listen(Session, "before_flush", _collect_deltas)
+        event.listen(Session, "after_flush", _apply_deltas)
+        event.listen(Session, "after_rollback", _discard_deltas)
+    app.cli.add_command(compact_analytics_command)
+    app.add_url_rule("/admin/analytics/summary", "analytics_summary", summary_view)
+    app.add_url_rule("/admin/analytics/signups", "analytics_signups", signups_view)
+    app.add_url_rule("/admin/analytics/top_exercises", "analytics_top_exercises", top_exercises_view)
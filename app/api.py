@@ -0,0 +1,294 @@
+# Summary: Versioned JSON API for Mobile and Single-Page Clients
+# Description:
+# /api/v1 serves the data behind the heavy pages without rendering them:
+#   - GET    /api/v1/exercises?q=chest       exercise search (catalog, then ExerciseDB)
+#   - GET    /api/v1/saved                   the member's saved exercises, newest first
+#   - POST   /api/v1/saved                   save (or refresh) one exercise
+#   - DELETE /api/v1/saved/<saved_id>        remove one saved exercise (204)
+#   - GET    /api/v1/admin/users             filtered, keyset-paginated member list
+# `?fields=id,name,target` trims every item to the listed fields. Responses
+# are compact JSON, or MessagePack when the client prefers
+# application/msgpack and the msgpack package is installed. Each body carries
+# an ETag (a repeat request with If-None-Match gets an empty 304) and bodies
+# over API_COMPRESS_MIN_BYTES are compressed with brotli (when installed) or
+# gzip, whichever Accept-Encoding prefers. Compressed bodies are kept in a
+# small LRU keyed by ETag, so a popular search is compressed once per worker.
+
+from collections import OrderedDict
+from datetime import date, datetime
+import gzip
+import hashlib
+import json
+import threading
+
+from flask import Blueprint, Response, request, session
+
+try:
+    import brotli
+except ImportError:  # "br" is only offered when installed
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; JSON is always available
+    msgpack = None
+
+from .cache import exercise_cache
+from .catalog import exercise_catalog, normalize_key
+from .exercise_api import exercise_api
+from .member_queries import MEMBER_COLUMNS, member_page, parse_member_filters
+from .metrics import API_RESPONSE_BYTES
+from .models import UserExercise
+from .rendering import CARD_FIELDS, conditional, ensure_prepared, not_modified
+from .saved_exercises import delete_saved, save_for_user, saved_page
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/x-msgpack")
+
+EXERCISE_FIELDS = CARD_FIELDS + ("secondaryMuscles", "instructions", "youtubeUrl")
+SAVED_FIELDS = ("id", "exercise_id", "exercise_name", "target", "equipment", "gif_url",
+                "sets", "reps", "day", "created_at")
+MEMBER_FIELDS = tuple(column.key for column in MEMBER_COLUMNS)
+MAX_SEARCH_RESULTS = 200
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+class ApiError(Exception):
+    """A request the API refuses; answered as {"error": message} with `status`."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def search_exercises(query):
+    """Catalog results for a search term, falling back to the parallel ExerciseDB probes."""
+    normalized = normalize_key(query)
+    exercise_catalog.ensure_loaded()
+    results = exercise_catalog.search(normalized)
+    if not results:
+        results = ensure_prepared(exercise_api.search(normalized, cache=exercise_cache))
+    return results
+
+
+# ---------- Field Selection ---------- #
+def requested_fields(allowed, default=None):
+    """Fields named in ?fields= (in order), or `default`; ApiError on an unknown name."""
+    value = request.args.get("fields")
+    if not value:
+        return default or allowed
+    fields = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown or not fields:
+        raise ApiError(f"unknown fields: {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return fields
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def pick(item, fields):
+    """The selected fields of a dict or row object, with dates as ISO strings."""
+    get = item.get if isinstance(item, dict) else lambda name: getattr(item, name, None)
+    return {name: _plain(get(name)) for name in fields}
+
+
+# ------------------------------
+# ApiEncoder
+# Content negotiation, ETags and compression
+# for API responses, with an LRU of bodies
+# already compressed in this worker.
+# ------------------------------
+class ApiEncoder:
+    def __init__(self):
+        self.min_bytes = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 5
+        self.max_entries = 256
+        self._compressed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read API_* settings and register the /api/v1 blueprint."""
+        self.min_bytes = app.config.get("API_COMPRESS_MIN_BYTES", self.min_bytes)
+        self.gzip_level = app.config.get("API_GZIP_LEVEL", self.gzip_level)
+        self.brotli_quality = app.config.get("API_BROTLI_QUALITY", self.brotli_quality)
+        self.max_entries = app.config.get("API_COMPRESSED_CACHE_SIZE", self.max_entries)
+        self.clear()
+        app.extensions["api"] = self
+        app.register_blueprint(api)
+
+    # ---------- Negotiation ---------- #
+    @staticmethod
+    def mimetype():
+        if msgpack is not None and request.accept_mimetypes.best_match((JSON,) + MSGPACK_TYPES) in MSGPACK_TYPES:
+            return MSGPACK
+        return JSON
+
+    def content_encoding(self, size):
+        if size < self.min_bytes:
+            return None
+        offered = ("br", "gzip") if brotli is not None else ("gzip",)
+        return request.accept_encodings.best_match(offered)
+
+    @staticmethod
+    def encode(payload, mimetype):
+        if mimetype == MSGPACK:
+            return msgpack.packb(payload, use_bin_type=True)
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def compress(self, body, encoding, etag):
+        key = (etag, encoding)
+        with self._lock:
+            data = self._compressed.get(key)
+            if data is not None:
+                self._compressed.move_to_end(key)
+                return data
+
+        if encoding == "br":
+            data = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            # mtime=0 keeps the output identical for identical bodies
+            data = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        with self._lock:
+            self._compressed[key] = data
+            while len(self._compressed) > self.max_entries:
+                self._compressed.popitem(last=False)
+        return data
+
+    def respond(self, payload, status=200):
+        """Encode `payload` for this client; 304 when its If-None-Match is current."""
+        mimetype = self.mimetype()
+        body = self.encode(payload, mimetype)
+        etag = hashlib.sha1(mimetype.encode("ascii") + b"\0" + body).hexdigest()[:32]
+        if status == 200 and not_modified(etag):
+            response = conditional(Response(status=304), etag)
+            response.vary.update(("Accept", "Accept-Encoding"))
+            return response
+
+        encoding = self.content_encoding(len(body))
+        if encoding:
+            body = self.compress(body, encoding, etag)
+        response = Response(body, status=status, mimetype=mimetype)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.update(("Accept", "Accept-Encoding"))
+        API_RESPONSE_BYTES.observe(len(body), endpoint=request.endpoint or "api", encoding=encoding or "identity")
+        return conditional(response, etag) if status == 200 else response
+
+    def clear(self):
+        with self._lock:
+            self._compressed.clear()
+
+
+# ---------- Request Helpers ---------- #
+def _member_id():
+    if "user_id" not in session:
+        raise ApiError("login required", 401)
+    return session["user_id"]
+
+
+def _payload():
+    """Request body as a dict: JSON, MessagePack or a form post."""
+    if request.mimetype in MSGPACK_TYPES:
+        if msgpack is None:
+            raise ApiError("MessagePack bodies are not supported here", 415)
+        try:
+            payload = msgpack.unpackb(request.get_data(), raw=False)
+        except (ValueError, msgpack.UnpackException):
+            payload = None
+    elif request.is_json:
+        payload = request.get_json(silent=True)
+    else:
+        payload = request.form.to_dict()
+    if not isinstance(payload, dict):
+        raise ApiError("request body must be an object")
+    return payload
+
+
+@api.errorhandler(ApiError)
+def api_error(error):
+    return api_encoder.respond({"error": str(error)}, error.status)
+
+
+# ---------- Exercises ---------- #
+@api.route("/exercises")
+def exercises():
+    _member_id()
+    query = request.args.get("q") or request.args.get("muscle") or request.args.get("body_part")
+    if not query:
+        raise ApiError("q is required")
+    fields = requested_fields(EXERCISE_FIELDS, CARD_FIELDS)
+    limit = max(1, min(request.args.get("limit", 50, type=int), MAX_SEARCH_RESULTS))
+
+    results = search_exercises(query)
+    return api_encoder.respond({
+        "query": query,
+        "count": len(results),
+        "exercises": [pick(ex, fields) for ex in results[:limit]],
+    })
+
+
+# ---------- Saved Exercises ---------- #
+@api.route("/saved")
+def saved_list():
+    user_id = _member_id()
+    fields = requested_fields(SAVED_FIELDS)
+    rows, next_cursor = saved_page(
+        user_id, after=request.args.get("after"), per_page=request.args.get("per_page", type=int)
+    )
+    return api_encoder.respond({"saved": [pick(row, fields) for row in rows], "next": next_cursor})
+
+
+@api.route("/saved", methods=["POST"])
+def save():
+    user_id = _member_id()
+    fields = requested_fields(SAVED_FIELDS)
+    payload = _payload()
+    # ExerciseDB-shaped entries (id, name, gifUrl) are accepted as well as our own field names
+    exercise_id = payload.get("exercise_id") or payload.get("id")
+    name = payload.get("exercise_name") or payload.get("name")
+    if not exercise_id or not name:
+        raise ApiError("exercise_id (or id) and exercise_name (or name) are required")
+
+    save_for_user(
+        user_id,
+        str(exercise_id),
+        exercise_name=name,
+        target=payload.get("target"),
+        equipment=payload.get("equipment"),
+        gif_url=payload.get("gif_url") or payload.get("gifUrl"),
+    )
+    row = UserExercise.query.filter_by(user_id=user_id, exercise_id=str(exercise_id)).one()
+    return api_encoder.respond(pick(row, fields), 201)
+
+
+@api.route("/saved/<int:saved_id>", methods=["DELETE"])
+def delete_saved_exercise(saved_id):
+    if not delete_saved(_member_id(), saved_id):
+        raise ApiError("saved exercise not found", 404)
+    return Response(status=204)
+
+
+# ---------- Admin: Members ---------- #
+@api.route("/admin/users")
+def admin_users():
+    _member_id()
+    if session.get("role") != "admin":
+        raise ApiError("forbidden", 403)
+    fields = requested_fields(MEMBER_FIELDS)
+    rows, next_cursor = member_page(
+        parse_member_filters(request.args),
+        sort=request.args.get("sort", "id"),
+        order=request.args.get("order", "asc"),
+        after=request.args.get("after"),
+        per_page=request.args.get("per_page", type=int),
+    )
+    return api_encoder.respond({"users": [pick(row, fields) for row in rows], "next": next_cursor})
+
+
+api_encoder = ApiEncoder()
@@ -0,0 +1,358 @@
+# Summary: Bulk Member Import / Export
+# Description:
+# Streams member CSV/JSONL uploads into the users table in chunks: each chunk
+# is validated with two IN (...) uniqueness lookups, its passwords are hashed
+# in a process pool, and the rows are written with one executemany INSERT and
+# a single commit. Every rejected row is reported with its line number.
+# Exports walk the table in keyset batches so the whole table is never held
+# in memory. Mass deletes and deactivations run as set-based statements over
+# id-ordered chunks, one short transaction each, so purging thousands of
+# members neither holds long locks nor loads their rows (saved exercises,
+# plan counters and bookings go through ON DELETE CASCADE). Available from
+# the admin UI and as `flask import-users` / `flask export-users` /
+# `flask purge-users`.
+
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import functools
+import io
+import json
+import multiprocessing
+
+import click
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from . import analytics, db, schedule, sessions
+from .member_queries import MEMBER_COLUMNS, member_conditions
+from .models import User
+
+
+REQUIRED_FIELDS = ("first_name", "last_name", "national_id", "email", "password")
+OPTIONAL_FIELDS = ("age", "gender", "subscription", "role")
+EXPORT_FIELDS = [column.key for column in MEMBER_COLUMNS]
+DEFAULT_CHUNK_SIZE = 500
+PURGE_ACTIONS = ("delete", "deactivate")
+
+
+# ---------- Readers ---------- #
+# Yields (line number, row dict or None, error message or None) from a binary upload.
+def read_rows(stream, fmt):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    if fmt == "jsonl":
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_no, None, f"invalid JSON: {exc}"
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, "expected a JSON object"
+                continue
+            yield line_no, row, None
+    else:
+        # Line 1 is the header row
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            yield line_no, row, None
+
+
+# Guesses the upload format from a filename.
+def detect_format(filename):
+    return "jsonl" if (filename or "").lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Checks one row in isolation; returns (clean values, error message).
+def validate_row(row):
+    values = {field: str(row.get(field) or "").strip() for field in REQUIRED_FIELDS + OPTIONAL_FIELDS}
+    missing = [field for field in REQUIRED_FIELDS if not values[field]]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    try:
+        values["age"] = int(values["age"]) if values["age"] else None
+    except ValueError:
+        return None, f"invalid age '{values['age']}'"
+    values["role"] = values["role"] or "user"
+    if values["role"] not in ("user", "admin"):
+        return None, f"invalid role '{values['role']}'"
+    for field in ("gender", "subscription"):
+        values[field] = values[field] or None
+    return values, None
+
+
+# ---------- Import ---------- #
+def _insert_chunk(rows, report):
+    """executemany INSERT + one commit; falls back to per-row inserts on a race."""
+    try:
+        db.session.execute(insert(User), [values for _, values in rows])
+        analytics.record_members(values for _, values in rows)
+        db.session.commit()
+        report["created"] += len(rows)
+    except IntegrityError:
+        # Someone inserted a conflicting member meanwhile; isolate the bad rows
+        db.session.rollback()
+        for line_no, values in rows:
+            try:
+                db.session.execute(insert(User), [values])
+                analytics.record_members([values])
+                db.session.commit()
+                report["created"] += 1
+            except IntegrityError:
+                db.session.rollback()
+                report["errors"].append((line_no, "email or national ID already registered"))
+
+
+def import_users(rows, chunk_size=DEFAULT_CHUNK_SIZE, hash_workers=2, hash_method="scrypt"):
+    """
+    Import (line, row, error) tuples from read_rows(). Returns a report dict
+    with the number of rows read, members created and per-row errors.
+    """
+    report = {"rows": 0, "created": 0, "errors": []}
+    hash_password = functools.partial(generate_password_hash, method=hash_method)
+    executor = None
+    if hash_workers:
+        # "spawn" keeps the pool safe to start from a threaded or gevent worker
+        executor = ProcessPoolExecutor(
+            max_workers=hash_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    try:
+        for chunk in chunked(rows, chunk_size):
+            report["rows"] += len(chunk)
+            valid = []
+            seen_emails, seen_ids = set(), set()
+
+            for line_no, row, error in chunk:
+                values = None
+                if error is None:
+                    values, error = validate_row(row)
+                if error is None and values["email"].lower() in seen_emails:
+                    error = "duplicate email in upload"
+                if error is None and values["national_id"] in seen_ids:
+                    error = "duplicate national ID in upload"
+                if error:
+                    report["errors"].append((line_no, error))
+                    continue
+                seen_emails.add(values["email"].lower())
+                seen_ids.add(values["national_id"])
+                valid.append((line_no, values))
+
+            if not valid:
+                continue
+
+            # Batched uniqueness checks against existing members
+            taken_emails = {email.lower() for (email,) in db.session.query(User.email).filter(
+                User.email.in_([values["email"] for _, values in valid])
+            )}
+            taken_ids = {nid for (nid,) in db.session.query(User.national_id).filter(
+                User.national_id.in_([values["national_id"] for _, values in valid])
+            )}
+
+            rows_to_insert = []
+            for line_no, values in valid:
+                if values["email"].lower() in taken_emails:
+                    report["errors"].append((line_no, "email already registered"))
+                elif values["national_id"] in taken_ids:
+                    report["errors"].append((line_no, "national ID already registered"))
+                else:
+                    rows_to_insert.append((line_no, values))
+
+            if not rows_to_insert:
+                continue
+
+            passwords = [values.pop("password") for _, values in rows_to_insert]
+            if executor:
+                hashes = executor.map(hash_password, passwords, chunksize=16)
+            else:
+                hashes = map(hash_password, passwords)
+            for (_, values), password_hash in zip(rows_to_insert, hashes):
+                values["password_hash"] = password_hash
+
+            _insert_chunk(rows_to_insert, report)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    report["errors"].sort()
+    return report
+
+
+# ---------- Export ---------- #
+def iter_member_batches(filters=None, batch_size=1000):
+    """Yields lists of member rows in id order, one keyset batch at a time."""
+    conditions = member_conditions(filters or {})
+    last_id = 0
+    while True:
+        batch = (
+            db.session.query(*MEMBER_COLUMNS)
+            .filter(User.id > last_id, *conditions)
+            .order_by(User.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def export_members(fmt="csv", filters=None, batch_size=1000):
+    """Generator of CSV or JSONL text chunks for the (filtered) members."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        yield buffer.getvalue()
+
+    for batch in iter_member_batches(filters, batch_size):
+        if fmt == "jsonl":
+            yield "".join(json.dumps(row._asdict(), default=str) + "\n" for row in batch)
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                [value.isoformat() if hasattr(value, "isoformat") else value for value in row]
+                for row in batch
+            )
+            yield buffer.getvalue()
+
+
+# ---------- Mass Delete / Deactivate ---------- #
+def delete_members(user_ids):
+    """
+    Delete members with set-based statements in the current transaction
+    (the caller commits): upcoming seats are released, the analytics
+    rollups counted down, and child rows removed by ON DELETE CASCADE.
+    """
+    user_ids = list(user_ids)
+    schedule.cancel_all(user_ids)
+    analytics.forget_members(user_ids)
+    db.session.execute(
+        delete(User).where(User.id.in_(user_ids)).execution_options(synchronize_session=False)
+    )
+
+
+def purge_conditions(action, filters=None, user_ids=None, keep_ids=()):
+    """WHERE clauses for a mass action; ValueError unless a filter or member list narrows it."""
+    if action not in PURGE_ACTIONS:
+        raise ValueError(f"unknown action '{action}'")
+    conditions = member_conditions(filters or {})
+    if user_ids is not None:
+        conditions.append(User.id.in_(list(user_ids)))
+    if not conditions:
+        raise ValueError("select members or set a filter first")
+    # Mass actions never touch admins
+    conditions.append(User.role != "admin")
+    if keep_ids:
+        conditions.append(User.id.notin_(list(keep_ids)))
+    if action == "deactivate":
+        conditions.append(User.active.is_(True))
+    return conditions
+
+
+def purge_members(action, filters=None, user_ids=None, keep_ids=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Delete or deactivate the members matching `filters` (and `user_ids`) in
+    id-ordered chunks, committing after each one. Returns how many members
+    were changed.
+    """
+    conditions = purge_conditions(action, filters, user_ids, keep_ids)
+    changed = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(User.id).where(User.id > last_id, *conditions).order_by(User.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            return changed
+
+        if action == "delete":
+            delete_members(ids)
+        else:
+            schedule.cancel_all(ids)
+            db.session.execute(
+                update(User).where(User.id.in_(ids)).values(active=False)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        sessions.revoke_users(ids)
+        changed += len(ids)
+        last_id = ids[-1]
+
+
+# ---------- CLI ---------- #
+@click.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None)
+@click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.option("--hash-workers", default=2, show_default=True)
+def import_users_command(path, fmt, chunk_size, hash_workers):
+    """Bulk-import members from a CSV or JSONL file."""
+    from flask import current_app
+
+    with open(path, "rb") as fh:
+        report = import_users(
+            read_rows(fh, fmt or detect_format(path)),
+            chunk_size=chunk_size,
+            hash_workers=hash_workers,
+            hash_method=current_app.config["PASSWORD_HASH_METHOD"],
+        )
+    click.echo(f"Read {report['rows']} rows, created {report['created']} members.")
+    for line_no, error in report["errors"]:
+        click.echo(f"  line {line_no}: {error}")
+
+
+@click.command("export-users")
+@click.option("--output", type=click.File("w"), default="-")
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default="csv")
+def export_users_command(output, fmt):
+    """Stream every member to CSV or JSONL (stdout by default)."""
+    for text in export_members(fmt):
+        output.write(text)
+
+
+@click.command("purge-users")
+@click.argument("action", type=click.Choice(PURGE_ACTIONS))
+@click.option("--subscription")
+@click.option("--gender")
+@click.option("--role")
+@click.option("--status", type=click.Choice(["active", "inactive"]))
+@click.option("--joined-from", type=click.DateTime(["%Y-%m-%d"]))
+@click.option("--joined-to", type=click.DateTime(["%Y-%m-%d"]))
+@click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Only count the matching members.")
+@click.option("--yes", is_flag=True, help="Don't ask for confirmation.")
+def purge_users_command(action, chunk_size, dry_run, yes, **filters):
+    """Delete or deactivate every member (never admins) matching the filters."""
+    try:
+        conditions = purge_conditions(action, filters)
+    except ValueError as exc:
+        raise click.UsageError(str(exc))
+    matching = db.session.execute(select(func.count(User.id)).where(*conditions)).scalar()
+    click.echo(f"{matching} member(s) match.")
+    if dry_run or not matching:
+        return
+    if not yes:
+        click.confirm(f"{action.capitalize()} them?", abort=True)
+    changed = purge_members(action, filters, chunk_size=chunk_size)
+    click.echo(f"{action.capitalize()}d {changed} member(s).")
+
+
+def init_app(app):
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(export_users_command)
+    app.cli.add_command(purge_users_command)
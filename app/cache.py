@@ -0,0 +1,278 @@
+# Summary: Response Cache for ExerciseDB Lookups
+# Description:
+# A small TTL + LRU cache placed in front of the ExerciseDB API calls.
+# Entries are fresh for EXERCISE_CACHE_TTL seconds, then served stale for
+# EXERCISE_CACHE_STALE_TTL more seconds while a background thread refreshes
+# them. Empty results (404 / no match) are cached as negative entries with a
+# shorter TTL so the next endpoint is tried straight away. When the upstream
+# fails (or the circuit breaker sheds the call) an expired entry still in the
+# backend is served rather than nothing.
+# Two backends are available:
+#   - "memory":   per-process OrderedDict (default)
+#   - "database": the api_cache table, shared by all workers and replicas
+
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .metrics import CACHE_EVENTS, registry
+
+
+# ------------------------------
+# MemoryCacheBackend
+# Bounded in-process LRU; entries are
+# (value, fresh_until, stale_until) tuples.
+# ------------------------------
+class MemoryCacheBackend:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, value, fresh_until, stale_until):
+        with self._lock:
+            self._data[key] = (value, fresh_until, stale_until)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ------------------------------
+# DatabaseCacheBackend
+# Shared cache stored in the api_cache table.
+# Every call runs on its own connection and
+# transaction, never the request's db.session,
+# so cache writes can't commit or roll back the
+# caller's pending work. accessed_at is only
+# bumped once per touch_interval to keep reads
+# cheap; the table is trimmed back to
+# max_entries every trim_every writes (least
+# recently used first).
+# ------------------------------
+class DatabaseCacheBackend:
+    # Longer keys (search terms are unbounded) are shortened to a prefix plus their digest
+    MAX_KEY_LENGTH = 255
+
+    def __init__(self, max_entries=10000, touch_interval=60, trim_every=100):
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.trim_every = trim_every
+        self._writes = 0
+
+    @classmethod
+    def storage_key(cls, key):
+        if len(key) <= cls.MAX_KEY_LENGTH:
+            return key
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return f"{key[:cls.MAX_KEY_LENGTH - len(digest) - 1]}#{digest}"
+
+    @staticmethod
+    def _table():
+        from .models import ApiCacheEntry
+
+        return ApiCacheEntry.__table__
+
+    def get(self, key):
+        table = self._table()
+        key = self.storage_key(key)
+        with db.engine.begin() as conn:
+            row = conn.execute(select(table).where(table.c.key == key)).first()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row.accessed_at > self.touch_interval:
+                conn.execute(update(table).where(table.c.key == key).values(accessed_at=now))
+        return json.loads(row.value), row.fresh_until, row.stale_until
+
+    def set(self, key, value, fresh_until, stale_until):
+        table = self._table()
+        key = self.storage_key(key)
+        values = {
+            "value": json.dumps(value),
+            "fresh_until": fresh_until,
+            "stale_until": stale_until,
+            "accessed_at": time.time(),
+        }
+        try:
+            with db.engine.begin() as conn:
+                result = conn.execute(update(table).where(table.c.key == key).values(**values))
+                if result.rowcount == 0:
+                    conn.execute(insert(table).values(key=key, **values))
+        except IntegrityError:
+            # Another worker stored the same key first; its value is just as good
+            return
+
+        self._writes += 1
+        if self._writes % self.trim_every == 0:
+            self.trim()
+
+    def delete(self, key):
+        table = self._table()
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.key == self.storage_key(key)))
+
+    def clear(self):
+        with db.engine.begin() as conn:
+            conn.execute(delete(self._table()))
+
+    def trim(self):
+        """Evict the least recently used rows beyond max_entries."""
+        table = self._table()
+        with db.engine.begin() as conn:
+            cutoff = conn.execute(
+                select(table.c.accessed_at)
+                .order_by(table.c.accessed_at.desc())
+                .offset(self.max_entries)
+                .limit(1)
+            ).scalar()
+            if cutoff is not None:
+                conn.execute(delete(table).where(table.c.accessed_at <= cutoff))
+
+    def __len__(self):
+        table = self._table()
+        with db.engine.connect() as conn:
+            return conn.execute(select(func.count(table.c.key))).scalar()
+
+
+CACHE_BACKENDS = {
+    "memory": MemoryCacheBackend,
+    "database": DatabaseCacheBackend,
+}
+
+
+# ------------------------------
+# ResponseCache
+# Front-end used by the routes: get_or_fetch()
+# returns a cached value or calls `fetch`.
+# ------------------------------
+class ResponseCache:
+    def __init__(self, backend=None, ttl=3600, stale_ttl=86400, negative_ttl=300):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.stats = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "errors": 0, "fallbacks": 0,
+        }
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        registry.add_collector(self._export_metrics)
+
+    def init_app(self, app):
+        """Configure the backend and TTLs from EXERCISE_CACHE_* settings."""
+        backend_name = app.config.get("EXERCISE_CACHE_BACKEND", "memory")
+        if backend_name not in CACHE_BACKENDS:
+            raise ValueError(f"Unknown EXERCISE_CACHE_BACKEND: {backend_name}")
+
+        self.backend = CACHE_BACKENDS[backend_name](
+            max_entries=app.config.get("EXERCISE_CACHE_MAX_ENTRIES", 1024)
+        )
+        self.ttl = app.config.get("EXERCISE_CACHE_TTL", self.ttl)
+        self.stale_ttl = app.config.get("EXERCISE_CACHE_STALE_TTL", self.stale_ttl)
+        self.negative_ttl = app.config.get("EXERCISE_CACHE_NEGATIVE_TTL", self.negative_ttl)
+        app.extensions["exercise_cache"] = self
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def store(self, key, value):
+        """Cache a value; empty results are kept as short-lived negative entries."""
+        ttl = self.ttl if value else self.negative_ttl
+        now = time.time()
+        self.backend.set(key, value, now + ttl, now + ttl + self.stale_ttl)
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return the cached value for `key`, calling `fetch()` on a miss.
+        `fetch` returns None for transient errors, which are never cached.
+        """
+        entry = self.backend.get(key)
+        now = time.time()
+
+        if entry is not None:
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self._count("hits")
+                return value
+            if now < stale_until:
+                self._count("stale_hits")
+                self._refresh_in_background(key, fetch)
+                return value
+
+        self._count("misses")
+        value = fetch()
+        if value is None:
+            self._count("errors")
+            if entry is not None:
+                # Upstream down or shedding: an expired answer beats none
+                self._count("fallbacks")
+                return entry[0]
+            return None
+        self.store(key, value)
+        return value
+
+    def _refresh_in_background(self, key, fetch):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        app = current_app._get_current_object()
+
+        def refresh():
+            try:
+                with app.app_context():
+                    value = fetch()
+                    if value is not None:
+                        self.store(key, value)
+                        self._count("refreshes")
+            except Exception as exc:
+                print(f"[WARN] Background refresh failed for {key}: {exc}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _export_metrics(self):
+        with self._lock:
+            for event, value in self.stats.items():
+                CACHE_EVENTS.set(value, event=event)
+
+    def snapshot(self):
+        """Counters plus current size, for the admin stats endpoint."""
+        with self._lock:
+            data = dict(self.stats)
+        lookups = data["hits"] + data["stale_hits"] + data["misses"]
+        data["entries"] = len(self.backend)
+        data["hit_ratio"] = round((data["hits"] + data["stale_hits"]) / lookups, 3) if lookups else 0.0
+        return data
+
+
+exercise_cache = ResponseCache()
@@ -0,0 +1,250 @@
+# Summary: Local ExerciseDB Catalog Mirror
+# Description:
+# Stores the ExerciseDB dataset in our own exercise_catalog table and keeps
+# in-memory indexes by name token, body part, target muscle and equipment.
+# Exercise searches are answered from these indexes in microseconds, with a
+# ranked, typo-tolerant search index (search.py) behind the exact lookups;
+# the RapidAPI endpoints are only used when the catalog has no matching entry.
+# The catalog is filled from a JSON dump or synced from the API with the
+# `flask sync-catalog` command.
+
+from collections import defaultdict
+from datetime import datetime
+import json
+import re
+import threading
+import time
+
+import click
+import requests
+from sqlalchemy import func, insert, update
+
+from . import db
+from .rendering import prepare_exercise
+from .search import SearchIndex
+
+
+# Normalizes a search term the same way the /exercises route builds API paths.
+def normalize_key(value):
+    return (value or "").strip().lower().replace(" ", "-").replace("_", "-")
+
+
+# Splits an exercise name (or normalized query) into lowercase word tokens.
+def tokenize(value):
+    return [tok for tok in re.split(r"[^a-z0-9]+", (value or "").lower()) if tok]
+
+
+# ------------------------------
+# ExerciseCatalog
+# In-memory view of the exercise_catalog table
+# with lookup indexes, shared by every request
+# handled in this worker process.
+# ------------------------------
+class ExerciseCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._by_token = defaultdict(set)
+        self._by_body_part = defaultdict(list)
+        self._by_target = defaultdict(list)
+        self._by_equipment = defaultdict(list)
+        self.text_index = SearchIndex()
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self.refresh_seconds = 300
+        self.version = 0
+
+    def init_app(self, app):
+        """Read catalog settings and register the sync CLI command."""
+        self.refresh_seconds = app.config.get("EXERCISE_CATALOG_REFRESH_SECONDS", 300)
+        app.extensions["exercise_catalog"] = self
+        app.cli.add_command(sync_catalog_command)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # ---------- Index Building ---------- #
+    def load(self, entries):
+        """Replace the in-memory indexes with the given exercise dicts."""
+        by_token = defaultdict(set)
+        by_body_part = defaultdict(list)
+        by_target = defaultdict(list)
+        by_equipment = defaultdict(list)
+        ordered = {}
+
+        for entry in sorted(entries, key=lambda ex: str(ex.get("id", ""))):
+            ex_id = str(entry.get("id", ""))
+            if not ex_id:
+                continue
+            # Display fields are derived once here, not per rendered page
+            entry = prepare_exercise(entry)
+            ordered[ex_id] = entry
+            for tok in tokenize(entry.get("name")):
+                by_token[tok].add(ex_id)
+            by_body_part[normalize_key(entry.get("bodyPart"))].append(ex_id)
+            by_target[normalize_key(entry.get("target"))].append(ex_id)
+            by_equipment[normalize_key(entry.get("equipment"))].append(ex_id)
+
+        # Swap all indexes at once so readers never see a half-built catalog
+        with self._lock:
+            self._by_token = by_token
+            self._by_body_part = by_body_part
+            self._by_target = by_target
+            self._by_equipment = by_equipment
+            previous, self._entries = self._entries, ordered
+            self.version += 1
+
+        # The text index is updated in place, only for entries that changed
+        for ex_id in previous.keys() - ordered.keys():
+            self.text_index.remove(ex_id)
+        for ex_id, entry in ordered.items():
+            if previous.get(ex_id) != entry:
+                self.text_index.add(entry)
+
+    def load_from_db(self):
+        """Rebuild the indexes from the exercise_catalog table."""
+        from .models import CatalogExercise
+
+        rows = db.session.query(CatalogExercise.data).all()
+        self.load([json.loads(data) for (data,) in rows])
+        self._fingerprint = self._db_fingerprint()
+        self._checked_at = time.monotonic()
+
+    def _db_fingerprint(self):
+        from .models import CatalogExercise
+
+        return tuple(db.session.query(
+            func.count(CatalogExercise.id), func.max(CatalogExercise.updated_at)
+        ).one())
+
+    def ensure_loaded(self):
+        """Load the catalog on first use and reload it when another process synced it."""
+        now = time.monotonic()
+        if self._fingerprint is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        if self._db_fingerprint() != self._fingerprint:
+            self.load_from_db()
+
+    # ---------- Lookups ---------- #
+    def get(self, exercise_id):
+        return self._entries.get(str(exercise_id))
+
+    def by_name(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        matches = set.intersection(*(self._by_token.get(tok, set()) for tok in tokens))
+        return [self._entries[ex_id] for ex_id in sorted(matches)]
+
+    def by_body_part(self, query):
+        return [self._entries[ex_id] for ex_id in self._by_body_part.get(normalize_key(query), [])]
+
+    def by_target(self, query):
+        return [self._entries[ex_id] for ex_id in self._by_target.get(normalize_key(query), [])]
+
+    def by_equipment(self, query):
+        return [self._entries[ex_id] for ex_id in self._by_equipment.get(normalize_key(query), [])]
+
+    def ranked(self, query, limit=50):
+        """Best matches across name, target, body part and equipment, typos allowed."""
+        return [self._entries[ex_id] for ex_id in self.text_index.search(query, limit) if ex_id in self._entries]
+
+    def suggest(self, prefix, limit=10):
+        """Autocomplete: exercises whose words start with the typed prefix."""
+        return [self._entries[ex_id] for ex_id in self.text_index.suggest(prefix, limit) if ex_id in self._entries]
+
+    def search(self, query):
+        """Mirror the API lookup order (name, body part, target), then rank fuzzy matches."""
+        for lookup in (self.by_name, self.by_body_part, self.by_target, self.ranked):
+            results = lookup(query)
+            if results:
+                return results
+        return []
+
+    # ---------- Persistence ---------- #
+    def store(self, entries):
+        """Upsert exercise dicts into exercise_catalog and reload the indexes."""
+        from .models import CatalogExercise
+
+        existing = {ex_id for (ex_id,) in db.session.query(CatalogExercise.id)}
+        now = datetime.utcnow()
+        new_rows, changed_rows = [], []
+
+        for entry in entries:
+            ex_id = str(entry.get("id", ""))
+            if not ex_id:
+                continue
+            row = {
+                "id": ex_id,
+                "name": entry.get("name", ""),
+                "body_part": entry.get("bodyPart"),
+                "target": entry.get("target"),
+                "equipment": entry.get("equipment"),
+                "data": json.dumps(entry),
+                "updated_at": now,
+            }
+            (changed_rows if ex_id in existing else new_rows).append(row)
+            existing.add(ex_id)
+
+        if new_rows:
+            db.session.execute(insert(CatalogExercise), new_rows)
+        if changed_rows:
+            db.session.execute(update(CatalogExercise), changed_rows)
+        db.session.commit()
+
+        self.load_from_db()
+        return len(new_rows), len(changed_rows)
+
+
+# Downloads the full dataset page by page from the ExerciseDB API.
+def fetch_catalog(base_url, headers, page_size=100, timeout=10):
+    entries = []
+    offset = 0
+    while True:
+        response = requests.get(
+            f"{base_url}/exercises",
+            params={"limit": page_size, "offset": offset},
+            headers=headers,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        page = response.json()
+        if not isinstance(page, list) or not page:
+            break
+        entries.extend(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+    return entries
+
+
+# ------------------------------
+# CLI: flask sync-catalog
+# Loads the catalog from a JSON dump (--file)
+# or from the ExerciseDB API (default).
+# ------------------------------
+@click.command("sync-catalog")
+@click.option("--file", "dump_path", type=click.Path(exists=True, dir_okay=False),
+              help="Load exercises from a JSON dump instead of the API.")
+@click.option("--url", "base_url", default=None, help="Override EXERCISE_API_URL.")
+@click.option("--page-size", default=100, show_default=True)
+def sync_catalog_command(dump_path, base_url, page_size):
+    """Load or refresh the local ExerciseDB catalog."""
+    from flask import current_app
+
+    if dump_path:
+        with open(dump_path, encoding="utf-8") as fh:
+            entries = json.load(fh)
+    else:
+        entries = fetch_catalog(
+            base_url or current_app.config["EXERCISE_API_URL"],
+            current_app.config["EXERCISE_API_HEADERS"],
+            page_size=page_size,
+        )
+
+    added, updated = exercise_catalog.store(entries)
+    click.echo(f"Catalog synced: {added} added, {updated} updated, {len(exercise_catalog)} total.")
+
+
+exercise_catalog = ExerciseCatalog()
@@ -0,0 +1,155 @@
+# Summary: Connection Pooling and Read-Replica Routing
+# Description:
+# Builds the SQLAlchemy engine options and the optional replica binds from
+# the environment, and routes reads to replicas:
+#   - pool sizes default per worker model (a sync worker runs one request at
+#     a time, a gevent worker hundreds) and can be capped by a connection
+#     budget shared by every worker process of the deployment, so
+#     pods x workers x (pool_size + max_overflow) stays under max_connections
+#   - DB_REPLICA_HOSTS / DB_REPLICA_URIS add "replica_<n>" binds; SELECTs
+#     issued while serving a read-only endpoint (GET dashboard, My Exercises,
+#     plan, export and analytics views) go to a replica
+#   - writes, SELECT ... FOR UPDATE and everything after the first write in
+#     a request stay on the primary, and a member who just wrote is pinned
+#     to the primary for DB_REPLICA_STICKY_SECONDS (read-your-writes)
+# Pool checkout wait time is exported per pool by metrics.TimedQueuePool.
+# SQLite connections (local runs and tests) get PRAGMA foreign_keys=ON, so
+# ON DELETE CASCADE behaves as it does on MySQL.
+
+import random
+import sqlite3
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import DB_READ_ROUTING, TimedQueuePool
+
+
+# (pool_size, max_overflow) per Gunicorn worker model. Connections open on
+# demand, so a sync worker (one request at a time, plus ExerciseDB probe
+# threads) rarely holds more than a few; gevent workers share theirs.
+POOL_DEFAULTS = {"sync": (5, 5), "gevent": (10, 10)}
+REPLICA_ENDPOINTS = (
+    "dashboard", "my_exercises", "plan", "export_users",
+    "analytics_summary", "analytics_signups", "analytics_top_exercises",
+)
+STICKY_KEY = "_db_primary_until"
+
+
+def engine_options(environ, serving_mode="sync"):
+    """SQLALCHEMY_ENGINE_OPTIONS for one worker process."""
+    default_size, default_overflow = POOL_DEFAULTS.get(serving_mode, POOL_DEFAULTS["sync"])
+    pool_size = int(environ.get("DB_POOL_SIZE", default_size))
+    max_overflow = int(environ.get("DB_MAX_OVERFLOW", default_overflow))
+
+    # DB_CONNECTION_BUDGET connections shared by DB_POOL_PROCESSES processes (pods x workers)
+    budget = int(environ.get("DB_CONNECTION_BUDGET", 0))
+    processes = int(environ.get("DB_POOL_PROCESSES", 0))
+    if budget and processes:
+        per_process = max(1, budget // processes)
+        pool_size = min(pool_size, per_process)
+        max_overflow = max(0, min(max_overflow, per_process - pool_size))
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_pre_ping": True,
+        "pool_recycle": int(environ.get("DB_POOL_RECYCLE", 280)),
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": float(environ.get("DB_POOL_TIMEOUT", 10)),
+    }
+
+
+def replica_binds(environ, user, password, name, port=3306):
+    """SQLALCHEMY_BINDS entries for the configured read replicas (may be empty)."""
+    uris = [uri.strip() for uri in environ.get("DB_REPLICA_URIS", "").split(",") if uri.strip()]
+    hosts = [host.strip() for host in environ.get("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+    uris += [f"mysql+pymysql://{user}:{password}@{host}:{port}/{name}" for host in hosts]
+    return {f"replica_{n}": uri for n, uri in enumerate(uris)}
+
+
+# ------------------------------
+# ReplicaRouter
+# Decides per statement whether a replica may
+# answer it. Installed on the Flask-SQLAlchemy
+# session through RoutingSession.
+# ------------------------------
+class ReplicaRouter:
+    def __init__(self):
+        self.bind_keys = ()
+        self.endpoints = frozenset(REPLICA_ENDPOINTS)
+        self.sticky_seconds = 5.0
+
+    def init_app(self, app):
+        """Read the replica binds and register the request hook."""
+        self.bind_keys = tuple(sorted(
+            key for key in app.config.get("SQLALCHEMY_BINDS", {}) if key.startswith("replica_")
+        ))
+        self.endpoints = frozenset(app.config.get("DB_REPLICA_ENDPOINTS", REPLICA_ENDPOINTS))
+        self.sticky_seconds = app.config.get("DB_REPLICA_STICKY_SECONDS", self.sticky_seconds)
+        app.extensions["replica_router"] = self
+        if self.bind_keys:
+            app.before_request(self._before_request)
+
+    @property
+    def enabled(self):
+        return bool(self.bind_keys)
+
+    def _before_request(self):
+        g.db_read_only = request.method in ("GET", "HEAD") and request.endpoint in self.endpoints
+
+    def engine_for(self, clause):
+        """A replica engine for this statement, or None to use the primary."""
+        if not self.enabled or not has_request_context() or not g.get("db_read_only"):
+            return None
+        if not getattr(clause, "is_select", False) or getattr(clause, "_for_update_arg", None) is not None:
+            return None
+        if g.get("db_wrote"):
+            DB_READ_ROUTING.inc(target="primary_written")
+            return None
+        if session.get(STICKY_KEY, 0) > time.time():
+            DB_READ_ROUTING.inc(target="primary_sticky")
+            return None
+        DB_READ_ROUTING.inc(target="replica")
+        engines = current_app.extensions["sqlalchemy"].engines
+        return engines[random.choice(self.bind_keys)]
+
+    @staticmethod
+    def note_write():
+        if has_request_context():
+            g.db_wrote = True
+
+    def _after_commit(self, db_session):
+        if self.enabled and has_request_context() and g.get("db_wrote"):
+            # Replication lag budget: this member reads from the primary for a while
+            session[STICKY_KEY] = time.time() + self.sticky_seconds
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends eligible SELECTs to a read replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, "is_dml", False):
+                replica_router.note_write()
+            else:
+                replica = replica_router.engine_for(clause)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite leaves foreign keys (and their cascades) off unless asked, per connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+replica_router = ReplicaRouter()
+event.listen(RoutingSession, "after_commit", replica_router._after_commit)
+event.listen(Engine, "connect", enable_sqlite_foreign_keys)
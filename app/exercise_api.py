@@ -0,0 +1,288 @@
+# Summary: ExerciseDB API Client
+# Description:
+# Pooled HTTP client for the ExerciseDB (RapidAPI) endpoints. A single
+# keep-alive requests.Session with connect/read timeouts and retry with
+# backoff is shared by the worker process. search() probes the name,
+# bodyPart and target endpoints in parallel and returns the first non-empty
+# result in that priority order, so a search costs as long as the slowest
+# useful call instead of the sum of all three. Every lookup goes through the
+# upstream guards in app/upstream.py (single-flight, circuit breaker, quota).
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import os
+import threading
+import time
+
+from flask import current_app
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import profiling
+from .metrics import UPSTREAM_LATENCY, UPSTREAM_SHED
+from .rendering import prepare_exercise
+from .upstream import CircuitBreaker, SingleFlight, build_rate_limiter
+
+
+# Builds the three lookup paths for a normalized query, in priority order.
+def search_endpoints(normalized):
+    return [
+        f"/exercises/name/{normalized}",
+        f"/exercises/bodyPart/{normalized}",
+        f"/exercises/target/{normalized}",
+    ]
+
+
+# Seconds from a Retry-After header (delta form only), or None.
+def _retry_after(response):
+    value = response.headers.get("Retry-After", "")
+    return float(value) if value.isdigit() else None
+
+
+# Metric label for an API path: "/exercises/bodyPart/chest" -> "bodyPart".
+def endpoint_label(path):
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    return parts[1] if len(parts) > 2 else parts[0] or "root"
+
+
+# ------------------------------
+# ExerciseAPIClient
+# The session and thread pool are created lazily
+# per process so they are never shared across a
+# gunicorn fork.
+# ------------------------------
+class ExerciseAPIClient:
+    def __init__(self):
+        self.base_url = "https://exercisedb.p.rapidapi.com"
+        self.headers = {}
+        self.connect_timeout = 3.05
+        self.read_timeout = 10
+        self.search_timeout = 15
+        self.retries = 2
+        self.backoff = 0.3
+        self.pool_size = 10
+        self.consecutive_failures = 0
+        self.breaker = CircuitBreaker()
+        self.limiter = None
+        self.flights = SingleFlight()
+        self._session = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read EXERCISE_API_* settings."""
+        self.base_url = app.config["EXERCISE_API_URL"]
+        self.headers = app.config["EXERCISE_API_HEADERS"]
+        self.connect_timeout = app.config.get("EXERCISE_API_CONNECT_TIMEOUT", self.connect_timeout)
+        self.read_timeout = app.config.get("EXERCISE_API_READ_TIMEOUT", self.read_timeout)
+        self.search_timeout = app.config.get("EXERCISE_API_SEARCH_TIMEOUT", self.search_timeout)
+        self.retries = app.config.get("EXERCISE_API_RETRIES", self.retries)
+        self.backoff = app.config.get("EXERCISE_API_BACKOFF", self.backoff)
+        self.pool_size = app.config.get("EXERCISE_API_POOL_SIZE", self.pool_size)
+        self.breaker = CircuitBreaker(
+            failure_threshold=app.config.get("EXERCISE_API_BREAKER_FAILURES", 5),
+            reset_timeout=app.config.get("EXERCISE_API_BREAKER_RESET", 30.0),
+        )
+        self.limiter = build_rate_limiter(
+            app.config.get("EXERCISE_API_RATE_BACKEND", "database"),
+            app.config.get("EXERCISE_API_RATE_LIMIT", 0),
+            app.config.get("EXERCISE_API_RATE_BURST", 10),
+        )
+        self.flights = SingleFlight(wait_timeout=self.search_timeout)
+        self._session = None
+        self._executor = None
+        app.extensions["exercise_api"] = self
+
+    # ---------- Connection Pool ---------- #
+    def _ensure_pool(self):
+        if self._pid == os.getpid() and self._session is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._session is not None:
+                return
+            retry = Retry(
+                total=self.retries,
+                connect=self.retries,
+                read=self.retries,
+                status=self.retries,
+                backoff_factor=self.backoff,
+                status_forcelist=(502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+            session = requests.Session()
+            session.headers.update({k: v for k, v in self.headers.items() if v})
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+            self._session = session
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="exercisedb"
+            )
+            self._pid = os.getpid()
+
+    @property
+    def session(self):
+        self._ensure_pool()
+        return self._session
+
+    def get(self, path, **kwargs):
+        """GET a path on the API with the configured timeouts (timed per endpoint)."""
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = self.session.get(self.base_url + path, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_LATENCY.observe(elapsed, endpoint=endpoint_label(path), status=status)
+            profiling.record_http("GET", self.base_url + path, status, elapsed)
+
+    # ---------- Lookups ---------- #
+    def fetch(self, endpoint):
+        """
+        Call one lookup endpoint. Returns the result list, [] for "no match"
+        (safe to cache as a negative result) or None for transient errors
+        and for calls shed by the circuit breaker or the rate limiter.
+        Concurrent calls for the same endpoint share one upstream request.
+        """
+        return self.flights.do(endpoint, lambda: self._fetch_upstream(endpoint))
+
+    def _fetch_upstream(self, endpoint):
+        if not self.breaker.allow():
+            UPSTREAM_SHED.inc(reason="circuit_open")
+            return None
+        if self.limiter is not None and not self.limiter.acquire():
+            self.breaker.release()
+            UPSTREAM_SHED.inc(reason="rate_limited")
+            return None
+
+        try:
+            response = self.get(endpoint)
+            # A 200 with a non-JSON body (e.g. a proxy error page) is an upstream failure too
+            data = response.json() if response.status_code == 200 else None
+        except requests.RequestException as exc:
+            print(f"[WARN] API request failed for {endpoint}: {exc}")
+            self.consecutive_failures += 1
+            self.breaker.record_failure()
+            return None
+
+        if response.status_code in (200, 404):
+            self.consecutive_failures = 0
+            self.breaker.record_success()
+            if response.status_code == 404:
+                return []
+            # Prepared before caching, so cached results are ready to render
+            return [prepare_exercise(ex) for ex in data] if isinstance(data, list) else []
+        print(f"[WARN] API returned {response.status_code} for {endpoint}")
+        self.consecutive_failures += 1
+        if response.status_code == 429:
+            # Over the RapidAPI quota: stop calling until it resets
+            self.breaker.trip(_retry_after(response))
+        else:
+            self.breaker.record_failure()
+        return None
+
+    # ---------- Media ---------- #
+    def fetch_media(self, url, max_bytes):
+        """
+        Download one image. Returns (content, mimetype), (b"", None) when
+        the upstream has no such image, or None for transient errors, sheds
+        and images larger than max_bytes. Concurrent downloads of one URL
+        share a request; only URLs on the API host count against its circuit
+        breaker and quota, and only they are sent the RapidAPI headers.
+        """
+        return self.flights.do(f"media:{url}", lambda: self._fetch_media_upstream(url, max_bytes))
+
+    def _fetch_media_upstream(self, url, max_bytes):
+        on_api = url.startswith(self.base_url + "/")
+        if on_api and not self.breaker.allow():
+            UPSTREAM_SHED.inc(reason="circuit_open")
+            return None
+        if on_api and self.limiter is not None and not self.limiter.acquire():
+            self.breaker.release()
+            UPSTREAM_SHED.inc(reason="rate_limited")
+            return None
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            # Requests drops session headers set to None: the API key never reaches a CDN
+            headers = None if on_api else {name: None for name in self.headers}
+            with self.session.get(
+                url, headers=headers, stream=True, timeout=(self.connect_timeout, self.read_timeout)
+            ) as response:
+                status = response.status_code
+                if status == 404:
+                    if on_api:
+                        self.breaker.record_success()
+                    return b"", None
+                if status != 200:
+                    print(f"[WARN] Media request returned {status} for {url}")
+                    if on_api and status == 429:
+                        self.breaker.trip(_retry_after(response))
+                    elif on_api:
+                        self.breaker.record_failure()
+                    return None
+                content = bytearray()
+                for chunk in response.iter_content(64 * 1024):
+                    content.extend(chunk)
+                    if len(content) > max_bytes:
+                        print(f"[WARN] Media at {url} exceeds {max_bytes} bytes")
+                        if on_api:
+                            self.breaker.record_success()
+                        return None
+                if on_api:
+                    self.breaker.record_success()
+                mimetype = response.headers.get("Content-Type", "image/gif").split(";")[0].strip()
+                return bytes(content), mimetype
+        except requests.RequestException as exc:
+            print(f"[WARN] Media request failed for {url}: {exc}")
+            if on_api:
+                self.breaker.record_failure()
+            return None
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_LATENCY.observe(elapsed, endpoint="media", status=status)
+            profiling.record_http("GET", url, status, elapsed)
+
+    def search(self, normalized, cache=None):
+        """
+        Probe name, bodyPart and target in parallel and return the first
+        non-empty result in that order. Probes still queued once an answer
+        is known are cancelled; `cache` (a ResponseCache) wraps each probe.
+        """
+        self._ensure_pool()
+        app = current_app._get_current_object()
+        profile = profiling.current()
+
+        def probe(endpoint):
+            with app.app_context():
+                profiling.bind(profile)
+                if cache is None:
+                    return self.fetch(endpoint)
+                return cache.get_or_fetch(endpoint, lambda: self.fetch(endpoint))
+
+        futures = [self._executor.submit(probe, ep) for ep in search_endpoints(normalized)]
+        deadline = time.monotonic() + self.search_timeout
+
+        try:
+            for future in futures:
+                try:
+                    result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    print(f"[WARN] API search for '{normalized}' timed out")
+                    return []
+                if result:
+                    return result
+            return []
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+exercise_api = ExerciseAPIClient()
@@ -0,0 +1,118 @@
+# Summary: Liveness and Readiness Health Checks
+# Description:
+# /health/live answers from memory only: if the process can serve it, it is
+# alive. /health/ready checks the dependencies a request needs (MySQL
+# connectivity, pool saturation and, in lazy startup mode, that the schema
+# migrations have been applied) and reports the ExerciseDB upstream state,
+# with per-dependency latency. Readiness results are cached
+# for HEALTH_CACHE_SECONDS so frequent probes from every kubelet don't add
+# DB load. The upstream never makes a pod unready on its own, because
+# searches can still be answered from the local catalog and cache.
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from . import db
+from .migrations import pending_migrations
+
+
+# ------------------------------
+# HealthChecks
+# ------------------------------
+class HealthChecks:
+    def __init__(self):
+        self.cache_seconds = 5.0
+        self.pool_threshold = 0.9
+        self._cached = None
+        self._cached_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read HEALTH_* settings and register the probe endpoints."""
+        self.cache_seconds = app.config.get("HEALTH_CACHE_SECONDS", self.cache_seconds)
+        self.pool_threshold = app.config.get("HEALTH_POOL_SATURATION", self.pool_threshold)
+        self._cached = None
+        app.extensions["health"] = self
+
+        app.add_url_rule("/health/live", "health_live", self.live)
+        app.add_url_rule("/health/ready", "health_ready", self.ready)
+
+    # ---------- Dependency Checks ---------- #
+    def check_database(self):
+        pool = db.engine.pool
+        result = {"ok": True}
+
+        if isinstance(pool, QueuePool):
+            options = current_app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+            capacity = pool.size() + max(options.get("max_overflow", 10), 0)
+            in_use = pool.checkedout()
+            saturation = in_use / capacity if capacity else 0.0
+            result["pool"] = {"in_use": in_use, "capacity": capacity, "saturation": round(saturation, 2)}
+            if saturation >= self.pool_threshold:
+                # Don't queue behind the requests that exhausted the pool
+                result.update(ok=False, error="connection pool saturated")
+                return result
+
+        started = time.perf_counter()
+        try:
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                if current_app.extensions.get("schema_pending"):
+                    pending = pending_migrations(conn)
+                    if pending:
+                        result.update(ok=False, error=f"{len(pending)} migration(s) pending")
+                    else:
+                        current_app.extensions["schema_pending"] = False
+        except Exception as exc:
+            result.update(ok=False, error=type(exc).__name__)
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    @staticmethod
+    def check_upstream():
+        client = current_app.extensions.get("exercise_api")
+        if client is None:
+            return {"ok": True, "state": "unknown"}
+        circuit = client.breaker.state
+        return {
+            "ok": True,
+            "state": "degraded" if client.consecutive_failures or circuit != "closed" else "healthy",
+            "consecutive_failures": client.consecutive_failures,
+            "circuit": circuit,
+        }
+
+    def run_checks(self):
+        checks = {"database": self.check_database(), "upstream": self.check_upstream()}
+        ready = all(check["ok"] for check in checks.values())
+        return {"status": "ready" if ready else "not_ready", "checks": checks}
+
+    # ---------- Endpoints ---------- #
+    @staticmethod
+    def live():
+        return {"status": "ok"}, 200
+
+    def ready(self):
+        now = time.monotonic()
+        cached = self._cached
+        if cached is None or now - self._cached_at >= self.cache_seconds:
+            # One probe refreshes at a time; concurrent probes get the last result
+            if self._lock.acquire(blocking=cached is None):
+                try:
+                    cached = self._cached = self.run_checks()
+                    self._cached_at = time.monotonic()
+                finally:
+                    self._lock.release()
+                payload = dict(cached, cached=False)
+            else:
+                payload = dict(cached, cached=True)
+        else:
+            payload = dict(cached, cached=True)
+
+        return payload, 200 if payload["status"] == "ready" else 503
+
+
+health_checks = HealthChecks()
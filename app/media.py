@@ -0,0 +1,310 @@
+# Summary: Exercise Media Proxy and Disk Cache
+# Description:
+# Serves exercise GIFs from /media/<exercise_id> so pages never link to
+# third-party media. Each image is fetched from upstream once (through the
+# guarded ExerciseDB client) and kept in a size-bounded on-disk LRU shared
+# by the workers of a pod: MEDIA_CACHE_MAX_BYTES bounds the directory as a
+# whole, whichever worker wrote the files. Responses go out with send_file: Range requests,
+# sendfile when the server provides a file wrapper, a content ETag for
+# If-None-Match and long private cache headers. `?size=thumb` serves a
+# first-frame PNG thumbnail when Pillow is installed and can decode the
+# image (the original image otherwise).
+#
+# The source URL comes from the catalog entry, then a member's saved
+# gif_url (allowed hosts only), then the ExerciseDB image endpoint.
+
+from collections import OrderedDict
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import Response, request, send_file, session
+
+from .metrics import MEDIA_CACHE_BYTES, MEDIA_CACHE_EVENTS
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional
+    Image = None
+
+
+EXERCISE_ID = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+EXTENSIONS = {"image/gif": ".gif", "image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+DEFAULT_ALLOWED_HOSTS = ("exercisedb.io",)
+
+
+# Cache file name: <key hash>-<content hash><ext>; the content hash is the ETag.
+def _file_name(key, etag, ext):
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:24]}-{etag}{ext}"
+
+
+def make_thumbnail(content, size):
+    """
+    First frame of an image as a PNG no larger than size x size, or None
+    without Pillow or when Pillow can't decode the image.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image.seek(0)
+            frame = image.convert("RGBA")
+            frame.thumbnail((size, size))
+            out = io.BytesIO()
+            frame.save(out, format="PNG", optimize=True)
+            return out.getvalue()
+    except Exception as exc:  # corrupt, truncated or unsupported images, decompression bombs
+        print(f"[WARN] Could not make a thumbnail: {exc}")
+        return None
+
+
+# Marks a file as just used; explicit nanoseconds, since the LRU order is the mtime order
+def _touch(path):
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+# ------------------------------
+# MediaCache
+# In-memory LRU index over the files of the
+# cache directory. Every write rescans the
+# directory under a file lock shared by the
+# workers and evicts by mtime across all of
+# them; a file another worker evicted is just
+# a miss.
+# ------------------------------
+class MediaCache:
+    def __init__(self):
+        self.directory = None
+        self.max_bytes = 256 * 1024 * 1024
+        self.max_item_bytes = 5 * 1024 * 1024
+        self.max_age = 7 * 86400
+        self.thumbnail_size = 180
+        self.image_resolution = "180"
+        self.allowed_hosts = DEFAULT_ALLOWED_HOSTS
+        self._index = None
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read MEDIA_* settings and register the /media route."""
+        self.directory = app.config.get("MEDIA_CACHE_DIR") or os.path.join(app.instance_path, "media")
+        self.max_bytes = app.config.get("MEDIA_CACHE_MAX_BYTES", self.max_bytes)
+        self.max_item_bytes = app.config.get("MEDIA_MAX_ITEM_BYTES", self.max_item_bytes)
+        self.max_age = app.config.get("MEDIA_MAX_AGE", self.max_age)
+        self.thumbnail_size = app.config.get("MEDIA_THUMBNAIL_SIZE", self.thumbnail_size)
+        self.image_resolution = app.config.get("MEDIA_IMAGE_RESOLUTION", self.image_resolution)
+        api_host = urlparse(app.config["EXERCISE_API_URL"]).hostname
+        self.allowed_hosts = tuple(app.config.get("MEDIA_ALLOWED_HOSTS", DEFAULT_ALLOWED_HOSTS)) + (api_host,)
+        self._index = None
+        app.extensions["media_cache"] = self
+        app.add_url_rule("/media/<exercise_id>", "media", media_view)
+
+    # ---------- Disk LRU ---------- #
+    @contextmanager
+    def _directory_lock(self):
+        """Exclusive lock over the cache directory, held by one worker of the pod at a time."""
+        with open(os.path.join(self.directory, ".lock"), "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _scan(self):
+        """Rebuild the index from the directory, least recently used first (hold the directory lock)."""
+        files = []
+        for entry in os.scandir(self.directory):
+            name, _, ext = entry.name.partition(".")
+            if entry.is_file() and "-" in name and not entry.name.startswith("tmp"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, name, "." + ext, stat.st_size))
+        index = OrderedDict()
+        for _, name, ext, size in sorted(files):
+            key_hash, etag = name.split("-", 1)
+            stale = index.pop(key_hash, None)
+            if stale is not None:
+                # An older copy of a re-fetched image
+                self._unlink(stale[0])
+            index[key_hash] = (os.path.join(self.directory, name + ext), etag, size)
+        self._index = index
+        self._total = sum(size for _, _, size in index.values())
+        MEDIA_CACHE_BYTES.set(self._total)
+
+    def _ensure_index(self):
+        if self._index is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._directory_lock():
+            self._scan()
+
+    def get(self, key):
+        """(path, etag) of a cached image, or None. Marks it recently used."""
+        key_hash = hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+        with self._lock:
+            self._ensure_index()
+            item = self._index.get(key_hash)
+            if item is None:
+                return None
+            if not os.path.exists(item[0]):
+                del self._index[key_hash]
+                self._total -= item[2]
+                return None
+            self._index.move_to_end(key_hash)
+        try:
+            # mtime orders the LRU for every worker's next scan of the directory
+            _touch(item[0])
+        except OSError:
+            pass
+        return item[0], item[1]
+
+    def put(self, key, content, mimetype):
+        """
+        Store an image atomically, then evict least recently used files of
+        any worker until the directory fits max_bytes; returns (path, etag).
+        """
+        etag = hashlib.sha1(content).hexdigest()[:20]
+        path = os.path.join(self.directory, _file_name(key, etag, EXTENSIONS.get(mimetype, ".bin")))
+
+        with self._lock:
+            self._ensure_index()
+            fd, tmp_path = tempfile.mkstemp(prefix="tmp", dir=self.directory)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(content)
+
+            with self._directory_lock():
+                os.replace(tmp_path, path)
+                _touch(path)
+                # A miss is an upstream fetch anyway; the scan sees every worker's files
+                self._scan()
+                while self._total > self.max_bytes and len(self._index) > 1:
+                    _, (old_path, _, size) = self._index.popitem(last=False)
+                    self._total -= size
+                    self._unlink(old_path)
+                    MEDIA_CACHE_EVENTS.inc(event="evict")
+                MEDIA_CACHE_BYTES.set(self._total)
+        return path, etag
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._ensure_index()
+            with self._directory_lock():
+                self._scan()
+                for path, _, _ in self._index.values():
+                    self._unlink(path)
+                self._index.clear()
+                self._total = 0
+                MEDIA_CACHE_BYTES.set(0)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_index()
+            return len(self._index)
+
+    # ---------- Upstream ---------- #
+    def _allowed(self, url):
+        parsed = urlparse(url or "")
+        host = parsed.hostname or ""
+        return parsed.scheme in ("http", "https") and any(
+            host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts if allowed
+        )
+
+    def source_url(self, exercise_id):
+        """Where an exercise's image lives upstream."""
+        from .catalog import exercise_catalog
+        from .exercise_api import exercise_api
+        from .models import UserExercise
+
+        exercise_catalog.ensure_loaded()
+        entry = exercise_catalog.get(exercise_id)
+        if entry and self._allowed(entry.get("gifUrl")):
+            return entry["gifUrl"]
+        saved = (
+            UserExercise.query.with_entities(UserExercise.gif_url)
+            .filter(UserExercise.exercise_id == exercise_id, UserExercise.gif_url.isnot(None))
+            .first()
+        )
+        if saved and self._allowed(saved.gif_url):
+            return saved.gif_url
+        return f"{exercise_api.base_url}/image?exerciseId={exercise_id}&resolution={self.image_resolution}"
+
+    def load(self, exercise_id, variant):
+        """
+        (path, etag, mimetype) for an exercise image, fetching and caching it
+        on a miss. Returns (None, None, None) when upstream has no image and
+        None when it could not be fetched right now.
+        """
+        from .exercise_api import exercise_api
+
+        key = f"{exercise_id}:{variant}"
+        cached = self.get(key)
+        if cached is not None:
+            MEDIA_CACHE_EVENTS.inc(event="hit")
+            return cached + (_mimetype(cached[0]),)
+        MEDIA_CACHE_EVENTS.inc(event="miss")
+
+        if variant == "thumb":
+            original = self.load(exercise_id, "full")
+            if not original or original[0] is None:
+                return original
+            with open(original[0], "rb") as fh:
+                thumbnail = make_thumbnail(fh.read(), self.thumbnail_size)
+            if thumbnail is None:
+                return original
+            return self.put(key, thumbnail, "image/png") + ("image/png",)
+
+        result = exercise_api.fetch_media(self.source_url(exercise_id), self.max_item_bytes)
+        if result is None:
+            MEDIA_CACHE_EVENTS.inc(event="error")
+            return None
+        content, mimetype = result
+        if not content:
+            return None, None, None
+        return self.put(key, content, mimetype) + (mimetype,)
+
+
+def _mimetype(path):
+    ext = os.path.splitext(path)[1]
+    return next((mimetype for mimetype, known in EXTENSIONS.items() if known == ext), "application/octet-stream")
+
+
+# ---------- Route ---------- #
+def media_view(exercise_id):
+    if "user_id" not in session:
+        return Response(status=401)
+    if not EXERCISE_ID.match(exercise_id):
+        return Response(status=404)
+
+    variant = "thumb" if request.args.get("size") == "thumb" else "full"
+    loaded = media_cache.load(exercise_id, variant)
+    if loaded is None:
+        return Response(status=503, headers={"Retry-After": "30"})
+    path, etag, mimetype = loaded
+    if path is None:
+        return Response(status=404)
+
+    # conditional=True answers If-None-Match with 304 and serves Range requests
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=etag, max_age=media_cache.max_age)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+
+media_cache = MediaCache()
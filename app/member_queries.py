@@ -0,0 +1,132 @@
+# Summary: Member Listing Queries for the Admin Dashboard
+# Description:
+# Server-side filtering, sorting and keyset pagination over the users table.
+# Only the columns the dashboard shows are selected (never password_hash),
+# and the next page starts after the last row's (sort value, id) cursor, so
+# every page costs the same no matter how deep the admin browses.
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+
+from . import db
+from .models import User
+
+
+# Columns rendered by dashboard.html
+MEMBER_COLUMNS = (
+    User.id,
+    User.first_name,
+    User.last_name,
+    User.national_id,
+    User.email,
+    User.age,
+    User.gender,
+    User.subscription,
+    User.role,
+    User.active,
+    User.created_at,
+)
+
+SORT_COLUMNS = {
+    "id": User.id,
+    "created_at": User.created_at,
+}
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+# Parses a YYYY-MM-DD query value, returning None when empty or invalid.
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        return None
+
+
+# Reads dashboard filters from request args into a plain dict.
+def parse_member_filters(args):
+    return {
+        "subscription": args.get("subscription") or None,
+        "gender": args.get("gender") or None,
+        "role": args.get("role") or None,
+        "status": args.get("status") if args.get("status") in ("active", "inactive") else None,
+        "joined_from": _parse_date(args.get("joined_from")),
+        "joined_to": _parse_date(args.get("joined_to")),
+    }
+
+
+# Translates the filter dict into SQLAlchemy WHERE clauses.
+def member_conditions(filters):
+    conditions = []
+    for field in ("subscription", "gender", "role"):
+        if filters.get(field):
+            conditions.append(getattr(User, field) == filters[field])
+    if filters.get("status"):
+        conditions.append(User.active.is_(filters["status"] == "active"))
+    if filters.get("joined_from"):
+        conditions.append(User.created_at >= filters["joined_from"])
+    if filters.get("joined_to"):
+        # Inclusive end date: everything before the following midnight
+        conditions.append(User.created_at < filters["joined_to"] + timedelta(days=1))
+    return conditions
+
+
+def count_members(filters):
+    """COUNT(*) over the filtered members."""
+    return db.session.query(func.count(User.id)).filter(*member_conditions(filters)).scalar()
+
+
+# ---------- Keyset Cursors ---------- #
+def encode_cursor(row, sort):
+    if sort == "created_at":
+        return f"{row.created_at.isoformat()}_{row.id}"
+    return str(row.id)
+
+
+def decode_cursor(cursor, sort):
+    """Returns (sort value, id) or None for a missing/invalid cursor."""
+    if not cursor:
+        return None
+    try:
+        if sort == "created_at":
+            stamp, row_id = cursor.rsplit("_", 1)
+            return datetime.fromisoformat(stamp), int(row_id)
+        return int(cursor), int(cursor)
+    except ValueError:
+        return None
+
+
+def member_page(filters, sort="id", order="asc", after=None, per_page=DEFAULT_PER_PAGE):
+    """
+    Fetch one page of members. Returns (rows, next_cursor); next_cursor is
+    None on the last page.
+    """
+    sort = sort if sort in SORT_COLUMNS else "id"
+    descending = order == "desc"
+    per_page = max(1, min(int(per_page or DEFAULT_PER_PAGE), MAX_PER_PAGE))
+    column = SORT_COLUMNS[sort]
+
+    query = db.session.query(*MEMBER_COLUMNS).filter(*member_conditions(filters))
+
+    cursor = decode_cursor(after, sort)
+    if cursor is not None:
+        value, row_id = cursor
+        if sort == "id":
+            query = query.filter(User.id < row_id if descending else User.id > row_id)
+        elif descending:
+            query = query.filter(or_(column < value, and_(column == value, User.id < row_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, User.id > row_id)))
+
+    order_by = [column] if sort == "id" else [column, User.id]
+    query = query.order_by(*(col.desc() if descending else col.asc() for col in order_by))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1], sort)
+    return rows, next_cursor
@@ -0,0 +1,412 @@
+# Summary: Prometheus-Style Metrics
+# Description:
+# A small dependency-free metrics registry (counters, gauges, histograms with
+# labels) rendered in the Prometheus text exposition format on /metrics.
+# create_app() registers the instrumentation, which records:
+#   - per-endpoint request latency histograms and in-flight gauges
+#   - SQL query latency (SQLAlchemy engine events) and queries per request
+#   - connection pool size / checked-out / overflow, checkout wait time per
+#     pool and where replica-eligible reads ran
+#   - outbound ExerciseDB call latency per endpoint (see exercise_api.py)
+#   - password hashing time and response cache hit/miss counters
+#   - exercise image (media) cache hits, misses, evictions and size
+#   - create_app() startup time per phase (StartupTimer)
+#   - admission control: admitted and queued requests per route class, queue
+#     wait and shed requests (see admission.py)
+#   - /api/v1 response sizes by endpoint and content encoding (see api.py)
+# Values are per worker process; Prometheus scrapes each pod on its own.
+
+from collections import defaultdict
+import threading
+import time
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+# Escapes a label value for the text exposition format.
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ------------------------------
+# Metric Types
+# ------------------------------
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            self._values[self._key(labels)] += amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# ------------------------------
+# Registry
+# collectors are callables run at scrape
+# time to refresh gauges from live objects.
+# ------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as exc:
+                print(f"[WARN] Metrics collector failed: {exc}")
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# ---------- Application Metrics ---------- #
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency by endpoint.", ("endpoint", "method", "status")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently being handled.", ("endpoint",)
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements issued per request.", ("endpoint",),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_LATENCY = registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency by operation.", ("operation",)
+)
+DB_POOL_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled DB connection.", ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL = registry.gauge(
+    "db_pool_connections", "Connection pool state (size, checked_out, overflow).", ("state",)
+)
+DB_READ_ROUTING = registry.counter(
+    "db_read_routing_total", "Reads on replica-eligible requests by where they ran.", ("target",)
+)
+UPSTREAM_LATENCY = registry.histogram(
+    "exercisedb_request_duration_seconds", "Outbound ExerciseDB call latency.", ("endpoint", "status")
+)
+UPSTREAM_CIRCUIT_STATE = registry.gauge(
+    "exercisedb_circuit_state", "ExerciseDB circuit breaker state (0 closed, 1 half-open, 2 open)."
+)
+UPSTREAM_CIRCUIT_TRANSITIONS = registry.counter(
+    "exercisedb_circuit_transitions_total", "ExerciseDB circuit breaker state changes.", ("state",)
+)
+UPSTREAM_SHED = registry.counter(
+    "exercisedb_shed_total", "ExerciseDB calls not made, by reason.", ("reason",)
+)
+UPSTREAM_COALESCED = registry.counter(
+    "exercisedb_coalesced_total", "ExerciseDB lookups that joined an identical in-flight call."
+)
+PASSWORD_HASH_LATENCY = registry.histogram(
+    "password_hash_duration_seconds", "Time spent hashing/verifying passwords per call."
+)
+CACHE_EVENTS = registry.gauge(
+    "exercise_cache_events", "Exercise response cache counters since worker start.", ("event",)
+)
+FRAGMENT_CACHE_EVENTS = registry.counter(
+    "template_fragment_cache_total", "Rendered exercise card lookups by result.", ("event",)
+)
+MEDIA_CACHE_EVENTS = registry.counter(
+    "media_cache_total", "Exercise image cache lookups, evictions and upstream errors.", ("event",)
+)
+MEDIA_CACHE_BYTES = registry.gauge(
+    "media_cache_bytes", "Bytes of exercise images in this worker's view of the disk cache."
+)
+CLASS_BOOKINGS = registry.counter(
+    "class_bookings_total", "Class booking requests by outcome.", ("result",)
+)
+ADMISSION_IN_FLIGHT = registry.gauge(
+    "admission_in_flight", "Requests admitted and running, per route class.", ("route_class",)
+)
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "admission_queue_depth", "Requests waiting for a slot, per route class.", ("route_class",)
+)
+ADMISSION_WAIT = registry.histogram(
+    "admission_wait_seconds", "Time queued requests waited for a slot.", ("route_class",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+ADMISSION_SHED = registry.counter(
+    "admission_shed_total", "Requests refused by admission control.", ("route_class", "reason")
+)
+API_RESPONSE_BYTES = registry.histogram(
+    "api_response_bytes", "Size of /api/v1 response bodies as sent.", ("endpoint", "encoding"),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+STARTUP_PHASES = registry.gauge(
+    "app_startup_phase_seconds", "Time create_app() spent in each startup phase.", ("phase",)
+)
+
+
+# ------------------------------
+# StartupTimer
+# mark(phase) records the time since the previous
+# mark; report() prints one line per boot and
+# exports the phases as gauges.
+# ------------------------------
+class StartupTimer:
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.phases = {}
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        for phase, seconds in self.phases.items():
+            STARTUP_PHASES.set(seconds, phase=phase)
+        STARTUP_PHASES.set(self.total, phase="total")
+        breakdown = " ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in self.phases.items())
+        print(f"[STARTUP] create_app {self.total * 1000:.1f}ms ({breakdown})")
+
+
+# ------------------------------
+# TimedQueuePool
+# QueuePool that records how long each checkout
+# waited for a connection, per pool (primary or
+# replica bind). Enabled through
+# SQLALCHEMY_ENGINE_OPTIONS["poolclass"].
+# ------------------------------
+class TimedQueuePool(QueuePool):
+    pool_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started, pool=self.pool_name)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep its metrics label
+        pool = super().recreate()
+        pool.pool_name = self.pool_name
+        return pool
+
+
+# Classifies a SQL statement as select/insert/update/delete/other.
+def _operation(statement):
+    word = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return word if word in ("select", "insert", "update", "delete") else "other"
+
+
+def _endpoint_label():
+    return request.endpoint or "unmatched"
+
+
+# ------------------------------
+# Metrics Extension
+# ------------------------------
+class Metrics:
+    def __init__(self):
+        self.registry = registry
+        self.engines = []
+        self.registry.add_collector(self._collect_pools)
+
+    def init_app(self, app, db):
+        """Install request hooks, SQL timers, pool collectors and /metrics."""
+        app.extensions["metrics"] = self
+
+        with app.app_context():
+            engines = dict(db.engines)
+        self.engines = list(engines.values())
+        for bind_key, engine in engines.items():
+            if isinstance(engine.pool, TimedQueuePool):
+                engine.pool.pool_name = bind_key or "primary"
+            self._instrument_engine(engine)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/metrics", "metrics", self._metrics_view)
+
+    # ---------- SQL Timing ---------- #
+    @staticmethod
+    def _instrument_engine(engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["query_start"].pop()
+            DB_QUERY_LATENCY.observe(elapsed, operation=_operation(statement))
+            if g and "metrics_start" in g:
+                g.sql_count += 1
+                g.sql_seconds += elapsed
+
+    def _collect_pools(self):
+        size = checked_out = overflow = 0
+        for engine in self.engines:
+            pool = engine.pool
+            if isinstance(pool, QueuePool):
+                size += pool.size()
+                checked_out += pool.checkedout()
+                overflow += max(pool.overflow(), 0)
+        DB_POOL.set(size, state="size")
+        DB_POOL.set(checked_out, state="checked_out")
+        DB_POOL.set(overflow, state="overflow")
+
+    # ---------- Request Hooks ---------- #
+    @staticmethod
+    def _before_request():
+        g.metrics_start = time.perf_counter()
+        g.metrics_endpoint = _endpoint_label()
+        g.sql_count = 0
+        g.sql_seconds = 0.0
+        REQUESTS_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+    @staticmethod
+    def _after_request(response):
+        if "metrics_start" in g:
+            g.metrics_status = response.status_code
+            response.headers.add("Server-Timing", f"db;dur={g.sql_seconds * 1000:.1f}")
+        return response
+
+    @staticmethod
+    def _teardown_request(error=None):
+        if not g or "metrics_start" not in g:
+            return
+        endpoint = g.metrics_endpoint
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - g.metrics_start,
+            endpoint=endpoint,
+            method=request.method,
+            status=g.get("metrics_status", 500),
+        )
+        REQUEST_DB_QUERIES.observe(g.sql_count, endpoint=endpoint)
+        REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+        g.pop("metrics_start")
+
+    def _metrics_view(self):
+        return Response(self.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+metrics = Metrics()
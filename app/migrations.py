@@ -0,0 +1,247 @@
+# Summary: Schema Migrations
+# Description:
+# A small ordered migration runner so the schema is created and upgraded once,
+# by `flask db-upgrade` (run as a Helm job or by hand), instead of every
+# worker running create_all() against MySQL at boot. Applied versions are
+# recorded in the schema_migrations table. Steps must be idempotent because
+# databases created by create_all() already contain everything the models
+# define. Add new steps to the end of MIGRATIONS; never renumber old ones.
+
+from datetime import datetime
+import time
+
+import click
+from flask import current_app
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateIndex
+
+from . import connect_with_retry, db
+
+
+LOCK_NAME = "shviki_schema_migrations"
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# ---------- Helpers for Steps ---------- #
+def _has_index(conn, name, table="user_exercises"):
+    return name in {ix["name"] for ix in inspect(conn).get_indexes(table)}
+
+
+def create_index_if_missing(conn, index):
+    """
+    Create a model-defined sqlalchemy Index unless it already exists. On
+    MySQL the build is online: reads and writes continue while it runs.
+    """
+    if _has_index(conn, index.name, index.table.name):
+        return
+    if conn.dialect.name == "mysql":
+        ddl = str(CreateIndex(index).compile(dialect=conn.dialect))
+        conn.execute(text(f"{ddl} ALGORITHM=INPLACE LOCK=NONE"))
+    else:
+        index.create(conn)
+
+
+# ------------------------------
+# Migration Steps
+# Each step receives an open connection inside
+# a transaction.
+# ------------------------------
+def _baseline(conn):
+    """Tables and indexes as defined by the models (no-op on existing databases)."""
+    db.metadata.create_all(conn, checkfirst=True)
+
+
+def _user_exercise_indexes(conn):
+    """Drop duplicate saves (keeping the oldest), then add the saved-exercise indexes."""
+    from .models import UserExercise
+
+    indexes = {index.name: index for index in UserExercise.__table__.indexes}
+    if not _has_index(conn, "ux_user_exercises_user_exercise"):
+        conn.execute(text(
+            "DELETE FROM user_exercises WHERE id NOT IN ("
+            " SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM user_exercises"
+            " GROUP BY user_id, exercise_id) AS keepers)"
+        ))
+    create_index_if_missing(conn, indexes["ux_user_exercises_user_exercise"])
+    create_index_if_missing(conn, indexes["ix_user_exercises_user_created"])
+
+
+def _user_sessions(conn):
+    """Server-side session table."""
+    from .models import UserSession
+
+    UserSession.__table__.create(conn, checkfirst=True)
+
+
+def _session_revocations(conn):
+    """Revocation log that workers poll to drop their local session copies."""
+    from .models import SessionRevocation
+
+    SessionRevocation.__table__.create(conn, checkfirst=True)
+
+
+def _upstream_quota(conn):
+    """Shared token bucket for the ExerciseDB quota."""
+    from .models import UpstreamQuota
+
+    UpstreamQuota.__table__.create(conn, checkfirst=True)
+
+
+def _plan_columns_and_aggregates(conn):
+    """Sets/reps/day on saved exercises, and the plan aggregates built from existing saves."""
+    from .models import PlanAggregate
+
+    columns = {col["name"] for col in inspect(conn).get_columns("user_exercises")}
+    for name in ("sets", "reps", "day"):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE user_exercises ADD COLUMN {name} SMALLINT"))
+
+    PlanAggregate.__table__.create(conn, checkfirst=True)
+    conn.execute(text("DELETE FROM plan_aggregates"))
+    for dimension, expr, group_by in (
+        ("target", "COALESCE(target, '')", "user_id, COALESCE(target, '')"),
+        ("equipment", "COALESCE(equipment, '')", "user_id, COALESCE(equipment, '')"),
+        ("total", "''", "user_id"),
+    ):
+        conn.execute(text(
+            "INSERT INTO plan_aggregates (user_id, dimension, value, count, updated_at)"
+            f" SELECT user_id, '{dimension}', {expr}, COUNT(*), :now FROM user_exercises"
+            f" GROUP BY {group_by}"
+        ), {"now": datetime.utcnow()})
+
+
+def _analytics_rollups(conn):
+    """Admin analytics rollup table, built from the current users and saves."""
+    from .analytics import rebuild
+    from .models import AnalyticsRollup
+
+    AnalyticsRollup.__table__.create(conn, checkfirst=True)
+    rebuild(conn)
+
+
+def _class_schedule(conn):
+    """Class timetable and booking tables, seeded with the original two classes."""
+    from .models import ClassBooking, ClassSession, GymClass
+    from .schedule import seed_default_classes
+
+    for model in (GymClass, ClassSession, ClassBooking):
+        model.__table__.create(conn, checkfirst=True)
+    seed_default_classes(conn)
+
+
+def _user_cascades_and_active(conn):
+    """users.active, and ON DELETE CASCADE on every foreign key to users.id."""
+    columns = {col["name"] for col in inspect(conn).get_columns("users")}
+    if "active" not in columns:
+        conn.execute(text("ALTER TABLE users ADD COLUMN active BOOLEAN NOT NULL DEFAULT 1"))
+
+    # SQLite can't alter a foreign key; its tables get the cascade when created
+    if conn.dialect.name != "mysql":
+        return
+    for table in ("user_exercises", "plan_aggregates", "class_bookings"):
+        for fk in inspect(conn).get_foreign_keys(table):
+            if fk["referred_table"] != "users" or fk["options"].get("ondelete", "").upper() == "CASCADE":
+                continue
+            # The existing rows already satisfy the key, so skip the re-check and rebuild in place
+            conn.execute(text("SET foreign_key_checks = 0"))
+            try:
+                conn.execute(text(
+                    f"ALTER TABLE {table} DROP FOREIGN KEY {fk['name']},"
+                    f" ADD CONSTRAINT fk_{table}_user_id FOREIGN KEY (user_id)"
+                    " REFERENCES users (id) ON DELETE CASCADE, ALGORITHM=INPLACE, LOCK=NONE"
+                ))
+            finally:
+                conn.execute(text("SET foreign_key_checks = 1"))
+
+
+MIGRATIONS = [
+    (1, "baseline schema", _baseline),
+    (2, "user_exercises unique save + newest-first indexes", _user_exercise_indexes),
+    (3, "user_sessions table", _user_sessions),
+    (4, "upstream_quota table", _upstream_quota),
+    (5, "plan columns + plan_aggregates backfill", _plan_columns_and_aggregates),
+    (6, "analytics_rollups table + backfill", _analytics_rollups),
+    (7, "class schedule and booking tables", _class_schedule),
+    (8, "users.active + ON DELETE CASCADE to users", _user_cascades_and_active),
+    (9, "session_revocations table", _session_revocations),
+]
+
+HEAD = MIGRATIONS[-1][0]
+
+
+# ------------------------------
+# Runner
+# ------------------------------
+def applied_versions(conn):
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_migrations(conn):
+    applied = applied_versions(conn)
+    return [step for step in MIGRATIONS if step[0] not in applied]
+
+
+def upgrade(engine=None, echo=print):
+    """Apply pending migrations in order; returns the versions applied."""
+    engine = engine or db.engine
+    is_mysql = engine.dialect.name == "mysql"
+    applied = []
+
+    with engine.connect() as conn:
+        if is_mysql:
+            # Several pods or jobs may start at once; only one migrates
+            conn.execute(text("SELECT GET_LOCK(:name, 300)"), {"name": LOCK_NAME})
+        try:
+            schema_migrations.create(conn, checkfirst=True)
+            pending = pending_migrations(conn)
+            conn.commit()
+            for version, description, step in pending:
+                started = time.perf_counter()
+                with conn.begin():
+                    step(conn)
+                    conn.execute(schema_migrations.insert().values(
+                        version=version, description=description, applied_at=datetime.utcnow()
+                    ))
+                echo(f"Applied migration {version} ({description}) in "
+                     f"{(time.perf_counter() - started) * 1000:.0f}ms")
+                applied.append(version)
+        finally:
+            if is_mysql:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+    return applied
+
+
+# ---------- CLI ---------- #
+@click.command("db-upgrade")
+@click.option("--retries", default=30, show_default=True, help="Connection attempts before failing.")
+def db_upgrade_command(retries):
+    """Create or upgrade the schema to the latest migration."""
+    connect_with_retry(current_app, retries=retries)
+    applied = upgrade(echo=click.echo)
+    click.echo(f"Schema at version {HEAD} ({len(applied)} migration(s) applied).")
+
+
+@click.command("db-status")
+def db_status_command():
+    """List migrations that have not been applied yet."""
+    with db.engine.connect() as conn:
+        pending = pending_migrations(conn)
+    if not pending:
+        click.echo(f"Schema is up to date (version {HEAD}).")
+    for version, description, _ in pending:
+        click.echo(f"  pending {version}: {description}")
+
+
+def init_app(app):
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_status_command)
@@ -15,6 +15,11 @@ from . import db
 # ------------------------------
 class User(db.Model):
     __tablename__ = "users"
+    __table_args__ = (
+        # Dashboard keyset pagination / filters
+        db.Index("ix_users_created_at_id", "created_at", "id"),
+        db.Index("ix_users_subscription", "subscription"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
@@ -22,17 +27,39 @@ class User(db.Model):
     national_id = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    age = db.Column(db.Integer)
-    gender = db.Column(db.String(20))
-    subscription = db.Column(db.String(50))
-    role = db.Column(db.String(20), default="user")
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Fields the analytics rollups count by load their committed value before a
+    # change (active_history), so the flush hooks know which bucket to leave
+    age = db.column_property(db.Column(db.Integer), active_history=True)
+    gender = db.column_property(db.Column(db.String(20)), active_history=True)
+    subscription = db.column_property(db.Column(db.String(50)), active_history=True)
+    role = db.column_property(db.Column(db.String(20), default="user"), active_history=True)
+    # Deactivated members keep their data but can't sign in
+    active = db.Column(db.Boolean, nullable=False, default=True, server_default="1")
+    created_at = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
+
+    # Child rows reference users with ON DELETE CASCADE; passive_deletes lets
+    # the database remove them instead of loading each one before a delete.
 
     # Relationship to saved exercises
     exercises = db.relationship(
         "UserExercise",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    # Per-member plan counters (target muscle / equipment)
+    plan_aggregates = db.relationship(
+        "PlanAggregate",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
+    # Class bookings (seats are released by schedule.cancel_all before a delete)
+    class_bookings = db.relationship(
+        "ClassBooking",
+        cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 
@@ -44,15 +71,207 @@ class User(db.Model):
 # ------------------------------
 class UserExercise(db.Model):
     __tablename__ = "user_exercises"
+    __table_args__ = (
+        # One row per (member, exercise); also serves user_id lookups
+        db.Index("ux_user_exercises_user_exercise", "user_id", "exercise_id", unique=True),
+        # "My exercises" newest-first keyset pages
+        db.Index("ix_user_exercises_user_created", "user_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     exercise_id = db.Column(db.String(50), nullable=False)
     exercise_name = db.Column(db.String(255), nullable=False)
     target = db.Column(db.String(100))
     equipment = db.Column(db.String(100))
     gif_url = db.Column(db.Text)
+    # Plan details: day 0 = Monday ... 6 = Sunday, None = not scheduled
+    sets = db.Column(db.SmallInteger)
+    reps = db.Column(db.SmallInteger)
+    day = db.Column(db.SmallInteger)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Back-reference to User
     user = db.relationship("User", back_populates="exercises")
+
+
+# ------------------------------
+# PlanAggregate Model
+# Incrementally maintained counts of a member's
+# saved exercises per target muscle and per
+# equipment (see app/plans.py). dimension is
+# "target", "equipment" or "total" (value "").
+# ------------------------------
+class PlanAggregate(db.Model):
+    __tablename__ = "plan_aggregates"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ------------------------------
+# AnalyticsRollup Model
+# Materialized admin statistics: one counter per
+# (dimension, value), e.g. ("subscription",
+# "Monthly") or ("exercise", "0001") with the
+# exercise name as label (see app/analytics.py).
+# ------------------------------
+class AnalyticsRollup(db.Model):
+    __tablename__ = "analytics_rollups"
+    __table_args__ = (
+        # Top-N per dimension (most-saved exercises)
+        db.Index("ix_analytics_rollups_dimension_count", "dimension", "count"),
+    )
+
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    label = db.Column(db.String(255))
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ------------------------------
+# GymClass Model
+# A weekly class in the gym timetable.
+# weekdays holds Monday=0 day numbers ("6,1,3");
+# start_time is local "HH:MM".
+# ------------------------------
+class GymClass(db.Model):
+    __tablename__ = "gym_classes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.String(255))
+    weekdays = db.Column(db.String(20), nullable=False)
+    start_time = db.Column(db.String(5), nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60)
+    level = db.Column(db.String(50))
+    coach = db.Column(db.String(100))
+    room = db.Column(db.String(50))
+    capacity = db.Column(db.Integer, nullable=False, default=20)
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ------------------------------
+# ClassSession Model
+# One dated occurrence of a class with its seat
+# counters. booked only changes through the
+# conditional UPDATEs in app/schedule.py.
+# ------------------------------
+class ClassSession(db.Model):
+    __tablename__ = "class_sessions"
+    __table_args__ = (
+        db.Index("ux_class_sessions_class_starts", "class_id", "starts_at", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    class_id = db.Column(db.Integer, db.ForeignKey("gym_classes.id"), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    booked = db.Column(db.Integer, nullable=False, default=0)
+    waitlisted = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ------------------------------
+# ClassBooking Model
+# A member's seat ("booked") or waitlist place
+# ("waitlisted") in a class session; waitlist
+# order is created_at, id.
+# ------------------------------
+class ClassBooking(db.Model):
+    __tablename__ = "class_bookings"
+    __table_args__ = (
+        db.Index("ux_class_bookings_session_user", "session_id", "user_id", unique=True),
+        db.Index("ix_class_bookings_session_status", "session_id", "status", "created_at"),
+        db.Index("ix_class_bookings_user", "user_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey("class_sessions.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ------------------------------
+# CatalogExercise Model
+# Local mirror of the ExerciseDB dataset.
+# The full API payload is kept as JSON in
+# `data`; the other columns are for lookups.
+# ------------------------------
+class CatalogExercise(db.Model):
+    __tablename__ = "exercise_catalog"
+
+    id = db.Column(db.String(50), primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    body_part = db.Column(db.String(100))
+    target = db.Column(db.String(100))
+    equipment = db.Column(db.String(100))
+    data = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ------------------------------
+# ApiCacheEntry Model
+# Shared response cache for ExerciseDB lookups
+# (used when EXERCISE_CACHE_BACKEND=database).
+# Timestamps are Unix epoch seconds.
+# ------------------------------
+class ApiCacheEntry(db.Model):
+    __tablename__ = "api_cache"
+
+    key = db.Column(db.String(255), primary_key=True)
+    value = db.Column(db.Text, nullable=False)
+    fresh_until = db.Column(db.Float, nullable=False)
+    stale_until = db.Column(db.Float, nullable=False)
+    accessed_at = db.Column(db.Float, nullable=False, index=True)
+
+
+# ------------------------------
+# UserSession Model
+# Server-side session data (SESSION_BACKEND=database).
+# user_id is indexed so all of a member's sessions
+# can be revoked at once; expires_at is Unix epoch
+# seconds.
+# ------------------------------
+class UserSession(db.Model):
+    __tablename__ = "user_sessions"
+
+    sid = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, index=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+
+# ------------------------------
+# SessionRevocation Model
+# One row per member whose sessions were revoked,
+# polled by every worker to drop its local copies
+# (SESSION_BACKEND=database). revoked_at is Unix
+# epoch seconds.
+# ------------------------------
+class SessionRevocation(db.Model):
+    __tablename__ = "session_revocations"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    revoked_at = db.Column(db.Float, nullable=False, index=True)
+
+
+# ------------------------------
+# UpstreamQuota Model
+# Token bucket shared by every worker and replica
+# for an outbound API quota
+# (EXERCISE_API_RATE_BACKEND=database).
+# updated_at is Unix epoch seconds.
+# ------------------------------
+class UpstreamQuota(db.Model):
+    __tablename__ = "upstream_quota"
+
+    name = db.Column(db.String(64), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
@@ -0,0 +1,140 @@
+# Summary: Password Hashing Service
+# Description:
+# Runs Werkzeug password hashing and verification off the request thread on
+# a small bounded executor. At most PASSWORD_HASH_WORKERS hashes run at once
+# and PASSWORD_HASH_MAX_QUEUE more may wait; beyond that HashingBusy is raised
+# and the request is answered with 503 + Retry-After instead of piling up
+# CPU-bound work. A hash that outlives its caller's PASSWORD_HASH_TIMEOUT
+# keeps its slot until it finishes. The algorithm and cost come from
+# PASSWORD_HASH_METHOD, and stored hashes made with older settings are
+# upgraded on the next login.
+# Time spent hashing is reported per request in the Server-Timing header.
+
+from concurrent.futures import TimeoutError as FutureTimeout
+import os
+import threading
+import time
+
+from flask import g
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from .metrics import PASSWORD_HASH_LATENCY
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full (or a hash timed out)."""
+
+
+# ------------------------------
+# PasswordHasher
+# ------------------------------
+class PasswordHasher:
+    def __init__(self):
+        self.method = "scrypt:32768:8:1"
+        self.max_workers = 2
+        self.max_queue = 8
+        self.timeout = 10
+        self.cooperative = False
+        self._canonical_method = None
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read PASSWORD_HASH_* settings and install the 503 handler and timing header."""
+        self.method = app.config.get("PASSWORD_HASH_METHOD", self.method)
+        self.max_workers = app.config.get("PASSWORD_HASH_WORKERS", self.max_workers)
+        self.max_queue = app.config.get("PASSWORD_HASH_MAX_QUEUE", self.max_queue)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", self.timeout)
+        self.cooperative = app.config.get("SERVING_MODE") == "gevent"
+        self._canonical_method = None
+        self._executor = None
+        app.extensions["password_hasher"] = self
+
+        app.register_error_handler(HashingBusy, self._busy_response)
+        app.after_request(self._add_timing_header)
+
+    # ---------- Executor ---------- #
+    def _ensure_pool(self):
+        if self._pid == os.getpid() and self._executor is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._executor is not None:
+                return
+            if self.cooperative:
+                # Real OS threads, so hashing never blocks the gevent hub
+                from gevent.threadpool import ThreadPoolExecutor
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+            self._pid = os.getpid()
+
+    def _run(self, fn, *args, **kwargs):
+        self._ensure_pool()
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+
+        started = time.perf_counter()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash itself finishes, not until the caller gives up,
+        # so timed-out hashes still count against the concurrency limit
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued: drop it (releasing its slot); already running: let it finish
+            future.cancel()
+            raise HashingBusy()
+        finally:
+            elapsed = time.perf_counter() - started
+            PASSWORD_HASH_LATENCY.observe(elapsed)
+            if g:
+                g.hash_seconds = g.get("hash_seconds", 0.0) + elapsed
+
+    # ---------- Public API ---------- #
+    def hash(self, password):
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    @property
+    def canonical_method(self):
+        """The method prefix Werkzeug writes for PASSWORD_HASH_METHOD (defaults filled in)."""
+        if self._canonical_method is None:
+            self._canonical_method = generate_password_hash("", method=self.method).split("$", 1)[0]
+        return self._canonical_method
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split("$", 1)[0] != self.canonical_method
+
+    def check(self, user, password):
+        """
+        Verify a login. When the stored hash uses outdated parameters it is
+        replaced on `user` (the caller commits).
+        """
+        if not self.verify(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            user.password_hash = self.hash(password)
+        return True
+
+    # ---------- Flask Hooks ---------- #
+    @staticmethod
+    def _busy_response(error):
+        return "Too many sign-ins in progress, please retry in a moment.", 503, {"Retry-After": "2"}
+
+    @staticmethod
+    def _add_timing_header(response):
+        if "hash_seconds" in g:
+            response.headers.add("Server-Timing", f"hash;dur={g.hash_seconds * 1000:.1f}")
+        return response
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,126 @@
+# Summary: Workout Plans and Plan Aggregates
+# Description:
+# A member's plan is their saved exercises (user_exercises) with sets, reps
+# and a training day. Summaries such as "muscles covered" or "equipment
+# needed" come from the plan_aggregates table: per-member counts by target
+# muscle and equipment plus a total, adjusted in the same transaction as
+# every save and delete (apply_delta) instead of re-scanning the member's
+# saved rows on each page view.
+
+from collections import Counter
+from datetime import datetime
+
+from . import db
+from .models import PlanAggregate, UserExercise
+
+
+DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+DIMENSIONS = ("target", "equipment")
+MAX_SETS = 20
+MAX_REPS = 200
+
+
+# ---------- Aggregates ---------- #
+def _increment_statement(rows):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(PlanAggregate).values(rows)
+        return stmt.on_duplicate_key_update(
+            count=PlanAggregate.count + stmt.inserted.count,
+            updated_at=stmt.inserted.updated_at,
+        )
+
+    from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(PlanAggregate).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "dimension", "value"],
+        set_={"count": PlanAggregate.count + stmt.excluded.count, "updated_at": stmt.excluded.updated_at},
+    )
+
+
+def apply_delta(user_id, added=(), removed=()):
+    """
+    Adjust a member's aggregates for saved exercises added and removed,
+    each given as (target, equipment). Runs in the caller's transaction;
+    the caller commits.
+    """
+    deltas = Counter()
+    for sign, entries in ((1, added), (-1, removed)):
+        for target, equipment in entries:
+            deltas[("target", target or "")] += sign
+            deltas[("equipment", equipment or "")] += sign
+            deltas[("total", "")] += sign
+
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "dimension": dimension, "value": value[:100], "count": delta, "updated_at": now}
+        for (dimension, value), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    db.session.execute(_increment_statement(rows))
+    if any(row["count"] < 0 for row in rows):
+        PlanAggregate.query.filter(
+            PlanAggregate.user_id == user_id, PlanAggregate.count <= 0
+        ).delete(synchronize_session=False)
+
+
+def plan_summary(user_id):
+    """
+    Counts for a member's plan from the aggregates: total, per target and
+    per equipment (largest first) and when they last changed.
+    """
+    summary = {"total": 0, "target": [], "equipment": [], "updated_at": None}
+    for row in PlanAggregate.query.filter_by(user_id=user_id):
+        if row.dimension == "total":
+            summary["total"] = row.count
+        elif row.dimension in DIMENSIONS:
+            summary[row.dimension].append((row.value or "unspecified", row.count))
+        if summary["updated_at"] is None or (row.updated_at and row.updated_at > summary["updated_at"]):
+            summary["updated_at"] = row.updated_at
+    for dimension in DIMENSIONS:
+        summary[dimension].sort(key=lambda item: (-item[1], item[0]))
+    return summary
+
+
+# ---------- Schedule ---------- #
+def plan_by_day(user_id):
+    """A member's saved exercises grouped by day name, unscheduled ones last."""
+    rows = (
+        UserExercise.query.filter_by(user_id=user_id)
+        .order_by(UserExercise.created_at, UserExercise.id)
+        .all()
+    )
+    grouped = {day: [] for day in DAYS + ("Unscheduled",)}
+    for row in rows:
+        grouped[DAYS[row.day] if row.day is not None else "Unscheduled"].append(row)
+    return {day: entries for day, entries in grouped.items() if entries}
+
+
+def _bounded(value, low, high):
+    """An int within [low, high], None for blank input; ValueError otherwise."""
+    if value in (None, ""):
+        return None
+    number = int(value)
+    if not low <= number <= high:
+        raise ValueError(f"{number} is outside {low}-{high}")
+    return number
+
+
+def parse_plan_fields(source):
+    """Sets, reps and day from a form or JSON dict; raises ValueError on bad input."""
+    return {
+        "sets": _bounded(source.get("sets"), 1, MAX_SETS),
+        "reps": _bounded(source.get("reps"), 1, MAX_REPS),
+        "day": _bounded(source.get("day"), 0, len(DAYS) - 1),
+    }
+
+
+def update_plan_entry(user_id, saved_id, sets=None, reps=None, day=None):
+    """Set sets/reps/day on one of the member's saved exercises; True if it exists."""
+    updated = UserExercise.query.filter_by(id=saved_id, user_id=user_id).update(
+        {"sets": sets, "reps": reps, "day": day}, synchronize_session=False
+    )
+    db.session.commit()
+    return updated > 0
@@ -0,0 +1,320 @@
+# Summary: On-Demand Request Profiling and Slow-Request Capture
+# Description:
+# Profiles single requests in production without a debugger:
+#   - an admin adds `X-Profile: 1` (or `?_profile=1`) to a request, or a
+#     PROFILE_SAMPLE_RATE fraction of all traffic is picked at random
+#   - a profiled request records a stack profile (a sampler thread reading
+#     the request thread's frames every PROFILE_SAMPLE_INTERVAL, or cProfile
+#     under gevent, where greenlets don't show up as threads), every SQL
+#     statement and every outbound ExerciseDB / media call with timings
+#   - profiles of flagged requests, and of any request slower than
+#     PROFILE_SLOW_SECONDS, go into a per-worker ring buffer of
+#     PROFILE_BUFFER_SIZE entries; slow requests that weren't profiled are
+#     kept too, with their SQL totals from app/metrics.py; entries are stored
+#     when the server closes the response, so a streamed body counts in full
+# /admin/profiles lists the buffer; each entry downloads as folded stacks
+# (flamegraph.pl, speedscope) or a .prof file (pstats, snakeviz).
+# When a request isn't profiled the hooks cost one random() and a few
+# dictionary lookups.
+
+from collections import Counter, deque
+import cProfile
+from datetime import datetime
+import io
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+
+from flask import Response, abort, g, render_template, request, session
+from sqlalchemy import event
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ARG = "_profile"
+MAX_STATEMENT_CHARS = 500
+MAX_STACK_DEPTH = 100
+
+
+# "app/catalog.py:search" style frame names, outermost first, joined by ";"
+def fold_stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# ------------------------------
+# StackSampler
+# Background thread that samples one thread's
+# Python stack at a fixed interval.
+# ------------------------------
+class StackSampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold_stack(frame)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+# ------------------------------
+# RequestProfile
+# Everything captured for one profiled request.
+# ------------------------------
+class RequestProfile:
+    def __init__(self, trigger, mode, max_queries):
+        self.trigger = trigger
+        self.mode = mode
+        self.max_queries = max_queries
+        self.queries = []
+        self.http = []
+        self.dropped_queries = 0
+        self.stacks = None
+        self.pstats_text = None
+        self.pstats_data = None
+        self._sampler = None
+        self._cprofile = None
+
+    def start(self, profiler):
+        if self.mode == "cprofile" and profiler.cprofile_lock.acquire(blocking=False):
+            # One cProfile per process at a time; concurrent profiles fall back to sampling
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+            return
+        self.mode = "sample"
+        self._sampler = StackSampler(threading.get_ident(), profiler.sample_interval)
+        self._sampler.start()
+
+    def stop(self, profiler):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            profiler.cprofile_lock.release()
+            self._cprofile.create_stats()
+            self.pstats_data = marshal.dumps(self._cprofile.stats)
+            text = io.StringIO()
+            pstats.Stats(self._cprofile, stream=text).sort_stats("cumulative").print_stats(40)
+            self.pstats_text = text.getvalue()
+            self._cprofile = None
+        elif self._sampler is not None:
+            self.stacks = self._sampler.stop()
+            self._sampler = None
+
+    def add_query(self, statement, seconds):
+        if len(self.queries) >= self.max_queries:
+            self.dropped_queries += 1
+            return
+        self.queries.append((round(seconds * 1000, 2), " ".join(statement.split())[:MAX_STATEMENT_CHARS]))
+
+
+# ------------------------------
+# Profiler
+# Request hooks, SQL listeners and the ring
+# buffer of captured requests (per worker).
+# ------------------------------
+class Profiler:
+    def __init__(self):
+        self.sample_rate = 0.0
+        self.slow_seconds = 1.0
+        self.sample_interval = 0.005
+        self.max_queries = 200
+        self.mode = "sample"
+        self.cprofile_lock = threading.Lock()
+        self._entries = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        """Read PROFILE_* settings, install the hooks and register the admin pages."""
+        self.sample_rate = app.config.get("PROFILE_SAMPLE_RATE", self.sample_rate)
+        self.slow_seconds = app.config.get("PROFILE_SLOW_SECONDS", self.slow_seconds)
+        self.sample_interval = app.config.get("PROFILE_SAMPLE_INTERVAL", self.sample_interval)
+        self.max_queries = app.config.get("PROFILE_MAX_QUERIES", self.max_queries)
+        default_mode = "cprofile" if app.config.get("SERVING_MODE") == "gevent" else "sample"
+        self.mode = app.config.get("PROFILE_MODE") or default_mode
+        self._entries = deque(maxlen=app.config.get("PROFILE_BUFFER_SIZE", 50))
+        app.extensions["profiler"] = self
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            self._instrument_engine(engine)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule("/admin/profiles", "profiles", profiles_view)
+        app.add_url_rule("/admin/profiles/<profile_id>", "profile_detail", profiles_view)
+        app.add_url_rule("/admin/profiles/<profile_id>/download", "profile_download", download_view)
+
+    # ---------- Capture ---------- #
+    @staticmethod
+    def _instrument_engine(engine):
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if g and "profile" in g:
+                conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get("profile_start")
+            if starts and g and "profile" in g:
+                g.profile.add_query(statement, time.perf_counter() - starts.pop())
+
+    def _trigger(self):
+        if request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_ARG):
+            # Silently ignored for everyone but admins
+            return "flag" if session.get("role") == "admin" else None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def _before_request(self):
+        g.profile_start = time.perf_counter()
+        trigger = self._trigger()
+        if trigger is None:
+            return
+        profile = RequestProfile(trigger, self.mode, self.max_queries)
+        g.profile = profile
+        g.profile_id = uuid.uuid4().hex[:12]
+        profile.start(self)
+
+    def _after_request(self, response):
+        if "profile_start" not in g:
+            return response
+        if "profile" in g and g.profile.trigger == "flag":
+            response.headers["X-Profile-Id"] = g.profile_id
+        # Finished once the body has been sent, so a streamed page is timed and profiled in full
+        started, profile, profile_id = g.pop("profile_start"), g.pop("profile", None), g.pop("profile_id", None)
+        details = self._request_details(response.status_code)
+        request_g = g._get_current_object()
+        response.call_on_close(lambda: self._finish(started, profile, profile_id, details, request_g))
+        return response
+
+    def _teardown_request(self, error=None):
+        # Only reached with the profile still in g when no response was made
+        if not g or "profile_start" not in g:
+            return
+        started, profile, profile_id = g.pop("profile_start"), g.pop("profile", None), g.pop("profile_id", None)
+        self._finish(started, profile, profile_id, self._request_details(500), g._get_current_object())
+
+    @staticmethod
+    def _request_details(status):
+        return {
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint or "unmatched",
+            "status": status,
+        }
+
+    def _finish(self, started, profile, profile_id, details, request_g):
+        elapsed = time.perf_counter() - started
+        if profile is not None:
+            profile.stop(self)
+        if profile is None and elapsed < self.slow_seconds:
+            return
+        if profile is not None and profile.trigger == "sampled" and elapsed < self.slow_seconds:
+            return
+
+        self.store({
+            "id": profile_id or uuid.uuid4().hex[:12],
+            "at": datetime.utcnow(),
+            **details,
+            "duration_ms": round(elapsed * 1000, 1),
+            "sql_count": getattr(request_g, "sql_count", 0),
+            "sql_ms": round(getattr(request_g, "sql_seconds", 0.0) * 1000, 1),
+            "trigger": profile.trigger if profile is not None else "slow",
+            "profile": profile,
+        })
+
+    # ---------- Ring Buffer ---------- #
+    def store(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self):
+        """Captured requests, newest first."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def get(self, profile_id):
+        return next((entry for entry in self.entries() if entry["id"] == profile_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def current():
+    """The profile of the request being served in this context, if any."""
+    return g.get("profile") if g else None
+
+
+def bind(profile):
+    """Attach a request's profile to a worker thread's app context (parallel API probes)."""
+    if profile is not None:
+        g.profile = profile
+
+
+def record_http(method, url, status, seconds):
+    """Note an outbound call on the current request's profile (no-op when not profiling)."""
+    profile = current()
+    if profile is not None:
+        profile.http.append((method, url, status, round(seconds * 1000, 2)))
+
+
+# ---------- Admin Endpoints ---------- #
+def profiles_view(profile_id=None):
+    if session.get("role") != "admin":
+        abort(403)
+    selected = profiler.get(profile_id) if profile_id else None
+    if profile_id and selected is None:
+        abort(404)
+    return render_template(
+        "admin_profiles.html",
+        entries=profiler.entries(),
+        selected=selected,
+        slow_ms=profiler.slow_seconds * 1000,
+        sample_rate=profiler.sample_rate,
+    )
+
+
+def download_view(profile_id):
+    if session.get("role") != "admin":
+        abort(403)
+    entry = profiler.get(profile_id)
+    profile = entry and entry["profile"]
+    if profile is None:
+        abort(404)
+
+    if profile.pstats_data is not None:
+        return Response(profile.pstats_data, mimetype="application/octet-stream", headers={
+            "Content-Disposition": f"attachment; filename=profile-{profile_id}.prof",
+        })
+    # Folded stacks: one "frame;frame;frame count" line per distinct stack
+    lines = "".join(f"{stack} {count}\n" for stack, count in (profile.stacks or Counter()).most_common())
+    return Response(lines, mimetype="text/plain", headers={
+        "Content-Disposition": f"attachment; filename=profile-{profile_id}.folded",
+    })
+
+
+profiler = Profiler()
@@ -0,0 +1,157 @@
+# Summary: Page Rendering Helpers for the List Pages
+# Description:
+# Keeps the heavy list pages (exercise search, My Exercises, the admin
+# dashboard) cheap to render:
+#   - derived per-exercise fields (YouTube link, card fingerprint) are
+#     computed once when an exercise enters the catalog or the API cache
+#   - rendered result cards are kept in a bounded LRU keyed by exercise id
+#     and fingerprint, so a popular card is rendered once per process
+#   - render_page() returns the rendered page as a response for conditional()
+#   - ETag / Last-Modified validators let repeat visits answer 304 before
+#     any rendering happens
+# The page templates are compiled at startup instead of on first request.
+
+from collections import OrderedDict
+from datetime import timezone
+import hashlib
+import threading
+from urllib.parse import quote_plus
+
+from flask import current_app, render_template, request, session
+from markupsafe import Markup
+
+from .metrics import FRAGMENT_CACHE_EVENTS
+
+# Compiled at startup (shared by workers when Gunicorn preloads the app)
+PRELOADED_TEMPLATES = (
+    "base.html",
+    "exercises.html",
+    "_exercise_card.html",
+    "my_exercises.html",
+    "dashboard.html",
+)
+
+# Fields shown on a result card; a change to any of them changes the fingerprint
+CARD_FIELDS = ("id", "name", "target", "equipment", "bodyPart", "difficulty", "gifUrl")
+
+
+def prepare_exercise(entry):
+    """Return a copy of an ExerciseDB entry with its derived display fields."""
+    name = entry.get("name") or ""
+    fingerprint = hashlib.sha1(
+        "\x1f".join(str(entry.get(field) or "") for field in CARD_FIELDS).encode("utf-8")
+    ).hexdigest()[:16]
+    return dict(
+        entry,
+        youtubeUrl=f"https://www.youtube.com/results?search_query={quote_plus(name)}+exercise",
+        cardKey=fingerprint,
+    )
+
+
+def ensure_prepared(entries):
+    """Prepare entries that predate prepare_exercise (e.g. old cache rows)."""
+    return [ex if "cardKey" in ex else prepare_exercise(ex) for ex in entries]
+
+
+# Formats a datetime column as YYYY-MM-DD (template filter `ymd`).
+def ymd(value):
+    return value.isoformat()[:10] if value else "N/A"
+
+
+# ------------------------------
+# FragmentCache
+# Bounded per-process LRU of rendered
+# exercise cards (Markup strings).
+# ------------------------------
+class FragmentCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read RENDER_* settings, register the template helpers and compile the page templates."""
+        self.max_entries = app.config.get("RENDER_FRAGMENT_CACHE_SIZE", self.max_entries)
+        self.clear()
+        app.extensions["fragment_cache"] = self
+        app.jinja_env.filters["ymd"] = ymd
+        app.jinja_env.globals["exercise_card"] = self.exercise_card
+        for name in PRELOADED_TEMPLATES:
+            app.jinja_env.get_template(name)
+
+    def exercise_card(self, ex):
+        """Rendered card for one prepared exercise, from the cache when possible."""
+        key = (str(ex.get("id")), ex.get("cardKey"))
+        with self._lock:
+            html = self._data.get(key)
+            if html is not None:
+                self._data.move_to_end(key)
+        if html is not None:
+            FRAGMENT_CACHE_EVENTS.inc(event="hit")
+            return html
+
+        FRAGMENT_CACHE_EVENTS.inc(event="miss")
+        html = Markup(render_template("_exercise_card.html", ex=ex))
+        with self._lock:
+            self._data[key] = html
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ---------- Page Rendering ---------- #
+def render_page(template, **context):
+    """
+    Response for a whole rendered page, ready for conditional(). Pages are
+    rendered before they are sent: the list pages are paged and their cards
+    come from the fragment cache, so there is little to gain from streaming.
+    """
+    return current_app.response_class(render_template(template, **context))
+
+
+# ---------- Conditional Responses ---------- #
+def page_etag(*parts):
+    """Weak validator for a page built from `parts` for the signed-in member."""
+    digest = hashlib.sha1(repr((session.get("user_id"), session.get("role")) + parts).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def not_modified(etag, last_modified=None):
+    """
+    True when the client's copy is current: If-None-Match wins when present,
+    otherwise If-Modified-Since is compared at one-second precision. Pages
+    with pending flash messages are always rendered.
+    """
+    if "_flashes" in session:
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return _utc(last_modified).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(response, etag, last_modified=None):
+    """Attach the validators and cache headers to a page response (200 or 304)."""
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = _utc(last_modified)
+    # Pages are per member: browsers may keep them but must revalidate
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Cookie")
+    return response
+
+
+def _utc(value):
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+fragment_cache = FragmentCache()
+
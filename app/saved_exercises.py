@@ -0,0 +1,131 @@
+# Summary: Saved Exercise Queries
+# Description:
+# Data access for a member's saved exercises (the user_exercises table).
+# Every statement is served by an index:
+#   - save:   one INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE
+#             on the unique (user_id, exercise_id) index, so saving twice
+#             refreshes the row instead of creating a duplicate
+#   - list:   newest first, keyset-paginated on (user_id, created_at) with
+#             the (created_at, id) cursor used by the admin dashboard
+#   - delete: rows locked by primary key, then one DELETE, scoped to the owner
+# save_many / delete_many apply a whole batch in one transaction, and every
+# save and delete adjusts the member's plan aggregates (app/plans.py) and the
+# admin analytics counters (app/analytics.py).
+
+from sqlalchemy import and_, delete, func, or_, select
+
+from . import analytics, db
+from .member_queries import decode_cursor, encode_cursor
+from .models import UserExercise
+from .plans import apply_delta
+
+
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+
+SAVED_FIELDS = ("exercise_name", "target", "equipment", "gif_url")
+PLAN_FIELDS = ("sets", "reps", "day")
+MAX_BATCH = 100
+
+
+def _upsert_statement(rows):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(UserExercise).values(rows)
+        updates = {field: stmt.inserted[field] for field in SAVED_FIELDS}
+        updates.update({field: func.coalesce(stmt.inserted[field], UserExercise.__table__.c[field])
+                        for field in PLAN_FIELDS})
+        return stmt.on_duplicate_key_update(updates)
+
+    from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(UserExercise).values(rows)
+    updates = {field: stmt.excluded[field] for field in SAVED_FIELDS}
+    updates.update({field: func.coalesce(stmt.excluded[field], UserExercise.__table__.c[field])
+                    for field in PLAN_FIELDS})
+    return stmt.on_conflict_do_update(index_elements=["user_id", "exercise_id"], set_=updates)
+
+
+def save_many(user_id, entries):
+    """
+    Save (or refresh) several exercises in one transaction and adjust the
+    plan aggregates. Each entry has exercise_id plus SAVED_FIELDS and,
+    optionally, PLAN_FIELDS (left unchanged when missing). Returns the
+    number of distinct exercises saved.
+    """
+    by_id = {}
+    for entry in entries:
+        values = {field: entry.get(field) for field in SAVED_FIELDS + PLAN_FIELDS}
+        by_id[str(entry["exercise_id"])] = dict(values, user_id=user_id, exercise_id=str(entry["exercise_id"]))
+    if not by_id:
+        return 0
+
+    # Lock the rows being replaced so concurrent saves can't double count
+    existing = {
+        row.exercise_id: (row.target, row.equipment)
+        for row in db.session.execute(
+            select(UserExercise.exercise_id, UserExercise.target, UserExercise.equipment)
+            .where(UserExercise.user_id == user_id, UserExercise.exercise_id.in_(list(by_id)))
+            .with_for_update()
+        )
+    }
+    db.session.execute(_upsert_statement(list(by_id.values())))
+
+    added = [(row["target"], row["equipment"]) for row in by_id.values()]
+    apply_delta(user_id, added=added, removed=list(existing.values()))
+    analytics.record_exercises(added=[
+        (exercise_id, row["exercise_name"]) for exercise_id, row in by_id.items() if exercise_id not in existing
+    ])
+    db.session.commit()
+    return len(by_id)
+
+
+def save_for_user(user_id, exercise_id, **fields):
+    """Save (or refresh) an exercise in a member's plan; safe to repeat."""
+    save_many(user_id, [dict(fields, exercise_id=exercise_id)])
+
+
+def saved_page(user_id, after=None, per_page=DEFAULT_PER_PAGE):
+    """
+    One page of a member's saved exercises, newest first. Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+    """
+    per_page = max(1, min(int(per_page or DEFAULT_PER_PAGE), MAX_PER_PAGE))
+    query = UserExercise.query.filter(UserExercise.user_id == user_id)
+
+    cursor = decode_cursor(after, "created_at")
+    if cursor is not None:
+        created_at, row_id = cursor
+        query = query.filter(or_(
+            UserExercise.created_at < created_at,
+            and_(UserExercise.created_at == created_at, UserExercise.id < row_id),
+        ))
+
+    rows = query.order_by(UserExercise.created_at.desc(), UserExercise.id.desc()).limit(per_page + 1).all()
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        return rows, encode_cursor(rows[-1], "created_at")
+    return rows, None
+
+
+def delete_many(user_id, saved_ids):
+    """Delete several of a member's saved exercises in one transaction; returns the count removed."""
+    saved_ids = [int(saved_id) for saved_id in saved_ids]
+    if not saved_ids:
+        return 0
+    rows = db.session.execute(
+        select(UserExercise.id, UserExercise.exercise_id, UserExercise.target, UserExercise.equipment)
+        .where(UserExercise.user_id == user_id, UserExercise.id.in_(saved_ids))
+        .with_for_update()
+    ).all()
+    if rows:
+        db.session.execute(delete(UserExercise).where(UserExercise.id.in_([row.id for row in rows])))
+        apply_delta(user_id, removed=[(row.target, row.equipment) for row in rows])
+        analytics.record_exercises(removed=[row.exercise_id for row in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def delete_saved(user_id, saved_id):
+    """Delete one saved exercise owned by user_id; returns True if a row was removed."""
+    return delete_many(user_id, [saved_id]) > 0
@@ -0,0 +1,519 @@
+# Summary: Class Timetable and Bookings
+# Description:
+# Gym classes live in gym_classes. Each worker keeps a precomputed weekly
+# timetable in memory (weekday -> classes by start time), reloaded when an
+# admin edits a class here and, like the exercise catalog, when another
+# process changed the table (checked at most every SCHEDULE_REFRESH_SECONDS).
+#
+# Each dated occurrence gets a class_sessions row with its own seat counters.
+# Booking never locks before it writes: the booking row is inserted (a
+# unique index stops double booking) and a seat is taken with
+#     UPDATE class_sessions SET booked = booked + 1 WHERE id = ? AND booked < capacity
+# which cannot overbook however many members book at once. A booking that
+# gets no seat joins the waitlist; a cancelled seat goes to the first
+# member on the waitlist. When an admin raises a class's capacity the new
+# seats of its upcoming sessions go to their waitlists in the same order;
+# lowering it below the seats already booked in a session is refused.
+
+from datetime import datetime, time as dt_time, timedelta
+import threading
+import time
+
+from flask import flash, redirect, render_template, request, session, url_for
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .metrics import CLASS_BOOKINGS
+from .models import ClassBooking, ClassSession, GymClass
+
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# The timetable the app started with; inserted when gym_classes is empty
+DEFAULT_CLASSES = [
+    {
+        "name": "HIIT 45", "description": "High-intensity cardio intervals.",
+        "weekdays": "6,1,3", "start_time": "18:00", "duration_minutes": 45,
+        "level": "All", "coach": "Dana", "room": "A", "capacity": 20,
+    },
+    {
+        "name": "Barbell Basics", "description": "Learn squat, bench, and deadlift safely.",
+        "weekdays": "0,2", "start_time": "19:30", "duration_minutes": 60,
+        "level": "Beginner", "coach": "Yair", "room": "B", "capacity": 12,
+    },
+]
+
+
+class BookingError(ValueError):
+    """A booking request that can't be honoured (shown to the member)."""
+
+
+def seed_default_classes(conn):
+    """Insert DEFAULT_CLASSES into an empty gym_classes table."""
+    if conn.execute(select(func.count(GymClass.id))).scalar():
+        return
+    now = datetime.utcnow()
+    conn.execute(insert(GymClass), [dict(row, active=True, updated_at=now) for row in DEFAULT_CLASSES])
+
+
+def parse_weekdays(value):
+    """Monday=0 day numbers from "6,1,3" or a list; ValueError on bad input."""
+    parts = value.split(",") if isinstance(value, str) else value
+    days = sorted({int(part) for part in parts if str(part).strip() != ""})
+    if not days or any(day < 0 or day > 6 for day in days):
+        raise ValueError("weekdays must be numbers 0 (Mon) to 6 (Sun)")
+    return days
+
+
+def _class_view(row):
+    weekdays = parse_weekdays(row.weekdays)
+    hour, minute = (int(part) for part in row.start_time.split(":"))
+    return {
+        "id": row.id,
+        "name": row.name,
+        "description": row.description,
+        "weekdays": weekdays,
+        "days": ", ".join(WEEKDAYS[day] for day in weekdays),
+        "time": row.start_time,
+        "start": dt_time(hour, minute),
+        "duration": f"{row.duration_minutes}m",
+        "duration_minutes": row.duration_minutes,
+        "level": row.level,
+        "coach": row.coach,
+        "room": row.room,
+        "capacity": row.capacity,
+        "active": row.active,
+    }
+
+
+# ------------------------------
+# Timetable
+# In-memory weekly timetable shared by the
+# requests of one worker process.
+# ------------------------------
+class Timetable:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._classes = {}
+        self._weekly = {day: [] for day in range(7)}
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self.refresh_seconds = 60
+        self.days_ahead = 7
+        self.version = 0
+
+    def init_app(self, app):
+        """Read SCHEDULE_* settings and register the booking and admin routes."""
+        self.refresh_seconds = app.config.get("SCHEDULE_REFRESH_SECONDS", self.refresh_seconds)
+        self.days_ahead = app.config.get("SCHEDULE_DAYS_AHEAD", self.days_ahead)
+        self._fingerprint = None
+        app.extensions["timetable"] = self
+        app.add_url_rule("/classes/schedule", "class_schedule", schedule_view)
+        app.add_url_rule("/classes/<int:class_id>/book", "book_class", book_view, methods=["POST"])
+        app.add_url_rule("/classes/bookings/<int:booking_id>/cancel", "cancel_booking", cancel_view,
+                         methods=["POST"])
+        app.add_url_rule("/admin/classes", "admin_classes", admin_classes_view, methods=["GET", "POST"])
+        app.add_url_rule("/admin/classes/<int:class_id>", "admin_edit_class", admin_edit_class_view,
+                         methods=["POST"])
+
+    # ---------- Loading ---------- #
+    def load(self, rows):
+        """Rebuild the timetable from GymClass rows (inactive classes are kept but not scheduled)."""
+        classes = {row.id: _class_view(row) for row in rows}
+        weekly = {day: [] for day in range(7)}
+        for cls in classes.values():
+            if cls["active"]:
+                for day in cls["weekdays"]:
+                    weekly[day].append(cls)
+        for day in weekly:
+            weekly[day].sort(key=lambda cls: (cls["start"], cls["name"]))
+
+        with self._lock:
+            self._classes = classes
+            self._weekly = weekly
+            self.version += 1
+
+    def load_from_db(self):
+        self.load(GymClass.query.all())
+        self._fingerprint = self._db_fingerprint()
+        self._checked_at = time.monotonic()
+
+    def _db_fingerprint(self):
+        return tuple(db.session.query(func.count(GymClass.id), func.max(GymClass.updated_at)).one())
+
+    def ensure_loaded(self):
+        """Load on first use and reload when another process edited the classes."""
+        now = time.monotonic()
+        if self._fingerprint is not None and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        if self._db_fingerprint() != self._fingerprint:
+            self.load_from_db()
+
+    # ---------- Lookups ---------- #
+    def classes(self):
+        return sorted(self._classes.values(), key=lambda cls: cls["name"])
+
+    def get(self, class_id):
+        return self._classes.get(class_id)
+
+    def occurrences(self, now=None, days=None):
+        """(class, starts_at) for every scheduled class from now on, soonest first."""
+        now = now or datetime.now()
+        weekly = self._weekly
+        found = []
+        for offset in range((days or self.days_ahead) + 1):
+            day = now.date() + timedelta(days=offset)
+            for cls in weekly[day.weekday()]:
+                starts_at = datetime.combine(day, cls["start"])
+                if starts_at > now:
+                    found.append((cls, starts_at))
+        return found
+
+    def occurrence(self, class_id, starts_at, now=None):
+        """The class if it really runs at starts_at within the booking window, else None."""
+        now = now or datetime.now()
+        cls = self._classes.get(class_id)
+        if cls is None or not cls["active"]:
+            return None
+        if starts_at.weekday() not in cls["weekdays"] or starts_at.time() != cls["start"]:
+            return None
+        if not now < starts_at <= now + timedelta(days=self.days_ahead + 1):
+            return None
+        return cls
+
+
+# ---------- Seat Accounting ---------- #
+def _insert_session_statement(row):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as upsert
+        stmt = upsert(ClassSession).values(row)
+        return stmt.on_duplicate_key_update(capacity=ClassSession.capacity)
+
+    from sqlalchemy.dialects.sqlite import insert as upsert
+    return upsert(ClassSession).values(row).on_conflict_do_nothing(index_elements=["class_id", "starts_at"])
+
+
+def _session_id(cls, starts_at):
+    """The class_sessions row for an occurrence, created on its first booking."""
+    lookup = select(ClassSession.id).where(
+        ClassSession.class_id == cls["id"], ClassSession.starts_at == starts_at
+    )
+    session_id = db.session.execute(lookup).scalar()
+    if session_id is None:
+        db.session.execute(_insert_session_statement({
+            "class_id": cls["id"], "starts_at": starts_at,
+            "capacity": cls["capacity"], "booked": 0, "waitlisted": 0,
+        }))
+        session_id = db.session.execute(lookup).scalar()
+    return session_id
+
+
+def book(user_id, class_id, starts_at):
+    """
+    Reserve a seat (or a waitlist place) for a member; returns
+    (status, booking_id). Raises BookingError for unknown occurrences and
+    repeat bookings.
+    """
+    cls = timetable.occurrence(class_id, starts_at)
+    if cls is None:
+        CLASS_BOOKINGS.inc(result="rejected")
+        raise BookingError("That class is not on the timetable.")
+
+    session_id = _session_id(cls, starts_at)
+    try:
+        booking_id = db.session.execute(insert(ClassBooking).values(
+            session_id=session_id, user_id=user_id, status="waitlisted", created_at=datetime.utcnow()
+        )).inserted_primary_key[0]
+    except IntegrityError:
+        db.session.rollback()
+        CLASS_BOOKINGS.inc(result="rejected")
+        raise BookingError("You already have a place in this class.")
+
+    # The only statement that touches the contended row; it holds the row lock until commit
+    seated = db.session.execute(
+        update(ClassSession)
+        .where(ClassSession.id == session_id, ClassSession.booked < ClassSession.capacity)
+        .values(booked=ClassSession.booked + 1)
+    ).rowcount
+    if seated:
+        db.session.execute(update(ClassBooking).where(ClassBooking.id == booking_id).values(status="booked"))
+    else:
+        db.session.execute(
+            update(ClassSession).where(ClassSession.id == session_id)
+            .values(waitlisted=ClassSession.waitlisted + 1)
+        )
+    db.session.commit()
+
+    status = "booked" if seated else "waitlisted"
+    CLASS_BOOKINGS.inc(result=status)
+    return status, booking_id
+
+
+def _release(booking):
+    """Give up a booking row (id, session_id, status) in the current transaction."""
+    db.session.execute(delete(ClassBooking).where(ClassBooking.id == booking.id))
+    if booking.status != "booked":
+        db.session.execute(
+            update(ClassSession).where(ClassSession.id == booking.session_id)
+            .values(waitlisted=ClassSession.waitlisted - 1)
+        )
+        return
+
+    # The seat goes to the first member on the waitlist, if any
+    next_id = db.session.execute(
+        select(ClassBooking.id)
+        .where(ClassBooking.session_id == booking.session_id, ClassBooking.status == "waitlisted")
+        .order_by(ClassBooking.created_at, ClassBooking.id)
+        .limit(1)
+        .with_for_update()
+    ).scalar()
+    if next_id is not None:
+        db.session.execute(update(ClassBooking).where(ClassBooking.id == next_id).values(status="booked"))
+        db.session.execute(
+            update(ClassSession).where(ClassSession.id == booking.session_id)
+            .values(waitlisted=ClassSession.waitlisted - 1)
+        )
+    else:
+        db.session.execute(
+            update(ClassSession).where(ClassSession.id == booking.session_id)
+            .values(booked=ClassSession.booked - 1)
+        )
+
+
+def resize_sessions(class_id, capacity, now=None):
+    """
+    Give a class's upcoming sessions a new capacity in the current
+    transaction, seating waitlisted members (in waitlist order) in any new
+    seats. Raises ValueError when a session has more members booked.
+    """
+    sessions = db.session.execute(
+        select(ClassSession.id, ClassSession.booked, ClassSession.waitlisted)
+        .where(ClassSession.class_id == class_id, ClassSession.starts_at > (now or datetime.now()))
+        .with_for_update()
+    ).all()
+    most_booked = max((row.booked for row in sessions), default=0)
+    if capacity < most_booked:
+        raise ValueError(f"an upcoming session already has {most_booked} members booked")
+
+    for row in sessions:
+        promoted = []
+        if capacity > row.booked and row.waitlisted:
+            promoted = db.session.execute(
+                select(ClassBooking.id)
+                .where(ClassBooking.session_id == row.id, ClassBooking.status == "waitlisted")
+                .order_by(ClassBooking.created_at, ClassBooking.id)
+                .limit(capacity - row.booked)
+                .with_for_update()
+            ).scalars().all()
+        if promoted:
+            db.session.execute(update(ClassBooking).where(ClassBooking.id.in_(promoted)).values(status="booked"))
+        db.session.execute(
+            update(ClassSession).where(ClassSession.id == row.id).values(
+                capacity=capacity,
+                booked=ClassSession.booked + len(promoted),
+                waitlisted=ClassSession.waitlisted - len(promoted),
+            )
+        )
+
+
+def _booking_rows(*conditions):
+    return db.session.execute(
+        select(ClassBooking.id, ClassBooking.session_id, ClassBooking.status)
+        .where(*conditions)
+        .with_for_update()
+    ).all()
+
+
+def cancel(user_id, booking_id):
+    """Cancel one of a member's bookings; True if it existed."""
+    rows = _booking_rows(ClassBooking.id == booking_id, ClassBooking.user_id == user_id)
+    for row in rows:
+        _release(row)
+    db.session.commit()
+    if rows:
+        CLASS_BOOKINGS.inc(result="cancelled")
+    return bool(rows)
+
+
+def cancel_all(user_ids):
+    """Release the members' upcoming seats and waitlist places (before deleting them)."""
+    upcoming = select(ClassSession.id).where(ClassSession.starts_at > datetime.now())
+    rows = _booking_rows(ClassBooking.user_id.in_(list(user_ids)), ClassBooking.session_id.in_(upcoming))
+    # Waitlist places first, so a freed seat never goes to another member being removed
+    for row in sorted(rows, key=lambda row: row.status == "booked"):
+        _release(row)
+
+
+def seat_counts(now=None):
+    """{(class_id, starts_at): (booked, capacity, waitlisted)} for upcoming sessions."""
+    now = now or datetime.now()
+    rows = db.session.execute(
+        select(ClassSession.class_id, ClassSession.starts_at, ClassSession.booked,
+               ClassSession.capacity, ClassSession.waitlisted)
+        .where(ClassSession.starts_at > now,
+               ClassSession.starts_at <= now + timedelta(days=timetable.days_ahead + 1))
+    )
+    return {(row.class_id, row.starts_at): (row.booked, row.capacity, row.waitlisted) for row in rows}
+
+
+def member_bookings(user_id, now=None):
+    """{(class_id, starts_at): (booking_id, status)} for a member's upcoming bookings."""
+    rows = db.session.execute(
+        select(ClassSession.class_id, ClassSession.starts_at, ClassBooking.id, ClassBooking.status)
+        .join(ClassSession, ClassSession.id == ClassBooking.session_id)
+        .where(ClassBooking.user_id == user_id, ClassSession.starts_at > (now or datetime.now()))
+    )
+    return {(row.class_id, row.starts_at): (row.id, row.status) for row in rows}
+
+
+def upcoming(user_id, now=None):
+    """Timetable rows for the member home page: each class's occurrences this week with seats."""
+    timetable.ensure_loaded()
+    counts = seat_counts(now)
+    mine = member_bookings(user_id, now)
+    result = []
+    for cls, starts_at in timetable.occurrences(now):
+        booked, capacity, waitlisted = counts.get((cls["id"], starts_at), (0, cls["capacity"], 0))
+        booking_id, status = mine.get((cls["id"], starts_at), (None, None))
+        result.append(dict(
+            cls, starts_at=starts_at, booked=booked, capacity=capacity,
+            seats_left=max(capacity - booked, 0), waitlisted=waitlisted,
+            booking_id=booking_id, booking_status=status,
+        ))
+    return result
+
+
+# ---------- Member Endpoints ---------- #
+def _wants_json():
+    return request.is_json or request.accept_mimetypes.best == "application/json"
+
+
+def _parse_starts_at(value):
+    try:
+        return datetime.fromisoformat(value or "").replace(second=0, microsecond=0)
+    except ValueError:
+        raise BookingError("Pick a class time from the timetable.")
+
+
+def schedule_view():
+    if "user_id" not in session:
+        return {"error": "login required"}, 401
+    return {"sessions": [
+        {
+            "class_id": row["id"], "name": row["name"], "starts_at": row["starts_at"].isoformat(),
+            "capacity": row["capacity"], "booked": row["booked"], "seats_left": row["seats_left"],
+            "waitlisted": row["waitlisted"], "booking_id": row["booking_id"],
+            "booking_status": row["booking_status"],
+        }
+        for row in upcoming(session["user_id"])
+    ]}, 200
+
+
+def book_view(class_id):
+    if "user_id" not in session:
+        if _wants_json():
+            return {"error": "login required"}, 401
+        return redirect(url_for("login"))
+
+    source = request.get_json(silent=True) or request.form
+    timetable.ensure_loaded()
+    try:
+        status, booking_id = book(session["user_id"], class_id, _parse_starts_at(source.get("starts_at")))
+    except BookingError as exc:
+        if _wants_json():
+            return {"error": str(exc)}, 409
+        flash(str(exc), "danger")
+        return redirect(url_for("user_home"))
+
+    if _wants_json():
+        return {"status": status, "booking_id": booking_id}, 200
+    flash("You're booked in!" if status == "booked" else "The class is full; you're on the waitlist.",
+          "success" if status == "booked" else "warning")
+    return redirect(url_for("user_home"))
+
+
+def cancel_view(booking_id):
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    found = cancel(session["user_id"], booking_id)
+    if _wants_json():
+        return {"cancelled": found}, 200 if found else 404
+    if found:
+        flash("Booking cancelled.", "info")
+    return redirect(url_for("user_home"))
+
+
+# ---------- Admin Endpoints ---------- #
+def _class_fields(form):
+    """GymClass columns from the admin form; raises ValueError on bad input."""
+    start_time = form.get("start_time", "").strip()
+    datetime.strptime(start_time, "%H:%M")
+    capacity = int(form.get("capacity", 0))
+    duration = int(form.get("duration_minutes", 0))
+    if capacity < 1 or duration < 1 or not form.get("name", "").strip():
+        raise ValueError("name, a capacity and a duration are required")
+    return {
+        "name": form["name"].strip(),
+        "description": form.get("description", "").strip() or None,
+        "weekdays": ",".join(str(day) for day in parse_weekdays(form.getlist("weekdays"))),
+        "start_time": start_time,
+        "duration_minutes": duration,
+        "level": form.get("level", "").strip() or None,
+        "coach": form.get("coach", "").strip() or None,
+        "room": form.get("room", "").strip() or None,
+        "capacity": capacity,
+        # The form posts a hidden "off" ahead of the checkbox; no field at all means active
+        "active": "on" in form.getlist("active") or "active" not in form,
+    }
+
+
+def admin_classes_view():
+    if session.get("role") != "admin":
+        flash("Access denied.", "danger")
+        return redirect(url_for("user_home"))
+
+    if request.method == "POST":
+        try:
+            db.session.add(GymClass(**_class_fields(request.form)))
+            db.session.commit()
+            timetable.load_from_db()
+            flash("Class added.", "success")
+        except ValueError as exc:
+            flash(f"Class not saved: {exc}", "danger")
+        return redirect(url_for("admin_classes"))
+
+    timetable.ensure_loaded()
+    return render_template("admin_classes.html", classes=timetable.classes(), weekdays=WEEKDAYS)
+
+
+def admin_edit_class_view(class_id):
+    if session.get("role") != "admin":
+        flash("Access denied.", "danger")
+        return redirect(url_for("user_home"))
+
+    gym_class = GymClass.query.get_or_404(class_id)
+    try:
+        fields = _class_fields(request.form)
+    except ValueError as exc:
+        flash(f"Class not saved: {exc}", "danger")
+        return redirect(url_for("admin_classes"))
+
+    for name, value in fields.items():
+        setattr(gym_class, name, value)
+    # Sessions already created keep their bookings; their seat limit follows the class
+    try:
+        resize_sessions(class_id, fields["capacity"])
+    except ValueError as exc:
+        db.session.rollback()
+        flash(f"Class not saved: {exc}", "danger")
+        return redirect(url_for("admin_classes"))
+    db.session.commit()
+    timetable.load_from_db()
+    flash("Class updated.", "success")
+    return redirect(url_for("admin_classes"))
+
+
+timetable = Timetable()
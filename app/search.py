@@ -0,0 +1,238 @@
+# Summary: Local Exercise Search Engine
+# Description:
+# Ranked, typo-tolerant search over the exercise catalog, so "pushup",
+# "push up" and "bicep" find what the exact ExerciseDB lookups miss:
+#   - an inverted index from normalized, lightly stemmed terms to exercises,
+#     weighted by field (name > target / bodyPart > equipment); adjacent name
+#     words are also indexed joined ("push up" -> "pushup")
+#   - fuzzy matching for unknown query terms: candidate terms sharing
+#     trigrams, confirmed by a bounded edit distance
+#   - prefix matching on the last query word, and autocomplete over the
+#     sorted vocabulary with bisect
+# Entries are added and removed one at a time, so the index follows catalog
+# changes without a rebuild.
+
+from bisect import bisect_left, insort
+from collections import defaultdict
+import math
+import re
+import threading
+
+
+# Relative weight of a match in each field
+FIELD_WEIGHTS = {"name": 3.0, "target": 2.0, "bodyPart": 2.0, "equipment": 1.0}
+NAME_WEIGHT = FIELD_WEIGHTS["name"]
+PREFIX_FACTOR = 0.7
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+
+def stem(token):
+    """A very small suffix stripper: biceps -> bicep, presses -> press, curling -> curl."""
+    if len(token) > 5 and token.endswith("ing"):
+        return token[:-3]
+    if len(token) > 4 and token.endswith(("sses", "shes", "ches", "xes", "zes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us")):
+        return token[:-1]
+    return token
+
+
+def terms(text):
+    """Normalized terms of a text: lowercase alphanumeric words, stemmed."""
+    return [stem(tok) for tok in re.split(r"[^a-z0-9]+", (text or "").lower()) if tok]
+
+
+def with_compounds(words):
+    """Words plus each adjacent pair joined, so "push up" also matches "pushup"."""
+    return words + [a + b for a, b in zip(words, words[1:])]
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+# ------------------------------
+# SearchIndex
+# term -> {exercise id: field weight}, plus a
+# trigram index and a sorted vocabulary for
+# fuzzy and prefix lookups. Reads and writes
+# share one lock; every operation is short.
+# ------------------------------
+class SearchIndex:
+    def __init__(self):
+        self._postings = defaultdict(dict)
+        self._trigrams = defaultdict(set)
+        self._vocabulary = []
+        self._docs = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- Index Maintenance ---------- #
+    @staticmethod
+    def _document_terms(entry):
+        weights = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            words = terms(entry.get(field))
+            for term in with_compounds(words) if field == "name" else words:
+                weights[term] = max(weights[term], weight)
+        return dict(weights)
+
+    def add(self, entry):
+        """Index (or re-index) one exercise dict."""
+        ex_id = str(entry.get("id", ""))
+        if not ex_id:
+            return
+        weights = self._document_terms(entry)
+        with self._lock:
+            self._remove(ex_id)
+            self._docs[ex_id] = (entry.get("name") or "", weights)
+            for term, weight in weights.items():
+                postings = self._postings[term]
+                if not postings:
+                    insort(self._vocabulary, term)
+                    for gram in trigrams(term):
+                        self._trigrams[gram].add(term)
+                postings[ex_id] = weight
+
+    def remove(self, ex_id):
+        with self._lock:
+            self._remove(str(ex_id))
+
+    def _remove(self, ex_id):
+        doc = self._docs.pop(ex_id, None)
+        if doc is None:
+            return
+        for term in doc[1]:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(ex_id, None)
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+                for gram in trigrams(term):
+                    self._trigrams[gram].discard(term)
+                    if not self._trigrams[gram]:
+                        del self._trigrams[gram]
+
+    # ---------- Term Expansion ---------- #
+    def _prefix_terms(self, prefix, limit=50):
+        start = bisect_left(self._vocabulary, prefix)
+        found = []
+        for term in self._vocabulary[start:start + limit]:
+            if not term.startswith(prefix):
+                break
+            found.append(term)
+        return found
+
+    def _fuzzy_terms(self, term):
+        max_edits = 1 if len(term) <= 5 else 2
+        grams = trigrams(term)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] += 1
+        matches = []
+        for candidate, overlap in shared.items():
+            similarity = overlap / len(grams | trigrams(candidate))
+            if similarity < MIN_TRIGRAM_SIMILARITY:
+                continue
+            distance = edit_distance(term, candidate, max_edits)
+            if distance <= max_edits:
+                matches.append((candidate, 1.0 - 0.3 * distance))
+        return matches
+
+    def _expand(self, term, is_last):
+        """(index term, match factor) pairs for one query term."""
+        expansions = {}
+        if term in self._postings:
+            expansions[term] = 1.0
+        else:
+            expansions.update(self._fuzzy_terms(term))
+        if is_last and len(term) >= 2:
+            for candidate in self._prefix_terms(term):
+                expansions.setdefault(candidate, PREFIX_FACTOR)
+        return expansions
+
+    def _completes(self, ex_id, words):
+        """Whether words[-1] prefixes a name word (or joined pair) left over by words[:-1]."""
+        name_words = terms(self._docs[ex_id][0])
+        free = [True] * len(name_words)
+        for word in words[:-1]:
+            for i, name_word in enumerate(name_words):
+                if free[i] and name_word == word:
+                    free[i] = False
+                    break
+        prefix = words[-1]
+        for i, name_word in enumerate(name_words):
+            if not free[i]:
+                continue
+            if name_word.startswith(prefix):
+                return True
+            if i + 1 < len(name_words) and free[i + 1] and (name_word + name_words[i + 1]).startswith(prefix):
+                return True
+        return False
+
+    # ---------- Queries ---------- #
+    def search(self, query, limit=50):
+        """Exercise ids ranked by weighted, idf-scaled term matches."""
+        words = terms(query)
+        if not words:
+            return []
+        with self._lock:
+            total = len(self._docs) or 1
+            scores = defaultdict(float)
+            for position, term in enumerate(with_compounds(words)):
+                is_last = position == len(words) - 1
+                best = {}
+                for index_term, factor in self._expand(term, is_last).items():
+                    postings = self._postings[index_term]
+                    idf = math.log(1 + total / len(postings))
+                    for ex_id, weight in postings.items():
+                        # A query term counts once per exercise, through its best match
+                        best[ex_id] = max(best.get(ex_id, 0.0), weight * factor * idf)
+                for ex_id, score in best.items():
+                    scores[ex_id] += score
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], self._docs[item[0]][0]))
+        return [ex_id for ex_id, _ in ranked[:limit]]
+
+    def suggest(self, prefix, limit=10):
+        """Exercise ids whose name words start with the query (earlier words must match exactly)."""
+        words = terms(prefix)
+        if not words:
+            return []
+        with self._lock:
+            candidates = None
+            for position, word in enumerate(words):
+                if position == len(words) - 1:
+                    matched = set()
+                    for term in self._prefix_terms(word, limit=200):
+                        matched.update(ex_id for ex_id, weight in self._postings[term].items() if weight == NAME_WEIGHT)
+                else:
+                    matched = {ex_id for ex_id, weight in self._postings.get(word, {}).items() if weight == NAME_WEIGHT}
+                candidates = matched if candidates is None else candidates & matched
+                if not candidates:
+                    return []
+            if len(words) > 1:
+                # The last word must complete a name word the earlier ones did not use up
+                candidates = [ex_id for ex_id in candidates if self._completes(ex_id, words)]
+            ranked = sorted(candidates, key=lambda ex_id: (len(self._docs[ex_id][0]), self._docs[ex_id][0]))
+        return ranked[:limit]
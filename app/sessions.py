@@ -0,0 +1,335 @@
+# Summary: Server-Side Sessions
+# Description:
+# Optional replacement for Flask's signed-cookie session. The cookie holds
+# only a random session id; the data lives in a store, so nothing is
+# serialized and signed on every response and an admin can end a member's
+# sessions at once (delete_user, role changes). SESSION_BACKEND selects:
+#   - "cookie":   Flask's default signed cookie (no revocation)
+#   - "memory":   per-process LRU store (single worker / local development)
+#   - "database": the user_sessions table, shared by all workers and replicas,
+#                 fronted by a per-process copy so auth checks on the hot path
+#                 don't query MySQL
+# The cookie is "<sid>.<version>"; the version changes on every save, so a
+# worker's local copy is used only while it matches the cookie. Revocations
+# are logged in session_revocations, which every worker polls at most once
+# per SESSION_REVOCATION_POLL seconds to drop its copies. Stores keep a
+# per-user index for revocation, extend a session's expiry at most once per
+# SESSION_TOUCH_SECONDS, and drop expired sessions in batches.
+
+from collections import OrderedDict, defaultdict
+import json
+import secrets
+import threading
+import time
+
+from flask import current_app
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy import delete, func, insert, select, update
+from werkzeug.datastructures import CallbackDict
+
+from . import db
+
+
+# ------------------------------
+# ServerSideSession
+# ------------------------------
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=0.0):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.original_user_id = self.get("user_id")
+        self.new = sid is None
+        self.modified = False
+
+
+# ------------------------------
+# MemorySessionStore
+# Bounded in-process LRU. Entries are
+# (data, user_id, expires_at); user_sids is the
+# per-user index used for revocation.
+# ------------------------------
+class MemorySessionStore:
+    def __init__(self, max_entries=10000, sweep_every=500):
+        self.max_entries = max_entries
+        self.sweep_every = sweep_every
+        self._data = OrderedDict()
+        self._user_sids = defaultdict(set)
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def get(self, sid, version=None):
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                self._drop(sid)
+                return None
+            self._data.move_to_end(sid)
+            return entry[0], entry[2]
+
+    def save(self, sid, data, user_id, expires_at, version=None):
+        with self._lock:
+            self._drop(sid)
+            self._data[sid] = (data, user_id, expires_at)
+            if user_id is not None:
+                self._user_sids[user_id].add(sid)
+            while len(self._data) > self.max_entries:
+                self._drop(next(iter(self._data)))
+
+            self._writes += 1
+            if self._writes % self.sweep_every == 0:
+                self._sweep()
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is not None:
+                self._data[sid] = (entry[0], entry[1], expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._drop(sid)
+
+    def revoke_user(self, user_id):
+        self.revoke_users([user_id])
+
+    def revoke_users(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                for sid in list(self._user_sids.get(user_id, ())):
+                    self._drop(sid)
+
+    def _drop(self, sid):
+        entry = self._data.pop(sid, None)
+        if entry is not None and entry[1] is not None:
+            sids = self._user_sids.get(entry[1])
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._user_sids[entry[1]]
+
+    def _sweep(self):
+        now = time.time()
+        for sid in [sid for sid, entry in self._data.items() if entry[2] <= now]:
+            self._drop(sid)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ------------------------------
+# DatabaseSessionStore
+# Shared store in the user_sessions table. Reads
+# go through a per-process MemorySessionStore
+# kept for local_ttl seconds and tagged with the
+# cookie's version. Revocation clears it in this
+# process, deletes the rows and logs the member
+# in session_revocations; other workers poll the
+# log every revocation_poll seconds.
+# ------------------------------
+class DatabaseSessionStore:
+    def __init__(self, max_entries=10000, local_ttl=300, revocation_poll=2,
+                 revocation_keep=3600, sweep_every=500):
+        self.local_ttl = local_ttl
+        self.revocation_poll = revocation_poll
+        self.revocation_keep = revocation_keep
+        self.sweep_every = sweep_every
+        self.local = MemorySessionStore(max_entries=max_entries, sweep_every=sweep_every)
+        self._writes = 0
+        self._polled_at = time.time()
+
+    @property
+    def table(self):
+        from .models import UserSession
+        return UserSession.__table__
+
+    @property
+    def revocations(self):
+        from .models import SessionRevocation
+        return SessionRevocation.__table__
+
+    def get(self, sid, version=None):
+        self._poll_revocations()
+        cached = self.local.get(sid)
+        if cached is not None and cached[0][2] == version:
+            data, expires_at, _ = cached[0]
+            return data, expires_at
+
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.data, self.table.c.user_id, self.table.c.expires_at)
+                .where(self.table.c.sid == sid, self.table.c.expires_at > time.time())
+            ).first()
+        if row is None:
+            self.local.delete(sid)
+            return None
+        data = json.loads(row.data)
+        self._cache_locally(sid, data, row.user_id, row.expires_at, version)
+        return data, row.expires_at
+
+    def save(self, sid, data, user_id, expires_at, version=None):
+        values = {"data": json.dumps(data), "user_id": user_id, "expires_at": expires_at}
+        with db.engine.begin() as conn:
+            result = conn.execute(update(self.table).where(self.table.c.sid == sid).values(**values))
+            if result.rowcount == 0:
+                conn.execute(insert(self.table).values(sid=sid, **values))
+        self._cache_locally(sid, data, user_id, expires_at, version)
+
+        self._writes += 1
+        if self._writes % self.sweep_every == 0:
+            self.sweep()
+
+    def touch(self, sid, expires_at):
+        with db.engine.begin() as conn:
+            conn.execute(update(self.table).where(self.table.c.sid == sid).values(expires_at=expires_at))
+        # Re-read once so the local copy carries the new expiry
+        self.local.delete(sid)
+
+    def delete(self, sid):
+        self.local.delete(sid)
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.sid == sid))
+
+    def revoke_user(self, user_id):
+        self.revoke_users([user_id])
+
+    def revoke_users(self, user_ids):
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        self.local.revoke_users(user_ids)
+        now = time.time()
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.user_id.in_(user_ids)))
+            conn.execute(insert(self.revocations), [{"user_id": u, "revoked_at": now} for u in user_ids])
+
+    def sweep(self):
+        """Delete every expired session and old revocation in one statement each."""
+        now = time.time()
+        with db.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= now))
+            conn.execute(delete(self.revocations).where(self.revocations.c.revoked_at <= now - self.revocation_keep))
+
+    def _poll_revocations(self):
+        now = time.time()
+        if now - self._polled_at < self.revocation_poll:
+            return
+        # Look back past the last poll to cover commit lag and clock skew
+        # between replicas; dropping a local copy twice is harmless
+        since = self._polled_at - max(self.revocation_poll, 30)
+        self._polled_at = now
+        with db.engine.connect() as conn:
+            user_ids = conn.execute(
+                select(self.revocations.c.user_id).where(self.revocations.c.revoked_at > since).distinct()
+            ).scalars().all()
+        if user_ids:
+            self.local.revoke_users(user_ids)
+
+    def _cache_locally(self, sid, data, user_id, expires_at, version):
+        # Kept locally for at most local_ttl; the real expiry travels with the data
+        self.local.save(sid, (data, expires_at, version), user_id, min(expires_at, time.time() + self.local_ttl))
+
+    def __len__(self):
+        with db.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(self.table)).scalar()
+
+
+SESSION_STORES = {
+    "memory": MemorySessionStore,
+    "database": DatabaseSessionStore,
+}
+
+
+# ------------------------------
+# ServerSideSessionInterface
+# ------------------------------
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, store, ttl=7 * 86400, touch_interval=300):
+        self.store = store
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+
+    def open_session(self, app, request):
+        sid, _, version = request.cookies.get(self.get_cookie_name(app), "").partition(".")
+        if sid:
+            found = self.store.get(sid, version or None)
+            if found is not None:
+                data, expires_at = found
+                return ServerSideSession(data, sid=sid, expires_at=expires_at)
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        if session.modified:
+            if session.sid is None or session.get("user_id") != session.original_user_id:
+                # New sign-in: never reuse an id issued before authentication
+                if session.sid is not None:
+                    self.store.delete(session.sid)
+                session.sid = secrets.token_urlsafe(32)
+            version = secrets.token_hex(4)
+            self.store.save(session.sid, dict(session), session.get("user_id"), now + self.ttl, version)
+            response.set_cookie(
+                name,
+                f"{session.sid}.{version}",
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+        elif session.expires_at - now < self.ttl - self.touch_interval:
+            self.store.touch(session.sid, now + self.ttl)
+
+
+def init_app(app):
+    """Install the server-side session interface unless SESSION_BACKEND is "cookie"."""
+    backend = app.config.get("SESSION_BACKEND", "cookie")
+    if backend == "cookie":
+        return
+    if backend not in SESSION_STORES:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+    if backend == "database":
+        store = DatabaseSessionStore(
+            max_entries=app.config.get("SESSION_MAX_ENTRIES", 10000),
+            local_ttl=app.config.get("SESSION_LOCAL_TTL", 300),
+            revocation_poll=app.config.get("SESSION_REVOCATION_POLL", 2),
+        )
+    else:
+        store = MemorySessionStore(max_entries=app.config.get("SESSION_MAX_ENTRIES", 10000))
+    app.session_interface = ServerSideSessionInterface(
+        store,
+        ttl=app.config.get("SESSION_TTL", 7 * 86400),
+        touch_interval=app.config.get("SESSION_TOUCH_SECONDS", 300),
+    )
+    app.extensions["session_store"] = store
+
+
+def revoke_user(user_id):
+    """End every session of user_id (no-op with cookie sessions)."""
+    store = current_app.extensions.get("session_store")
+    if store is not None:
+        store.revoke_user(user_id)
+
+
+def revoke_users(user_ids):
+    """End every session of the given members in one statement (no-op with cookie sessions)."""
+    store = current_app.extensions.get("session_store")
+    if store is not None:
+        store.revoke_users(user_ids)
@@ -0,0 +1,236 @@
+# Summary: ExerciseDB Upstream Protection
+# Description:
+# Guards the ExerciseDB (RapidAPI) calls made by app/exercise_api.py:
+#   - SingleFlight:    identical in-flight lookups share one upstream call,
+#                      so N concurrent searches for "chest" cost one request
+#   - CircuitBreaker:  after EXERCISE_API_BREAKER_FAILURES consecutive
+#                      failures (or a 429) calls fail fast for
+#                      EXERCISE_API_BREAKER_RESET seconds, then a single
+#                      half-open probe decides whether to close again
+#   - Token buckets:   keep outbound calls under EXERCISE_API_RATE_LIMIT per
+#                      second, per process ("memory") or shared by every
+#                      worker and replica through the upstream_quota table
+#                      ("database")
+# Calls that are not made are counted in exercisedb_shed_total; callers then
+# answer from the response cache or the local catalog.
+
+import threading
+import time
+
+from sqlalchemy import case, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .metrics import UPSTREAM_CIRCUIT_STATE, UPSTREAM_CIRCUIT_TRANSITIONS, UPSTREAM_COALESCED
+
+
+# ------------------------------
+# SingleFlight
+# The first caller for a key runs the call;
+# callers arriving while it is in flight wait
+# for and share its result.
+# ------------------------------
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, wait_timeout=30):
+        self.wait_timeout = wait_timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, call):
+        """Run `call()` once for all concurrent callers with the same key."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            UPSTREAM_COALESCED.inc()
+            if not flight.done.wait(self.wait_timeout):
+                return None
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = call()
+            return flight.result
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def __len__(self):
+        return len(self._flights)
+
+
+# ------------------------------
+# CircuitBreaker
+# closed -> open after `failure_threshold`
+# consecutive failures; open -> half-open once
+# `reset_timeout` has passed; one half-open probe
+# closes it again or re-opens it.
+# ------------------------------
+class CircuitBreaker:
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go upstream now (claims the probe when half-open)."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() < self._open_until:
+                    return False
+                self._transition(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def release(self):
+        """Give back a half-open probe that was allowed but never made."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open(self.reset_timeout)
+
+    def trip(self, seconds=None):
+        """Open immediately, e.g. when the upstream answers 429 with Retry-After."""
+        with self._lock:
+            self._probing = False
+            self._open(max(self.reset_timeout, seconds or 0))
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def _open(self, seconds):
+        self._open_until = time.monotonic() + seconds
+        if self.state != self.OPEN:
+            self._transition(self.OPEN)
+
+    def _transition(self, state):
+        self.state = state
+        UPSTREAM_CIRCUIT_STATE.set(self.STATE_VALUES[state])
+        UPSTREAM_CIRCUIT_TRANSITIONS.inc(state=state)
+
+
+# ------------------------------
+# MemoryTokenBucket
+# Per-process bucket: with several workers the
+# effective limit is rate x workers.
+# ------------------------------
+class MemoryTokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token; False when the bucket is empty (never blocks)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+# ------------------------------
+# DatabaseTokenBucket
+# One upstream_quota row shared by all workers.
+# Refill and take happen in a single conditional
+# UPDATE, so concurrent workers never overspend.
+# ------------------------------
+class DatabaseTokenBucket:
+    def __init__(self, rate, burst, name="exercisedb"):
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+
+    def acquire(self):
+        """Take one token; False when the bucket is empty (never blocks)."""
+        from .models import UpstreamQuota
+
+        now = time.time()
+        refilled = UpstreamQuota.tokens + (now - UpstreamQuota.updated_at) * self.rate
+        available = case((refilled > self.burst, self.burst), else_=refilled)
+        # tokens is assigned before updated_at (MySQL applies SET clauses in order)
+        result = db.session.execute(
+            update(UpstreamQuota)
+            .where(UpstreamQuota.name == self.name, available >= 1)
+            .ordered_values((UpstreamQuota.tokens, available - 1), (UpstreamQuota.updated_at, now))
+        )
+        if result.rowcount:
+            db.session.commit()
+            return True
+
+        if db.session.get(UpstreamQuota, self.name) is not None:
+            db.session.rollback()
+            return False
+        try:
+            db.session.execute(insert(UpstreamQuota).values(
+                name=self.name, tokens=self.burst - 1, updated_at=now
+            ))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Another worker created the bucket first; try again against its row
+            db.session.rollback()
+            return self.acquire()
+
+
+RATE_LIMIT_BACKENDS = {
+    "memory": MemoryTokenBucket,
+    "database": DatabaseTokenBucket,
+}
+
+
+def build_rate_limiter(backend, rate, burst):
+    """A token bucket for `rate` calls/second, or None when rate is 0."""
+    if not rate:
+        return None
+    if backend not in RATE_LIMIT_BACKENDS:
+        raise ValueError(f"Unknown EXERCISE_API_RATE_BACKEND: {backend}")
+    return RATE_LIMIT_BACKENDS[backend](rate, max(burst, 1))
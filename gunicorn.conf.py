@@ -0,0 +1,45 @@
+# Summary: Gunicorn Server Configuration
+# Description:
+# Selects the Gunicorn worker model from the SERVING_MODE environment variable
+# so one image can run either way:
+#   - "sync":   classic one-request-per-worker processes (default)
+#   - "gevent": cooperative workers; blocking I/O in requests and PyMySQL yields
+#               to other requests, so one worker holds hundreds of in-flight
+#               ExerciseDB searches and MySQL queries.
+# Worker count, connections per worker and timeouts are also env-tunable.
+# GUNICORN_PRELOAD=true imports the app once in the master so forked workers
+# share its memory and start instantly; post_fork() then drops any pooled DB
+# connections inherited from the master.
+
+import multiprocessing
+import os
+
+SERVING_MODE = os.environ.get("SERVING_MODE", "sync")
+preload_app = os.environ.get("GUNICORN_PRELOAD", "false").lower() == "true"
+
+if preload_app and SERVING_MODE == "gevent":
+    # The app is imported before the workers patch; patch first so its locks are cooperative
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(2, multiprocessing.cpu_count())))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 25))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# --------- Worker Model --------- #
+if SERVING_MODE == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 500))
+elif SERVING_MODE == "sync":
+    worker_class = "sync"
+else:
+    raise RuntimeError(f"Unknown SERVING_MODE: {SERVING_MODE}")
+
+
+# --------- Server Hooks --------- #
+def post_fork(server, worker):
+    if preload_app:
+        from app import reset_after_fork
+        reset_after_fork(worker.app.wsgi())
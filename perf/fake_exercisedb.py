@@ -0,0 +1,150 @@
+# Summary: Fake ExerciseDB Server
+# Description:
+# A local stand-in for the RapidAPI ExerciseDB endpoints used by the app
+# (name / bodyPart / target lookups, single exercise, paged full list) with a
+# deterministic generated dataset across the 10 body parts and configurable
+# per-request latency, so load tests never call the real API.
+#
+#     python perf/fake_exercisedb.py --port 8099 --latency-ms 120 --jitter-ms 40
+#
+# Then point the app at it with EXERCISE_API_URL=http://127.0.0.1:8099.
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlparse
+
+BODY_PARTS = {
+    "back": ["lats", "upper back", "spine"],
+    "cardio": ["cardiovascular system"],
+    "chest": ["pectorals", "serratus anterior"],
+    "lower arms": ["forearms"],
+    "lower legs": ["calves"],
+    "neck": ["levator scapulae"],
+    "shoulders": ["delts"],
+    "upper arms": ["biceps", "triceps"],
+    "upper legs": ["quads", "hamstrings", "glutes", "abductors", "adductors"],
+    "waist": ["abs"],
+}
+EQUIPMENT = ["body weight", "barbell", "dumbbell", "cable", "kettlebell", "band"]
+MOVES = ["press", "row", "curl", "raise", "squat", "lunge", "crunch", "stretch", "pull", "push"]
+
+
+def build_dataset(size=1300, seed=1):
+    """Generate `size` exercises spread over the body parts (same output for the same seed)."""
+    rng = random.Random(seed)
+    parts = sorted(BODY_PARTS)
+    dataset = []
+    for i in range(size):
+        body_part = parts[i % len(parts)]
+        target = rng.choice(BODY_PARTS[body_part])
+        equipment = rng.choice(EQUIPMENT)
+        dataset.append({
+            "id": f"{i:04d}",
+            "name": f"{equipment} {target} {rng.choice(MOVES)} {i}",
+            "bodyPart": body_part,
+            "target": target,
+            "equipment": equipment,
+            "gifUrl": f"https://example.invalid/gifs/{i:04d}.gif",
+            "secondaryMuscles": [],
+            "instructions": [f"Step {n}" for n in range(1, 4)],
+        })
+    return dataset
+
+
+def _slug(value):
+    return value.lower().replace(" ", "-")
+
+
+# ------------------------------
+# Request Handler
+# ------------------------------
+class FakeExerciseDB(BaseHTTPRequestHandler):
+    dataset = []
+    latency = 0.0
+    jitter = 0.0
+    requests_served = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        if self.latency or self.jitter:
+            time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        with self._lock:
+            type(self).requests_served += 1
+
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/")]
+        if parts[:1] != ["exercises"]:
+            return self._send(404, {"message": "not found"})
+
+        if len(parts) == 1:
+            params = parse_qs(url.query)
+            limit = int(params.get("limit", ["10"])[0])
+            offset = int(params.get("offset", ["0"])[0])
+            return self._send(200, self.dataset[offset:offset + limit])
+
+        if len(parts) == 3 and parts[1] == "exercise":
+            match = next((ex for ex in self.dataset if ex["id"] == parts[2]), None)
+            return self._send(200, match) if match else self._send(404, {"message": "not found"})
+
+        if len(parts) == 3:
+            field = {"name": "name", "bodyPart": "bodyPart", "target": "target"}.get(parts[1])
+            if field is None:
+                return self._send(404, {"message": "not found"})
+            needle = _slug(parts[2])
+            if field == "name":
+                matches = [ex for ex in self.dataset if needle in _slug(ex["name"])]
+            else:
+                matches = [ex for ex in self.dataset if _slug(ex[field]) == needle]
+            return self._send(200, matches[:10])
+
+        return self._send(404, {"message": "not found"})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0, size=1300):
+    """Start the fake API on a background thread. Returns (server, base_url)."""
+    handler = type("ConfiguredFakeExerciseDB", (FakeExerciseDB,), {
+        "dataset": build_dataset(size),
+        "latency": latency_ms / 1000.0,
+        "jitter": jitter_ms / 1000.0,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake ExerciseDB API for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=25)
+    parser.add_argument("--size", type=int, default=1300)
+    args = parser.parse_args()
+
+    server, url = start_server(args.host, args.port, args.latency_ms, args.jitter_ms, args.size)
+    print(f"Fake ExerciseDB on {url} ({args.size} exercises, {args.latency_ms}±{args.jitter_ms}ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
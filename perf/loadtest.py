@@ -0,0 +1,375 @@
+# Summary: Load Test Runner
+# Description:
+# Drives scripted scenarios against the app with concurrent virtual users and
+# reports req/s and p50/p95/p99 per route. By default it is self-contained:
+# it seeds a SQLite (or --database-url MySQL) database, starts the fake
+# ExerciseDB (perf/fake_exercisedb.py) and runs the app under Gunicorn with
+# the chosen SERVING_MODE. --target points it at an already running app
+# seeded with perf/seed.py instead.
+#
+# Scenarios:
+#   login_storm        sign in / sign out as random members
+#   search_mix         searches across the 10 body parts
+#   save_delete_churn  save an exercise, list My Exercises, delete one
+#   api_churn          the same interaction through /api/v1 (gzip, id-only listing)
+#   admin_browse       dashboard pages, filters and sorts as the admin
+#   booking_burst      every member books the next class session at once, then
+#                      cancels; a session with more bookings than seats is
+#                      reported as an "overbooked" error
+#
+#     python perf/loadtest.py                                 # all scenarios, compare to baseline
+#     python perf/loadtest.py --scenario search_mix --duration 30 --concurrency 32
+#     python perf/loadtest.py --save-baseline                 # record a new perf/baseline.json
+#
+# The run exits with status 1 when a route's p95 or throughput regresses
+# beyond --tolerance against the baseline.
+
+import argparse
+from collections import defaultdict
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from fake_exercisedb import BODY_PARTS, start_server
+from seed import ADMIN_EMAIL, PASSWORD, ROOT, create_seeded_app, member_email, seed
+
+DEFAULT_BASELINE = os.path.join(ROOT, "perf", "baseline.json")
+SAVED_ID_PATTERN = re.compile(r"/delete_exercise/(\d+)")
+NEXT_PAGE_PATTERN = re.compile(r'href="(/dashboard\?[^"]*after=[^"]*)"')
+
+
+# ------------------------------
+# Recorder
+# Thread-safe latency samples per route label.
+# ------------------------------
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, label, millis, ok):
+        with self._lock:
+            self.samples[label].append(millis)
+            if not ok:
+                self.errors[label] += 1
+
+    def summary(self, elapsed):
+        routes = {}
+        for label, samples in sorted(self.samples.items()):
+            cuts = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+            routes[label] = {
+                "requests": len(samples),
+                "errors": self.errors[label],
+                "rps": round(len(samples) / elapsed, 2),
+                "p50": round(cuts[49], 2),
+                "p95": round(cuts[94], 2),
+                "p99": round(cuts[98], 2),
+            }
+        return routes
+
+
+# ------------------------------
+# VirtualUser
+# One cookie jar per simulated member.
+# ------------------------------
+class VirtualUser:
+    def __init__(self, base_url, recorder, index, members):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.index = index
+        self.members = members
+        self.http = requests.Session()
+        self.rng = random.Random(index)
+
+    def request(self, label, method, path, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        kwargs.setdefault("timeout", 30)
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.add(label, (time.perf_counter() - started) * 1000, ok)
+        return response
+
+    def login(self, email=None):
+        email = email or member_email(self.rng.randrange(self.members))
+        return self.request("POST /login", "POST", "/login", data={"email": email, "password": PASSWORD})
+
+
+# ---------- Scenarios ---------- #
+def login_storm(vu):
+    vu.http.cookies.clear()
+    vu.login()
+    vu.request("GET /logout", "GET", "/logout")
+
+
+def search_mix(vu):
+    body_part = vu.rng.choice(sorted(BODY_PARTS))
+    vu.request("GET /exercises", "GET", "/exercises", params={"body_part": body_part})
+
+
+def save_delete_churn(vu):
+    exercise_id = f"{vu.rng.randrange(1300):04d}"
+    vu.request("POST /save_exercise/<id>", "POST", f"/save_exercise/{exercise_id}",
+               data={"name": f"Churn {exercise_id}", "target": "pectorals", "equipment": "barbell"})
+    listing = vu.request("GET /my_exercises", "GET", "/my_exercises")
+    ids = SAVED_ID_PATTERN.findall(listing.text) if listing is not None else []
+    if ids:
+        vu.request("POST /delete_exercise/<id>", "POST", f"/delete_exercise/{vu.rng.choice(ids)}")
+
+
+def api_churn(vu):
+    exercise_id = f"{vu.rng.randrange(1300):04d}"
+    vu.request("POST /api/v1/saved", "POST", "/api/v1/saved",
+               json={"id": exercise_id, "name": f"Churn {exercise_id}", "target": "pectorals"})
+    listing = vu.request("GET /api/v1/saved", "GET", "/api/v1/saved", params={"fields": "id"},
+                         headers={"Accept-Encoding": "gzip"})
+    ids = [row["id"] for row in listing.json()["saved"]] if listing is not None and listing.ok else []
+    if ids:
+        vu.request("DELETE /api/v1/saved/<id>", "DELETE", f"/api/v1/saved/{vu.rng.choice(ids)}")
+
+
+def admin_browse(vu):
+    params = vu.rng.choice([
+        {}, {"sort": "created_at", "order": "desc"}, {"subscription": "Monthly"},
+        {"gender": "Female", "per_page": 100},
+    ])
+    page = vu.request("GET /dashboard", "GET", "/dashboard", params=params)
+    for _ in range(3):
+        match = NEXT_PAGE_PATTERN.search(page.text) if page is not None else None
+        if not match:
+            break
+        page = vu.request("GET /dashboard?after", "GET", match.group(1).replace("&amp;", "&"))
+
+
+def booking_burst(vu):
+    listing = vu.request("GET /classes/schedule", "GET", "/classes/schedule")
+    sessions = listing.json()["sessions"] if listing is not None and listing.ok else []
+    if not sessions:
+        return
+    target = sessions[0]
+    if target["booked"] > target["capacity"]:
+        vu.recorder.add("overbooked", 0, False)
+
+    booking_id = target["booking_id"]
+    if booking_id is None:
+        booked = vu.request("POST /classes/<id>/book", "POST", f"/classes/{target['class_id']}/book",
+                            json={"starts_at": target["starts_at"]})
+        booking_id = booked.json().get("booking_id") if booked is not None and booked.ok else None
+    if booking_id is not None:
+        vu.request("POST /classes/bookings/<id>/cancel", "POST", f"/classes/bookings/{booking_id}/cancel",
+                   headers={"Accept": "application/json"})
+
+
+SCENARIOS = {
+    "login_storm": (None, login_storm),
+    "search_mix": ("member", search_mix),
+    "save_delete_churn": ("member", save_delete_churn),
+    "api_churn": ("member", api_churn),
+    "admin_browse": ("admin", admin_browse),
+    "booking_burst": ("member", booking_burst),
+}
+
+
+def run_scenario(name, base_url, members, concurrency, duration):
+    """Run one scenario for `duration` seconds; returns its per-route summary."""
+    login_as, step = SCENARIOS[name]
+    recorder = Recorder()
+    users = [VirtualUser(base_url, Recorder(), i, members) for i in range(concurrency)]
+    for vu in users:
+        # Sign-in for the scenario itself is not measured
+        if login_as == "admin":
+            vu.login(ADMIN_EMAIL)
+        elif login_as == "member":
+            vu.login()
+        vu.recorder = recorder
+
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+
+    def loop(vu):
+        while time.monotonic() < deadline:
+            step(vu)
+
+    threads = [threading.Thread(target=loop, args=(vu,)) for vu in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {"elapsed": round(elapsed, 2), "routes": recorder.summary(elapsed)}
+
+
+# ---------- Local Server ---------- #
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(args, api_url):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=args.database_url,
+        DB_STARTUP_MODE="lazy",
+        EXERCISE_API_URL=api_url,
+        SERVING_MODE=args.serving_mode,
+        WEB_CONCURRENCY=str(args.workers),
+        PORT=str(port),
+        # The storms come from one client address; keep them under the concurrency caps only
+        ADMISSION_USER_RATES="",
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "run:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/health/ready", timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError("The app did not become ready; run gunicorn by hand to see why.")
+
+
+# ---------- Baseline ---------- #
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Returns a list of human-readable regressions against the baseline."""
+    regressions = []
+    for name, scenario in baseline.get("scenarios", {}).items():
+        current = results["scenarios"].get(name)
+        if current is None:
+            continue
+        for label, base in scenario["routes"].items():
+            route = current["routes"].get(label)
+            if route is None:
+                regressions.append(f"{name} {label}: no requests recorded")
+                continue
+            if route["p95"] > base["p95"] * (1 + tolerance) and route["p95"] - base["p95"] > min_delta_ms:
+                regressions.append(f"{name} {label}: p95 {route['p95']}ms vs baseline {base['p95']}ms")
+            if route["rps"] < base["rps"] * (1 - tolerance):
+                regressions.append(f"{name} {label}: {route['rps']} req/s vs baseline {base['rps']} req/s")
+            if route["errors"] > base["errors"] + route["requests"] * 0.01:
+                regressions.append(f"{name} {label}: {route['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+
+def print_report(results):
+    for name, scenario in results["scenarios"].items():
+        print(f"\n{name} ({scenario['elapsed']}s)")
+        print(f"  {'route':<28}{'req':>7}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for label, route in scenario["routes"].items():
+            print(f"  {label:<28}{route['requests']:>7}{route['errors']:>6}{route['rps']:>9}"
+                  f"{route['p50']:>9}{route['p95']:>9}{route['p99']:>9}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load-test the app and compare against a baseline.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all).")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Virtual users.")
+    parser.add_argument("--target", help="Base URL of a running, seeded app (skips local setup).")
+    parser.add_argument("--database-url", help="Database for the local app (default: temporary SQLite).")
+    parser.add_argument("--users", type=int, default=200, help="Members to seed.")
+    parser.add_argument("--saved", type=int, default=10, help="Saved exercises per seeded member.")
+    parser.add_argument("--api-latency-ms", type=float, default=100)
+    parser.add_argument("--api-jitter-ms", type=float, default=25)
+    parser.add_argument("--serving-mode", default=os.environ.get("SERVING_MODE", "gevent"))
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression.")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="Ignore p95 changes smaller than this.")
+    parser.add_argument("--output", help="Also write the results JSON here.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+    process = tmpdir = None
+
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        if not args.database_url:
+            tmpdir = tempfile.TemporaryDirectory()
+            args.database_url = f"sqlite:///{os.path.join(tmpdir.name, 'loadtest.db')}"
+        from app import db
+
+        app = create_seeded_app(args.database_url)
+        with app.app_context():
+            seed(db, args.users, args.saved, progress=False)
+        _, api_url = start_server(latency_ms=args.api_latency_ms, jitter_ms=args.api_jitter_ms)
+        process, base_url = start_app(args, api_url)
+
+    results = {
+        "meta": {
+            "concurrency": args.concurrency, "duration": args.duration, "users": args.users,
+            "saved": args.saved, "serving_mode": args.serving_mode, "workers": args.workers,
+            "api_latency_ms": args.api_latency_ms, "target": args.target or "local",
+        },
+        "scenarios": {},
+    }
+    try:
+        for name in scenarios:
+            print(f"Running {name} for {args.duration:g}s with {args.concurrency} users...")
+            results["scenarios"][name] = run_scenario(
+                name, base_url, args.users, args.concurrency, args.duration
+            )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(results, fh, indent=2)
+            fh.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nNo baseline to compare against (use --save-baseline).")
+        return 0
+    with open(args.baseline) as fh:
+        regressions = compare(results, json.load(fh), args.tolerance, args.min_delta_ms)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
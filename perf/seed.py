@@ -0,0 +1,130 @@
+# Summary: Performance Data Seeder
+# Description:
+# Fills a database with N members (perf-<i>@example.com, one shared password
+# hashed once with PASSWORD_HASH_METHOD so logins are realistic), one admin
+# (perf-admin@example.com) and M saved exercises per member, using chunked
+# executemany inserts. Used by the load tests and benchmarks; also runnable:
+#
+#     python perf/seed.py --database-url sqlite:////tmp/perf.db --users 1000 --saved 20
+
+import argparse
+from datetime import datetime, timedelta
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert, text  # noqa: E402
+
+PASSWORD = "perf-pass"
+ADMIN_EMAIL = "perf-admin@example.com"
+SUBSCRIPTIONS = ["Monthly", "Yearly", "Trial"]
+
+
+def member_email(i):
+    return f"perf-{i}@example.com"
+
+
+def seed_users(db, count, password_hash, chunk_size=5000):
+    """Insert `count` members plus the admin; returns the member ids."""
+    from app.models import User
+
+    start = datetime(2023, 1, 1)
+    rows = [{
+        "first_name": "Perf", "last_name": f"Member {i}", "national_id": f"perf-{i}",
+        "email": member_email(i), "password_hash": password_hash, "age": 18 + i % 50,
+        "gender": "Female" if i % 2 else "Male", "subscription": SUBSCRIPTIONS[i % 3],
+        "role": "user", "created_at": start + timedelta(minutes=i),
+    } for i in range(count)]
+    rows.append({
+        "first_name": "Perf", "last_name": "Admin", "national_id": "perf-admin",
+        "email": ADMIN_EMAIL, "password_hash": password_hash, "role": "admin",
+        "created_at": start,
+    })
+    for offset in range(0, len(rows), chunk_size):
+        db.session.execute(insert(User), rows[offset:offset + chunk_size])
+        db.session.commit()
+    return [row[0] for row in db.session.execute(
+        text("SELECT id FROM users WHERE national_id LIKE 'perf-%' AND role = 'user' ORDER BY id"))]
+
+
+def seed_saved_exercises(db, user_ids, per_user, chunk_size=10000, progress=False):
+    """Insert `per_user` saved exercises for every member; returns the row count."""
+    from app.models import UserExercise
+
+    start = datetime(2023, 1, 1)
+    batch = []
+    total = 0
+    for user_id in user_ids:
+        for n in range(per_user):
+            batch.append({
+                "user_id": user_id, "exercise_id": f"{n:04d}", "exercise_name": f"Exercise {n}",
+                "target": "pectorals", "equipment": "body weight",
+                "created_at": start + timedelta(minutes=n),
+            })
+            if len(batch) >= chunk_size:
+                db.session.execute(insert(UserExercise), batch)
+                db.session.commit()
+                total += len(batch)
+                batch = []
+                if progress:
+                    print(f"  seeded {total:,} saved exercises", end="\r")
+    if batch:
+        db.session.execute(insert(UserExercise), batch)
+        db.session.commit()
+        total += len(batch)
+    return total
+
+
+def seed(db, users, saved_per_user, password=PASSWORD, progress=True):
+    """Seed members, the admin and their saved exercises; returns the member ids."""
+    from flask import current_app
+    from werkzeug.security import generate_password_hash
+
+    started = time.perf_counter()
+    password_hash = generate_password_hash(password, method=current_app.config["PASSWORD_HASH_METHOD"])
+    user_ids = seed_users(db, users, password_hash)
+    total = seed_saved_exercises(db, user_ids, saved_per_user, progress=progress)
+    print(f"Seeded {len(user_ids):,} members / {total:,} saved exercises "
+          f"in {time.perf_counter() - started:.1f}s")
+    return user_ids
+
+
+def seeded_user_ids(db):
+    return [row[0] for row in db.session.execute(
+        text("SELECT id FROM users WHERE national_id LIKE 'perf-%' AND role = 'user' ORDER BY id"))]
+
+
+def create_seeded_app(database_url):
+    """Build the app against `database_url` and bring its schema up to date."""
+    os.environ["SQLALCHEMY_DATABASE_URI"] = database_url
+    os.environ["DB_STARTUP_MODE"] = "lazy"
+
+    from app import create_app
+    from app.migrations import upgrade
+
+    app = create_app()
+    with app.app_context():
+        upgrade(echo=lambda message: None)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed members and saved exercises for load tests.")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--saved", type=int, default=20, help="Saved exercises per member.")
+    args = parser.parse_args()
+
+    from app import db
+
+    app = create_seeded_app(args.database_url)
+    with app.app_context():
+        seed(db, args.users, args.saved)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,24 @@
 # Description:
 # This file initializes the Flask application using create_app()
 # and runs it in development mode when executed directly.
+# With SERVING_MODE=gevent the standard library is monkey-patched first,
+# so the same cooperative I/O model is used as under the Gunicorn gevent worker.
 
-from app import create_app   
+import os
+
+if os.environ.get("SERVING_MODE") == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import create_app  # noqa: E402
 
 app = create_app()
 
 # Run development server (not used in production; Gunicorn handles that)
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    if app.config["SERVING_MODE"] == "gevent":
+        from gevent.pywsgi import WSGIServer
+        print("Serving with gevent on http://0.0.0.0:5000")
+        WSGIServer(("0.0.0.0", 5000), app).serve_forever()
+    else:
+        app.run(host="0.0.0.0", port=5000, debug=True)
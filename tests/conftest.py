@@ -6,6 +6,7 @@
 
 import pytest
 import os
+from flask import current_app, has_app_context
 from app import create_app, db
 from app.models import User
 
@@ -43,6 +44,8 @@ def test_client():
 # Runs after every test and removes any test
 # user accounts created during testing.
 # Ensures database isolation between tests.
+# Pure unit tests run without an app or
+# database, so there is nothing to clean.
 # -------------------------------------------
 @pytest.fixture(autouse=True)
 def clean_test_users():
@@ -52,6 +55,9 @@ def clean_test_users():
     """
     yield
 
+    if not has_app_context() or "sqlalchemy" not in current_app.extensions:
+        return
+
     test_emails = ["alon@example.com", "dana@example.com", "test@example.com"]
 
     for email in test_emails:
@@ -0,0 +1,106 @@
+# Summary: Admission Control Tests
+# Description:
+# Checks route classification, the memory and shared slot stores and the
+# sliding-window limiter, then that a busy search class sheds /exercises with
+# 503 + Retry-After while health probes still answer, and that repeated
+# login posts from one client (by forwarded address) are answered with 429.
+
+# tests/test_admission.py
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app.admission import (
+    MemorySlots, SharedSlots, SlidingWindowLimiter, admission, default_limits, parse_rates, route_class,
+)
+
+
+@pytest.fixture
+def memory_slots(test_client, monkeypatch):
+    store = MemorySlots()
+    monkeypatch.setattr(admission, "store", store)
+    monkeypatch.setattr(admission, "queue_timeout", 0.05)
+    return store
+
+
+def test_route_classes():
+    assert route_class("health_live", "/health/live") is None
+    assert route_class("exercises", "/exercises") == "search"
+    assert route_class("login", "/login") == "auth"
+    assert route_class("profiles", "/admin/profiles") == "admin"
+    assert route_class("user_home", "/home") == "read"
+
+
+def test_sync_defaults_use_every_worker():
+    limits, total = default_limits("sync", 4)
+    assert total == 4 and limits["search"] == 2 and limits["auth"] == 3
+    assert default_limits("sync", 2) == ({"search": 1, "auth": 1, "admin": 1, "read": 2}, 2)
+    assert default_limits("sync", 1)[1] == 1
+
+
+@pytest.mark.parametrize("store_factory", [MemorySlots, lambda: None])
+def test_slots_cap_each_class(store_factory, tmp_path):
+    store = store_factory() or SharedSlots(str(tmp_path / "slots.json"))
+
+    assert store.try_enter("search", 1)
+    assert not store.try_enter("search", 1)
+    assert store.try_enter("read", 5, total_limit=2)
+    assert not store.try_enter("read", 5, total_limit=2)
+    assert store.enqueue("search", 1) and not store.enqueue("search", 1)
+
+    store.dequeue("search")
+    store.leave("search")
+    assert store.try_enter("search", 1)
+
+
+def test_sliding_window_limiter():
+    limiter = SlidingWindowLimiter(parse_rates("auth=2/60"))
+
+    assert limiter.hit("ip:1", "auth", now=0) == 0
+    assert limiter.hit("ip:1", "auth", now=1) == 0
+    assert limiter.hit("ip:1", "auth", now=2) == pytest.approx(58)
+    assert limiter.hit("ip:2", "auth", now=2) == 0
+    assert limiter.hit("ip:1", "auth", now=60.5) == 0
+    assert limiter.hit("ip:1", "read", now=3) == 0
+
+
+def test_busy_search_class_is_shed_but_health_answers(test_client, memory_slots):
+    limit = admission.limits["search"]
+    for _ in range(limit):
+        assert memory_slots.try_enter("search", limit)
+    try:
+        response = test_client.get("/exercises", headers={"Accept": "application/json"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(admission.retry_after)
+        assert response.get_json()["error"] == "overloaded"
+        assert test_client.get("/health/live").status_code == 200
+    finally:
+        for _ in range(limit):
+            memory_slots.leave("search")
+
+
+def test_repeated_logins_are_rate_limited(test_client, memory_slots, monkeypatch):
+    monkeypatch.setattr(admission, "rate_limiter", SlidingWindowLimiter(parse_rates("auth=2/60")))
+    credentials = {"email": "nobody@example.com", "password": "wrong"}
+
+    assert test_client.post("/login", data=credentials).status_code != 429
+    assert test_client.post("/login", data=credentials).status_code != 429
+    response = test_client.post("/login", data=credentials)
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    # Viewing the sign-in page doesn't count
+    assert test_client.get("/login").status_code == 200
+
+
+def test_forwarded_clients_are_rate_limited_apart(test_client, memory_slots, monkeypatch):
+    monkeypatch.setattr(admission, "rate_limiter", SlidingWindowLimiter(parse_rates("auth=1/60")))
+    app = test_client.application
+    monkeypatch.setattr(app, "wsgi_app", ProxyFix(app.wsgi_app, x_for=1))
+    credentials = {"email": "nobody@example.com", "password": "wrong"}
+
+    def login(client_ip):
+        return test_client.post("/login", data=credentials, headers={"X-Forwarded-For": client_ip})
+
+    assert login("203.0.113.1").status_code != 429
+    assert login("203.0.113.1").status_code == 429
+    assert login("203.0.113.2").status_code != 429
@@ -0,0 +1,127 @@
+# Summary: Admin Analytics Rollup Tests
+# Description:
+# Checks that the analytics counters follow member creates, edits and
+# deletes (through the ORM flush events) and exercise saves (through the
+# Core upsert path), that `flask compact-analytics` rebuilds the same
+# numbers from the source tables, that empty rollups are built at startup,
+# and that the JSON endpoints are admin-only.
+
+# tests/test_analytics.py
+from datetime import date
+
+import pytest
+
+from app import db
+from app.analytics import ensure_built
+from app.models import AnalyticsRollup, User
+
+
+def count(dimension, value=""):
+    row = db.session.get(AnalyticsRollup, (dimension, value))
+    return row.count if row else 0
+
+
+@pytest.fixture
+def admin_session(test_client):
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = 1
+        sess["role"] = "admin"
+    yield
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+def make_member(**overrides):
+    values = dict(
+        first_name="Stats", last_name="Member", national_id="stats-1",
+        email="test@example.com", password_hash="x",
+        age=29, gender="Female", subscription="Yearly",
+    )
+    values.update(overrides)
+    user = User(**values)
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_counters_follow_member_changes(test_client):
+    members, yearly, monthly = count("members"), count("subscription", "Yearly"), count("subscription", "Monthly")
+    today = count("signup_day", date.today().isoformat())
+
+    user = make_member()
+    assert count("members") == members + 1
+    assert count("subscription", "Yearly") == yearly + 1
+    assert count("signup_day", date.today().isoformat()) == today + 1
+
+    user.subscription = "Monthly"
+    db.session.commit()
+    assert count("subscription", "Yearly") == yearly
+    assert count("subscription", "Monthly") == monthly + 1
+    assert count("members") == members + 1
+
+    db.session.delete(user)
+    db.session.commit()
+    assert count("members") == members
+    assert count("subscription", "Monthly") == monthly
+
+
+def test_exercise_saves_are_counted_once_per_member(test_client):
+    user = make_member()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = user.id
+    before = count("exercise", "0777")
+
+    test_client.post("/save_exercise/0777", data={"name": "Stats Press", "target": "pectorals"})
+    test_client.post("/save_exercise/0777", data={"name": "Stats Press", "target": "pectorals"})
+
+    assert count("exercise", "0777") == before + 1
+    assert db.session.get(AnalyticsRollup, ("exercise", "0777")).label == "Stats Press"
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+def test_compaction_matches_incremental_counters(test_client):
+    make_member(age=70, gender="Other")
+    incremental = {(row.dimension, row.value): row.count for row in AnalyticsRollup.query if row.count}
+    db.session.commit()
+
+    result = test_client.application.test_cli_runner().invoke(args=["compact-analytics"])
+    db.session.expire_all()
+    rebuilt = {(row.dimension, row.value): row.count for row in AnalyticsRollup.query if row.count}
+
+    assert result.exit_code == 0, result.output
+    for key in [("members", ""), ("gender", "Other"), ("age_band", "65+")]:
+        assert rebuilt[key] == incremental[key]
+
+
+def test_empty_rollups_are_built_once_at_startup(test_client):
+    make_member()
+    AnalyticsRollup.query.delete()
+    db.session.commit()
+
+    with db.engine.begin() as conn:
+        ensure_built(conn)
+    db.session.expire_all()
+    assert count("members") == User.query.count()
+
+    make_member(national_id="stats-2", email="dana@example.com")
+    with db.engine.begin() as conn:
+        ensure_built(conn)  # already built: counters are left alone
+    assert count("members") == User.query.count()
+
+
+def test_endpoints_are_admin_only(test_client):
+    assert test_client.get("/admin/analytics/summary").status_code == 403
+
+
+def test_endpoints_serve_rollups(test_client, admin_session):
+    make_member(subscription="Trial")
+
+    summary = test_client.get("/admin/analytics/summary").get_json()
+    signups = test_client.get("/admin/analytics/signups?days=7").get_json()
+    top = test_client.get("/admin/analytics/top_exercises?limit=3").get_json()
+
+    assert summary["subscription"]["Trial"] >= 1
+    assert summary["members"] >= 1
+    assert len(signups["days"]) == 7 and signups["days"][-1]["day"] == date.today().isoformat()
+    assert len(top["exercises"]) <= 3
@@ -0,0 +1,120 @@
+# Summary: JSON API Tests
+# Description:
+# Exercises /api/v1: field selection on catalog search, ETag revalidation,
+# gzip negotiated by Accept-Encoding, save / list / delete of saved
+# exercises without page round trips, the admin member listing and, when
+# msgpack is installed, MessagePack responses.
+
+# tests/test_api.py
+import gzip
+import json
+
+import pytest
+
+from app import db
+from app.api import api_encoder
+from app.catalog import exercise_catalog
+from app.models import CatalogExercise, User
+
+
+EXERCISES = [
+    {"id": f"{i:04d}", "name": f"chest move {i}", "bodyPart": "chest", "target": "pectorals",
+     "equipment": "barbell", "instructions": ["Lie on the bench.", "Press the bar up."] * 5}
+    for i in range(1, 41)
+]
+
+
+@pytest.fixture
+def member(test_client):
+    user = User(
+        first_name="Api", last_name="Client", national_id="api-1",
+        email="test@example.com", password_hash="x",
+        age=30, gender="Female", subscription="Monthly",
+    )
+    db.session.add(user)
+    db.session.commit()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = user.id
+        sess["role"] = "user"
+    yield user
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+@pytest.fixture
+def catalog(test_client):
+    exercise_catalog.store(EXERCISES)
+    api_encoder.clear()
+    yield exercise_catalog
+    CatalogExercise.query.delete()
+    db.session.commit()
+    exercise_catalog.load_from_db()
+
+
+def test_requires_login(test_client):
+    response = test_client.get("/api/v1/saved")
+    assert response.status_code == 401
+    assert response.get_json() == {"error": "login required"}
+
+
+def test_search_selects_fields_and_revalidates(test_client, member, catalog):
+    response = test_client.get("/api/v1/exercises?q=chest&fields=id,name,target")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["count"] == len(EXERCISES)
+    assert set(data["exercises"][0]) == {"id", "name", "target"}
+
+    again = test_client.get("/api/v1/exercises?q=chest&fields=id,name,target",
+                            headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+
+    assert test_client.get("/api/v1/exercises?q=chest&fields=id,password").status_code == 400
+
+
+def test_search_is_gzipped_when_accepted(test_client, member, catalog):
+    plain = test_client.get("/api/v1/exercises?q=chest&fields=id,name,instructions")
+    packed = test_client.get("/api/v1/exercises?q=chest&fields=id,name,instructions",
+                             headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in plain.headers
+    assert packed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in packed.headers["Vary"]
+    assert len(packed.data) < len(plain.data) / 3
+    assert json.loads(gzip.decompress(packed.data)) == plain.get_json()
+
+
+def test_save_list_and_delete_without_pages(test_client, member):
+    saved = test_client.post("/api/v1/saved", json={"id": "0007", "name": "Push Ups", "target": "pectorals"})
+    assert saved.status_code == 201
+    saved_id = saved.get_json()["id"]
+
+    listing = test_client.get("/api/v1/saved?fields=id,exercise_id").get_json()
+    assert listing == {"saved": [{"id": saved_id, "exercise_id": "0007"}], "next": None}
+
+    assert test_client.delete(f"/api/v1/saved/{saved_id}").status_code == 204
+    assert test_client.delete(f"/api/v1/saved/{saved_id}").status_code == 404
+    assert test_client.get("/api/v1/saved").get_json()["saved"] == []
+
+    assert test_client.post("/api/v1/saved", json={"target": "pectorals"}).status_code == 400
+
+
+def test_admin_user_listing(test_client, member):
+    assert test_client.get("/api/v1/admin/users").status_code == 403
+
+    with test_client.session_transaction() as sess:
+        sess["role"] = "admin"
+    data = test_client.get("/api/v1/admin/users?fields=id,email&per_page=200").get_json()
+
+    assert {"id": member.id, "email": "test@example.com"} in data["users"]
+    assert all(set(row) == {"id", "email"} for row in data["users"])
+
+
+def test_messagepack_responses(test_client, member):
+    msgpack = pytest.importorskip("msgpack")
+    test_client.post("/api/v1/saved", json={"id": "0008", "name": "Dips"})
+
+    response = test_client.get("/api/v1/saved?fields=exercise_name", headers={"Accept": "application/msgpack"})
+
+    assert response.mimetype == "application/msgpack"
+    assert msgpack.unpackb(response.data) == {"saved": [{"exercise_name": "Dips"}], "next": None}
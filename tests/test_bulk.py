@@ -0,0 +1,138 @@
+# Summary: Bulk Member Import / Export Tests
+# Description:
+# Uploads a CSV with valid, duplicate and incomplete rows through the admin
+# import page, checks the per-row report, verifies the streamed export
+# contains the imported members, and purges members in chunks with their
+# saved exercises removed by the database cascade.
+
+# tests/test_bulk.py
+import io
+
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import db
+from app.bulk import purge_members
+from app.models import User, UserExercise
+
+
+CSV_UPLOAD = """first_name,last_name,national_id,email,password,age,gender,subscription
+Bulk,One,bulk-1,bulk1@example.com,pw1,30,Male,Monthly
+Bulk,Two,bulk-2,bulk2@example.com,pw2,31,Female,Trial
+Bulk,Three,bulk-3,bulk1@example.com,pw3,32,Male,Monthly
+Bulk,Four,,bulk4@example.com,pw4,33,Female,Monthly
+Bulk,Five,bulk-5,bulk-admin@example.com,pw5,abc,Male,Monthly
+"""
+
+
+@pytest.fixture
+def admin_client(test_client):
+    admin = User(
+        first_name="Bulk", last_name="Admin", national_id="bulk-admin",
+        email="bulk-admin@example.com", password_hash=generate_password_hash("1234"),
+        age=40, gender="Male", subscription="Staff", role="admin",
+    )
+    db.session.add(admin)
+    db.session.commit()
+    test_client.post("/login", data={"email": "bulk-admin@example.com", "password": "1234"})
+    yield test_client
+
+    test_client.get("/logout")
+    User.query.filter(User.email.like("bulk%@example.com")).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def test_import_reports_rows_and_creates_members(admin_client):
+    """Valid rows are created in one batch; bad rows are reported by line."""
+    response = admin_client.post("/admin/import_users", data={
+        "file": (io.BytesIO(CSV_UPLOAD.encode()), "members.csv"),
+    }, content_type="multipart/form-data", follow_redirects=True)
+
+    assert response.status_code == 200
+    assert b"Imported 2 of 5 rows" in response.data
+    assert b"duplicate email in upload" in response.data
+    assert b"missing national_id" in response.data
+    assert b"invalid age" in response.data
+
+    member = User.query.filter_by(email="bulk2@example.com").first()
+    assert member.subscription == "Trial"
+    assert check_password_hash(member.password_hash, "pw2")
+
+    # ---------------------------------------
+    # Re-importing reports the now-existing members
+    # ---------------------------------------
+    response = admin_client.post("/admin/import_users", data={
+        "file": (io.BytesIO(CSV_UPLOAD.encode()), "members.csv"),
+    }, content_type="multipart/form-data", follow_redirects=True)
+
+    assert b"Imported 0 of 5 rows" in response.data
+    assert b"email already registered" in response.data
+
+
+def test_export_streams_members(admin_client):
+    """The export is a streamed CSV with a header row and no password hashes."""
+    admin_client.post("/admin/import_users", data={
+        "file": (io.BytesIO(CSV_UPLOAD.encode()), "members.csv"),
+    }, content_type="multipart/form-data")
+
+    response = admin_client.get("/admin/export_users?subscription=Trial")
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0].startswith("id,first_name,last_name")
+    assert any("bulk2@example.com" in line for line in lines)
+    assert not any("bulk1@example.com" in line for line in lines)
+    assert "password" not in response.get_data(as_text=True)
+
+
+def purge_members_fixture(count):
+    members = [
+        User(
+            first_name="Bulk", last_name=f"Purge{n}", national_id=f"bulk-purge-{n}",
+            email=f"bulk-purge{n}@example.com", password_hash=generate_password_hash("pw"),
+            age=25, gender="Female", subscription="Lapsed",
+        )
+        for n in range(count)
+    ]
+    db.session.add_all(members)
+    db.session.flush()
+    db.session.add_all(
+        UserExercise(user_id=member.id, exercise_id=f"00{n}", exercise_name="Plank")
+        for member in members for n in range(3)
+    )
+    db.session.commit()
+    return [member.id for member in members]
+
+
+def test_mass_delete_cascades_in_chunks(admin_client):
+    """Every matching member goes, with their saves, however small the chunks."""
+    ids = purge_members_fixture(5)
+
+    assert purge_members("delete", {"subscription": "Lapsed"}, chunk_size=2) == 5
+
+    db.session.expire_all()
+    assert User.query.filter(User.id.in_(ids)).count() == 0
+    assert UserExercise.query.filter(UserExercise.user_id.in_(ids)).count() == 0
+    # The admin was never a candidate
+    assert User.query.filter_by(email="bulk-admin@example.com").count() == 1
+
+    with pytest.raises(ValueError):
+        purge_members("delete", {})
+
+
+def test_dashboard_deactivates_selected_members(admin_client):
+    """Deactivated members keep their data but can no longer sign in."""
+    ids = purge_members_fixture(3)
+
+    response = admin_client.post("/admin/users/bulk", data={
+        "action": "deactivate", "scope": "selected", "user_ids": ids[:2],
+    }, follow_redirects=True)
+
+    assert b"2 member(s) deactivated" in response.data
+    db.session.expire_all()
+    assert [db.session.get(User, user_id).active for user_id in ids] == [False, False, True]
+    assert UserExercise.query.filter(UserExercise.user_id.in_(ids)).count() == 9
+
+    login = admin_client.post("/login", data={"email": "bulk-purge0@example.com", "password": "pw"})
+    assert b"deactivated" in login.data
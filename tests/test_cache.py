@@ -0,0 +1,119 @@
+# Summary: Exercise Response Cache Tests
+# Description:
+# Covers LRU eviction, TTL expiry, negative caching, stale-while-revalidate
+# and the shared database backend of the ExerciseDB response cache.
+
+# tests/test_cache.py
+import time
+
+from app.cache import DatabaseCacheBackend, MemoryCacheBackend, ResponseCache
+
+
+# ---------------------------------------
+# Helper: fetch function that counts calls
+# ---------------------------------------
+class CountingFetch:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_memory_backend_evicts_least_recently_used():
+    """The oldest untouched key goes first once the cache is full."""
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", [1], 0, 0)
+    backend.set("b", [2], 0, 0)
+    backend.get("a")
+    backend.set("c", [3], 0, 0)
+
+    assert backend.get("b") is None
+    assert backend.get("a") is not None
+    assert backend.get("c") is not None
+
+
+def test_hit_and_miss_counters():
+    """A second lookup for the same key is served from the cache."""
+    cache = ResponseCache(MemoryCacheBackend())
+    fetch = CountingFetch([{"id": "1"}])
+
+    assert cache.get_or_fetch("/exercises/name/curl", fetch) == [{"id": "1"}]
+    assert cache.get_or_fetch("/exercises/name/curl", fetch) == [{"id": "1"}]
+
+    assert fetch.calls == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["hits"] == 1
+
+
+def test_negative_results_are_cached_but_errors_are_not():
+    """Empty results are remembered; transient errors (None) are retried."""
+    cache = ResponseCache(MemoryCacheBackend(), negative_ttl=60)
+    empty = CountingFetch([])
+    failing = CountingFetch(None)
+
+    cache.get_or_fetch("/exercises/name/nothing", empty)
+    cache.get_or_fetch("/exercises/name/nothing", empty)
+    cache.get_or_fetch("/exercises/target/broken", failing)
+    cache.get_or_fetch("/exercises/target/broken", failing)
+
+    assert empty.calls == 1
+    assert failing.calls == 2
+
+
+def test_stale_entries_are_served_while_refreshing(test_client):
+    """Expired entries inside the stale window return at once and refresh in the background."""
+    cache = ResponseCache(MemoryCacheBackend(), ttl=0, stale_ttl=60)
+    cache.store("/exercises/bodyPart/chest", ["old"])
+    fetch = CountingFetch(["new"])
+
+    assert cache.get_or_fetch("/exercises/bodyPart/chest", fetch) == ["old"]
+
+    for _ in range(50):
+        if cache.stats["refreshes"]:
+            break
+        time.sleep(0.01)
+
+    assert fetch.calls == 1
+    assert cache.backend.get("/exercises/bodyPart/chest")[0] == ["new"]
+
+
+def test_database_backend_is_shared(test_client):
+    """Two cache instances on the database backend see each other's entries."""
+    writer = ResponseCache(DatabaseCacheBackend())
+    reader = ResponseCache(DatabaseCacheBackend())
+    writer.backend.clear()
+
+    writer.get_or_fetch("/exercises/target/biceps", CountingFetch([{"id": "0003"}]))
+    fetch = CountingFetch([])
+
+    assert reader.get_or_fetch("/exercises/target/biceps", fetch) == [{"id": "0003"}]
+    assert fetch.calls == 0
+
+    writer.backend.clear()
+
+
+def test_database_backend_leaves_request_session_alone(test_client):
+    """Cache writes use their own transaction and long keys fit the key column."""
+    from app import db
+    from app.models import User
+
+    backend = DatabaseCacheBackend()
+    backend.clear()
+    pending = User(
+        first_name="Cache", last_name="Bystander", national_id="cache-1",
+        email="test@example.com", password_hash="x", age=30, gender="Female", subscription="Monthly",
+    )
+    db.session.add(pending)
+
+    long_key = "/exercises/name/" + "a" * 500
+    backend.set(long_key, [{"id": "0001"}], time.time() + 60, time.time() + 120)
+
+    # The caller's unflushed work is neither committed nor discarded
+    assert pending in db.session.new
+    db.session.expunge(pending)
+    assert backend.get(long_key)[0] == [{"id": "0001"}]
+    assert len(DatabaseCacheBackend.storage_key(long_key)) <= 255
+    backend.clear()
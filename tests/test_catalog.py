@@ -0,0 +1,104 @@
+# Summary: Local Exercise Catalog Tests
+# Description:
+# Syncs the exercise catalog from a local stub ExerciseDB server and checks
+# that searches are answered from the in-memory indexes without calling
+# the RapidAPI endpoints.
+
+# tests/test_catalog.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+
+from app import db
+from app.catalog import exercise_catalog
+from app.models import CatalogExercise
+
+
+STUB_EXERCISES = [
+    {"id": "0001", "name": "push-up", "bodyPart": "chest", "target": "pectorals", "equipment": "body weight"},
+    {"id": "0002", "name": "barbell bench press", "bodyPart": "chest", "target": "pectorals", "equipment": "barbell"},
+    {"id": "0003", "name": "barbell curl", "bodyPart": "upper arms", "target": "biceps", "equipment": "barbell"},
+]
+
+
+# ---------------------------------------
+# Stub ExerciseDB server: serves the dataset
+# page by page on /exercises?limit=&offset=
+# ---------------------------------------
+class StubExerciseDB(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        limit = int(params.get("limit", ["10"])[0])
+        offset = int(params.get("offset", ["0"])[0])
+        body = json.dumps(STUB_EXERCISES[offset:offset + limit]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api():
+    server = HTTPServer(("127.0.0.1", 0), StubExerciseDB)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+    CatalogExercise.query.delete()
+    db.session.commit()
+    exercise_catalog.load_from_db()
+
+
+def test_sync_catalog_and_search_locally(test_client, stub_api, monkeypatch):
+    """Sync from the stub API, then search without touching the network."""
+
+    # ---------------------------------------
+    # Sync the catalog (page size 2 forces paging)
+    # ---------------------------------------
+    runner = test_client.application.test_cli_runner()
+    result = runner.invoke(args=["sync-catalog", "--url", stub_api, "--page-size", "2"])
+
+    assert result.exit_code == 0, result.output
+    assert "3 added" in result.output
+    assert CatalogExercise.query.count() == 3
+
+    # ---------------------------------------
+    # Indexes answer name / body part / target lookups
+    # ---------------------------------------
+    assert [ex["id"] for ex in exercise_catalog.search("barbell")] == ["0002", "0003"]
+    assert [ex["id"] for ex in exercise_catalog.search("chest")] == ["0001", "0002"]
+    assert [ex["id"] for ex in exercise_catalog.search("biceps")] == ["0003"]
+    assert [ex["id"] for ex in exercise_catalog.by_equipment("body weight")] == ["0001"]
+
+    # ---------------------------------------
+    # The /exercises route must not call the API
+    # ---------------------------------------
+    def no_network(*args, **kwargs):
+        raise AssertionError("ExerciseDB API should not be called")
+
+    monkeypatch.setattr(requests, "get", no_network)
+    monkeypatch.setattr(requests.Session, "request", no_network)
+
+    test_client.post("/register", data={
+        "first_name": "Catalog",
+        "last_name": "Tester",
+        "national_id": "222333444",
+        "email": "test@example.com",
+        "password": "1234",
+        "age": "30",
+        "gender": "Female",
+        "subscription": "Trial"
+    })
+    response = test_client.post("/exercises", data={"body_part": "upper arms"})
+
+    assert response.status_code == 200
+    assert b"barbell curl" in response.data
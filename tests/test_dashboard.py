@@ -0,0 +1,72 @@
+# Summary: Admin Dashboard Tests
+# Description:
+# Seeds an admin and a handful of members, then checks that the dashboard
+# pages through them with keyset cursors, filters server-side and reports
+# the filtered total.
+
+# tests/test_dashboard.py
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+
+
+# ---------------------------------------
+# Seed: one admin + five members
+# (three Monthly, two Trial)
+# ---------------------------------------
+@pytest.fixture
+def seeded_members(test_client):
+    users = [User(
+        first_name="Dash", last_name="Admin", national_id="dash-admin",
+        email="dash-admin@example.com", password_hash=generate_password_hash("1234"),
+        age=40, gender="Male", subscription="Staff", role="admin",
+    )]
+    for i in range(5):
+        users.append(User(
+            first_name=f"Member{i}", last_name="Dash", national_id=f"dash-{i}",
+            email=f"dash{i}@example.com", password_hash="x",
+            age=20 + i, gender="Female", subscription="Monthly" if i < 3 else "Trial",
+        ))
+    db.session.add_all(users)
+    db.session.commit()
+
+    test_client.post("/login", data={"email": "dash-admin@example.com", "password": "1234"})
+    yield users
+
+    test_client.get("/logout")
+    for user in users:
+        db.session.delete(user)
+    db.session.commit()
+
+
+def test_dashboard_pages_with_keyset_cursor(test_client, seeded_members):
+    """Walking the Next links visits every filtered member exactly once."""
+    seen = []
+    url = "/dashboard?gender=Female&per_page=2"
+
+    while url:
+        response = test_client.get(url)
+        assert response.status_code == 200
+        assert b"Total Members: 5" in response.data
+        seen += [i for i in range(5) if f"dash{i}@example.com".encode() in response.data]
+
+        marker = b'href="/dashboard?after='
+        start = response.data.find(marker)
+        if start == -1:
+            url = None
+        else:
+            end = response.data.index(b'"', start + 6)
+            url = response.data[start + 6:end].decode().replace("&amp;", "&")
+
+    assert seen == [0, 1, 2, 3, 4]
+
+
+def test_dashboard_filters_by_subscription(test_client, seeded_members):
+    """Only members matching the filter are listed and counted."""
+    response = test_client.get("/dashboard?subscription=Trial&sort=created_at&order=desc")
+
+    assert b"Total Members: 2" in response.data
+    assert b"dash3@example.com" in response.data
+    assert b"dash0@example.com" not in response.data
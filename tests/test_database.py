@@ -0,0 +1,72 @@
+# Summary: Connection Pool and Read-Replica Routing Tests
+# Description:
+# Checks the per-worker-model pool sizing and connection budget, and runs
+# an app with a primary and a replica SQLite database to show that
+# read-only pages read from the replica while writes, and the reads right
+# after them, stay on the primary.
+
+# tests/test_database.py
+import pytest
+
+from app import create_app, db
+from app.database import engine_options, replica_binds, replica_router
+from app.models import User, UserExercise
+
+
+def test_pool_sizes_follow_worker_model_and_budget():
+    assert engine_options({}, "sync")["pool_size"] == 5
+    assert engine_options({}, "gevent")["max_overflow"] == 10
+
+    # 3 pods x 2 workers sharing 30 connections: at most 5 per process
+    options = engine_options({"DB_CONNECTION_BUDGET": "30", "DB_POOL_PROCESSES": "6"}, "gevent")
+    assert options["pool_size"] + options["max_overflow"] == 5
+
+
+def test_replica_binds_from_hosts():
+    binds = replica_binds({"DB_REPLICA_HOSTS": "db-r1, db-r2"}, "u", "p", "shviki")
+    assert binds == {
+        "replica_0": "mysql+pymysql://u:p@db-r1:3306/shviki",
+        "replica_1": "mysql+pymysql://u:p@db-r2:3306/shviki",
+    }
+
+
+@pytest.fixture
+def replicated_app(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.setenv("DB_REPLICA_URIS", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setenv("DB_STARTUP_MODE", "create")
+    # Restored after the test, so other apps in this process don't route to a stale bind
+    monkeypatch.setattr(replica_router, "bind_keys", replica_router.bind_keys)
+    # Likewise the "replica_0" metadata the bind adds to the shared db object
+    monkeypatch.setattr(db, "metadatas", dict(db.metadatas))
+    app = create_app()
+    app.config["TESTING"] = True
+
+    with app.app_context():
+        db.metadata.create_all(db.engines["replica_0"])
+        for engine, name in ((db.engines[None], "Primary Row"), (db.engines["replica_0"], "Replica Row")):
+            with engine.begin() as conn:
+                conn.execute(User.__table__.insert(), {
+                    "id": 1, "first_name": "R", "last_name": "M", "national_id": "r-1",
+                    "email": "replica@example.com", "password_hash": "x", "age": 30,
+                    "gender": "Other", "subscription": "Monthly", "role": "user",
+                })
+                conn.execute(UserExercise.__table__.insert(), {
+                    "user_id": 1, "exercise_id": "0001", "exercise_name": name,
+                })
+        yield app
+        db.session.remove()
+
+
+def test_reads_use_replica_until_member_writes(replicated_app):
+    client = replicated_app.test_client()
+    with client.session_transaction() as sess:
+        sess["user_id"] = 1
+
+    assert b"Replica Row" in client.get("/my_exercises").data
+
+    client.post("/save_exercise/0002", data={"name": "Fresh Row", "target": "lats"})
+    page = client.get("/my_exercises").data
+
+    # Read-your-writes: the member sees the primary right after saving
+    assert b"Primary Row" in page and b"Fresh Row" in page
@@ -0,0 +1,87 @@
+# Summary: ExerciseDB Client Tests
+# Description:
+# Runs the pooled ExerciseDB client against a local stub server with
+# per-endpoint latency to check that the name/bodyPart/target probes run
+# in parallel, keep their priority order, and that a hung upstream is
+# cut off by the read timeout instead of blocking the worker. A 200 with a
+# non-JSON body counts as an upstream failure.
+
+# tests/test_exercise_api.py
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.exercise_api import ExerciseAPIClient
+
+
+# ---------------------------------------
+# Stub responses: path -> (delay seconds, status, body)
+# ---------------------------------------
+ROUTES = {
+    "/exercises/name/chest": (0.3, 404, []),
+    "/exercises/bodyPart/chest": (0.3, 200, [{"id": "0001", "name": "push-up"}]),
+    "/exercises/target/chest": (0.3, 200, [{"id": "0009", "name": "fly"}]),
+    "/exercises/name/hang": (2.0, 200, [{"id": "0002", "name": "never"}]),
+    "/exercises/name/proxy": (0, 200, b"<html>Bad gateway</html>"),
+}
+
+
+class SlowExerciseDB(BaseHTTPRequestHandler):
+    def do_GET(self):
+        delay, status, body = ROUTES.get(self.path, (0, 404, []))
+        time.sleep(delay)
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client(test_client):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowExerciseDB)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    api = ExerciseAPIClient()
+    api.base_url = f"http://127.0.0.1:{server.server_port}"
+    api.read_timeout = 0.5
+    api.retries = 0
+    yield api
+    server.shutdown()
+
+
+def test_probes_run_in_parallel_and_keep_priority(client):
+    """Three 0.3s probes finish in roughly 0.3s, and bodyPart beats target."""
+    started = time.monotonic()
+    result = client.search("chest")
+    elapsed = time.monotonic() - started
+
+    assert [ex["id"] for ex in result] == ["0001"]
+    assert elapsed < 0.8
+
+
+def test_hung_upstream_is_cut_off_by_timeout(client):
+    """A probe that never answers in time is treated as an error, not a hang."""
+    started = time.monotonic()
+    result = client.search("hang")
+    elapsed = time.monotonic() - started
+
+    assert result == []
+    assert elapsed < 1.5
+
+
+def test_non_json_body_is_an_upstream_failure(client):
+    """A proxy error page served with 200 is treated like a failed call, not a crash."""
+    assert client.fetch("/exercises/name/proxy") is None
+    assert client.consecutive_failures == 1
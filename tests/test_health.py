@@ -0,0 +1,68 @@
+# Summary: Liveness and Readiness Tests
+# Description:
+# Checks that /health/live never touches dependencies, that /health/ready
+# reports per-dependency status and latency, caches its result between
+# probes, goes unready when the connection pool is saturated, and stays
+# ready while only the ExerciseDB upstream is failing.
+
+# tests/test_health.py
+from app.exercise_api import exercise_api
+from app.health import health_checks
+
+
+def test_liveness_is_dependency_free(test_client):
+    """Liveness answers without running any SQL."""
+    response = test_client.get("/health/live")
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "ok"}
+    assert "db;dur=0.0" in response.headers["Server-Timing"]
+
+
+def test_readiness_reports_checks_and_caches(test_client):
+    """The first probe runs the checks; the next one reuses the result."""
+    health_checks._cached = None
+
+    first = test_client.get("/health/ready")
+    second = test_client.get("/health/ready")
+
+    body = first.get_json()
+    assert first.status_code == 200
+    assert body["status"] == "ready"
+    assert body["cached"] is False
+    assert body["checks"]["database"]["ok"] is True
+    assert "latency_ms" in body["checks"]["database"]
+    assert second.get_json()["cached"] is True
+
+
+def test_saturated_pool_makes_pod_unready(test_client):
+    """Reaching the saturation threshold returns 503 without querying."""
+    health_checks._cached = None
+    original = health_checks.pool_threshold
+    health_checks.pool_threshold = 0.0
+
+    try:
+        response = test_client.get("/health/ready")
+    finally:
+        health_checks.pool_threshold = original
+        health_checks._cached = None
+
+    assert response.status_code == 503
+    assert response.get_json()["checks"]["database"]["error"] == "connection pool saturated"
+
+
+def test_failing_upstream_only_degrades(test_client):
+    """ExerciseDB failures are reported but don't take the pod out of rotation."""
+    health_checks._cached = None
+    exercise_api.consecutive_failures = 3
+
+    try:
+        response = test_client.get("/health/ready")
+    finally:
+        exercise_api.consecutive_failures = 0
+        health_checks._cached = None
+
+    upstream = response.get_json()["checks"]["upstream"]
+    assert response.status_code == 200
+    assert upstream["state"] == "degraded"
+    assert upstream["consecutive_failures"] == 3
@@ -0,0 +1,127 @@
+# Summary: Exercise Media Proxy Tests
+# Description:
+# Serves exercise images through /media from a local stub image server and
+# checks that repeat views never go upstream, that ETag and Range requests
+# are honoured, that the disk cache evicts least recently used files across
+# workers, and that an undecodable image is served as-is for a thumbnail.
+
+# tests/test_media.py
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app.exercise_api import exercise_api
+from app.media import MediaCache, make_thumbnail, media_cache
+
+
+GIF = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00"
+    b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+BROKEN_GIF = GIF[:12]
+
+
+class StubImages(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        StubImages.requests.append(self.path)
+        if "missing" in self.path:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = BROKEN_GIF if "broken" in self.path else GIF
+        self.send_response(200)
+        self.send_header("Content-Type", "image/gif")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def media(test_client, tmp_path, monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), StubImages)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StubImages.requests = []
+    monkeypatch.setattr(exercise_api, "base_url", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(media_cache, "directory", str(tmp_path))
+    monkeypatch.setattr(media_cache, "_index", None)
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = 1
+    yield media_cache
+    with test_client.session_transaction() as sess:
+        sess.clear()
+    server.shutdown()
+
+
+def test_repeat_views_are_served_from_disk(test_client, media):
+    first = test_client.get("/media/0001")
+    second = test_client.get("/media/0001")
+
+    assert first.status_code == second.status_code == 200
+    assert first.data == second.data == GIF
+    assert first.mimetype == "image/gif"
+    assert "private" in first.headers["Cache-Control"] and "max-age" in first.headers["Cache-Control"]
+    assert len(StubImages.requests) == 1
+
+
+def test_conditional_and_range_requests(test_client, media):
+    etag = test_client.get("/media/0002").headers["ETag"]
+
+    assert test_client.get("/media/0002", headers={"If-None-Match": etag}).status_code == 304
+    partial = test_client.get("/media/0002", headers={"Range": "bytes=0-5"})
+    assert partial.status_code == 206 and partial.data == GIF[:6]
+
+
+def test_missing_image_and_login(test_client, media):
+    assert test_client.get("/media/missing").status_code == 404
+    assert test_client.get("/media/not..valid").status_code == 404
+    with test_client.session_transaction() as sess:
+        sess.clear()
+    assert test_client.get("/media/0001").status_code == 401
+
+
+def test_disk_cache_evicts_least_recently_used(media, monkeypatch):
+    monkeypatch.setattr(media, "max_bytes", 2 * len(GIF) + 2)
+    media.put("a:full", GIF, "image/gif")
+    media.put("b:full", GIF + b"b", "image/gif")
+    assert media.get("a:full") is not None  # "a" is now the most recently used
+
+    media.put("c:full", GIF + b"c", "image/gif")
+
+    assert media.get("b:full") is None
+    assert media.get("a:full") is not None and media.get("c:full") is not None
+
+    # A fresh process rebuilds the same index from the directory
+    monkeypatch.setattr(media, "_index", None)
+    assert len(media) == 2
+
+
+def test_budget_covers_every_worker(media, monkeypatch):
+    monkeypatch.setattr(media, "max_bytes", 2 * len(GIF) + 2)
+    other_worker = MediaCache()
+    other_worker.directory = media.directory
+    other_worker.max_bytes = media.max_bytes
+
+    media.put("a:full", GIF, "image/gif")
+    other_worker.put("b:full", GIF + b"b", "image/gif")
+    media.put("c:full", GIF + b"c", "image/gif")
+
+    # "a" was the oldest file in the shared directory, whichever worker wrote it
+    assert media.get("a:full") is None
+    assert other_worker.get("b:full") is not None and media.get("c:full") is not None
+    monkeypatch.setattr(media, "_index", None)
+    assert len(media) == 2
+
+
+def test_undecodable_image_thumbnail_falls_back_to_original(test_client, media):
+    pytest.importorskip("PIL")
+    assert make_thumbnail(BROKEN_GIF, 180) is None
+
+    response = test_client.get("/media/broken?size=thumb")
+
+    assert response.status_code == 200 and response.data == BROKEN_GIF
@@ -0,0 +1,40 @@
+# Summary: Metrics Endpoint Tests
+# Description:
+# Exercises a few routes and checks that /metrics exposes request latency
+# histograms, SQL timings and connection pool gauges in the Prometheus
+# text format.
+
+# tests/test_metrics.py
+from app.metrics import Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and end with +Inf, followed by _sum and _count."""
+    hist = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, route="a")
+    hist.observe(0.5, route="a")
+    hist.observe(5, route="a")
+
+    lines = hist.render()
+
+    assert 'demo_seconds_bucket{route="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{route="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="a"} 3' in lines
+
+
+def test_metrics_endpoint_exposes_request_and_db_metrics(test_client):
+    """Requests and their SQL show up on /metrics."""
+    test_client.get("/health")
+    test_client.post("/login", data={"email": "nobody@example.com", "password": "x"})
+
+    response = test_client.get("/metrics")
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_request_duration_seconds_count{endpoint="health",method="GET",status="200"}' in body
+    assert 'http_request_db_queries_bucket{endpoint="login"' in body
+    assert 'db_query_duration_seconds_count{operation="select"}' in body
+    assert 'db_pool_connections{state="size"}' in body
+    assert "# TYPE http_requests_in_flight gauge" in body
@@ -0,0 +1,74 @@
+# Summary: Password Hashing Service Tests
+# Description:
+# Checks that logins transparently upgrade hashes made with outdated
+# parameters, that hashing time is reported in Server-Timing, and that a
+# full hashing queue answers 503 with Retry-After instead of queueing more,
+# and that a timed-out hash keeps its slot until it actually finishes.
+
+# tests/test_passwords.py
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.models import User
+from app.passwords import HashingBusy, PasswordHasher, password_hasher
+
+
+@pytest.fixture
+def legacy_user(test_client):
+    user = User(
+        first_name="Legacy", last_name="Hash", national_id="legacy-1",
+        email="test@example.com",
+        password_hash=generate_password_hash("1234", method="pbkdf2:sha256:1000"),
+        age=30, gender="Male", subscription="Monthly",
+    )
+    db.session.add(user)
+    db.session.commit()
+    yield user
+
+
+def test_login_rehashes_outdated_hash(test_client, legacy_user):
+    """A successful login replaces a weak hash with the configured method."""
+    response = test_client.post("/login", data={"email": "test@example.com", "password": "1234"})
+
+    assert response.status_code == 302
+    assert "hash;dur=" in response.headers.get("Server-Timing", "")
+
+    db.session.refresh(legacy_user)
+    assert legacy_user.password_hash.startswith(password_hasher.canonical_method + "$")
+    assert not password_hasher.needs_rehash(legacy_user.password_hash)
+    test_client.get("/logout")
+
+
+def test_full_hashing_queue_sheds_with_503(test_client, legacy_user):
+    """With every slot taken, a login is rejected quickly with Retry-After."""
+    password_hasher._ensure_pool()
+    taken = 0
+    while password_hasher._slots.acquire(blocking=False):
+        taken += 1
+
+    try:
+        response = test_client.post("/login", data={"email": "test@example.com", "password": "1234"})
+    finally:
+        for _ in range(taken):
+            password_hasher._slots.release()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_timed_out_hash_keeps_its_slot():
+    """The caller gives up after the timeout, but the slot frees only when the work ends."""
+    hasher = PasswordHasher()
+    hasher.max_workers, hasher.max_queue, hasher.timeout = 1, 0, 0.05
+    release = threading.Event()
+
+    with pytest.raises(HashingBusy):
+        hasher._run(release.wait, 5)
+    assert not hasher._slots.acquire(blocking=False)
+
+    release.set()
+    hasher._executor.shutdown(wait=True)
+    assert hasher._slots.acquire(blocking=False)
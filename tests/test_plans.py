@@ -0,0 +1,96 @@
+# Summary: Workout Plan Tests
+# Description:
+# Checks that the per-member plan aggregates follow saves, re-saves and
+# deletes without re-scanning, that the batch endpoints save and remove
+# many exercises in one request, and that sets/reps/day can be set.
+
+# tests/test_plans.py
+import pytest
+
+from app import db
+from app.models import PlanAggregate, User, UserExercise
+from app.plans import plan_summary
+
+
+@pytest.fixture
+def member(test_client):
+    user = User(
+        first_name="Plan", last_name="Builder", national_id="plan-1",
+        email="test@example.com", password_hash="x",
+        age=30, gender="Female", subscription="Monthly",
+    )
+    db.session.add(user)
+    db.session.commit()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = user.id
+    yield user
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+def counts(user_id, dimension):
+    return dict(
+        (row.value, row.count)
+        for row in PlanAggregate.query.filter_by(user_id=user_id, dimension=dimension)
+    )
+
+
+def test_aggregates_follow_saves_and_deletes(test_client, member):
+    test_client.post("/save_exercise/0001", data={"name": "Push Up", "target": "pectorals", "equipment": "body weight"})
+    test_client.post("/save_exercise/0002", data={"name": "Curl", "target": "biceps", "equipment": "barbell"})
+    assert counts(member.id, "target") == {"pectorals": 1, "biceps": 1}
+
+    # Re-saving with a new target moves the count instead of adding one
+    test_client.post("/save_exercise/0002", data={"name": "Curl", "target": "forearms", "equipment": "barbell"})
+    assert counts(member.id, "target") == {"pectorals": 1, "forearms": 1}
+    assert counts(member.id, "total") == {"": 2}
+
+    row = UserExercise.query.filter_by(user_id=member.id, exercise_id="0001").one()
+    test_client.post(f"/delete_exercise/{row.id}")
+    assert counts(member.id, "target") == {"forearms": 1}
+    assert counts(member.id, "equipment") == {"barbell": 1}
+
+    summary = plan_summary(member.id)
+    assert summary["total"] == 1 and summary["updated_at"] is not None
+
+
+def test_batch_save_and_delete(test_client, member):
+    response = test_client.post("/plan/batch_save", json={"exercises": [
+        {"id": "0101", "name": "cable row", "target": "lats", "equipment": "cable", "sets": 3, "reps": 10},
+        {"id": "0102", "name": "pull up", "target": "lats", "equipment": "body weight", "day": 0},
+        {"id": "0103", "name": "shrug", "target": "traps", "equipment": "dumbbell"},
+    ]})
+    assert response.status_code == 200 and response.get_json() == {"saved": 3}
+    assert counts(member.id, "target") == {"lats": 2, "traps": 1}
+
+    row = UserExercise.query.filter_by(user_id=member.id, exercise_id="0101").one()
+    assert (row.sets, row.reps, row.day) == (3, 10, None)
+
+    ids = [row.id for row in UserExercise.query.filter_by(user_id=member.id).filter(
+        UserExercise.exercise_id.in_(["0101", "0102"]))]
+    response = test_client.post("/plan/batch_delete", data={"ids": ids})
+    assert response.status_code == 302
+    assert counts(member.id, "target") == {"traps": 1}
+
+
+def test_batch_save_rejects_bad_entries(test_client, member):
+    response = test_client.post("/plan/batch_save", json={"exercises": [{"name": "no id"}]})
+    assert response.status_code == 400
+    response = test_client.post("/plan/batch_save", json={"exercises": [{"id": "1", "name": "x", "day": 9}]})
+    assert response.status_code == 400
+    assert UserExercise.query.filter_by(user_id=member.id).count() == 0
+
+
+def test_plan_page_groups_by_day(test_client, member):
+    test_client.post("/plan/batch_save", json={"exercises": [
+        {"id": "0201", "name": "squat", "target": "quads", "equipment": "barbell"},
+    ]})
+    row = UserExercise.query.filter_by(user_id=member.id, exercise_id="0201").one()
+
+    test_client.post(f"/plan/{row.id}", data={"sets": "5", "reps": "5", "day": "2"})
+    response = test_client.get("/plan")
+
+    assert response.status_code == 200
+    assert b"Wednesday" in response.data and b"quads" in response.data
+    db.session.refresh(row)
+    assert (row.sets, row.reps, row.day) == (5, 5, 2)
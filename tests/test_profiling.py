@@ -0,0 +1,91 @@
+# Summary: Request Profiling Tests
+# Description:
+# Profiles a dashboard request on an admin's ?_profile=1 flag and checks the
+# captured SQL, stack profile and downloads, ignores the flag from members,
+# and keeps unprofiled requests that exceed the slow threshold. Entries are
+# stored when the response is closed.
+
+# tests/test_profiling.py
+import marshal
+import sys
+
+import pytest
+
+from app.profiling import fold_stack, profiler
+
+
+@pytest.fixture
+def admin_session(test_client, monkeypatch):
+    monkeypatch.setattr(profiler, "sample_interval", 0.001)
+    profiler.clear()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = 1
+        sess["role"] = "admin"
+    yield test_client
+    with test_client.session_transaction() as sess:
+        sess.clear()
+    profiler.clear()
+
+
+def test_fold_stack_is_outermost_first():
+    def inner():
+        return fold_stack(sys._getframe())
+
+    assert inner().endswith("test_profiling.py:test_fold_stack_is_outermost_first;test_profiling.py:inner")
+
+
+def test_admin_flag_profiles_request(admin_session):
+    response = admin_session.get("/dashboard?_profile=1")
+    assert b"Dashboard" in response.data
+    # Stored when the server closes the response, after the body is sent
+    response.close()
+    profile_id = response.headers["X-Profile-Id"]
+    entry = profiler.get(profile_id)
+
+    assert entry["trigger"] == "flag" and entry["endpoint"] == "dashboard"
+    assert any("FROM users" in statement for _, statement in entry["profile"].queries)
+    assert entry["profile"].stacks is not None
+
+    page = admin_session.get(f"/admin/profiles/{profile_id}")
+    assert page.status_code == 200 and b"/dashboard" in page.data
+    download = admin_session.get(f"/admin/profiles/{profile_id}/download")
+    assert download.headers["Content-Disposition"].endswith(".folded")
+
+
+def test_cprofile_download_is_pstats(admin_session, monkeypatch):
+    monkeypatch.setattr(profiler, "mode", "cprofile")
+    response = admin_session.get("/dashboard", headers={"X-Profile": "1"})
+    response.get_data()
+    response.close()
+    profile_id = response.headers["X-Profile-Id"]
+
+    download = admin_session.get(f"/admin/profiles/{profile_id}/download")
+
+    assert download.headers["Content-Disposition"].endswith(".prof")
+    assert isinstance(marshal.loads(download.data), dict)
+
+
+def test_flag_is_ignored_for_members(test_client):
+    profiler.clear()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = 1
+        sess["role"] = "user"
+
+    response = test_client.get("/home?_profile=1")
+    response.close()
+
+    assert "X-Profile-Id" not in response.headers
+    assert profiler.entries() == []
+    assert test_client.get("/admin/profiles").status_code == 403
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+def test_slow_requests_are_kept_without_profile(admin_session, monkeypatch):
+    monkeypatch.setattr(profiler, "slow_seconds", 0)
+
+    admin_session.get("/dashboard").close()
+
+    entry = profiler.entries()[0]
+    assert entry["trigger"] == "slow" and entry["profile"] is None
+    assert entry["sql_count"] >= 1
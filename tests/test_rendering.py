@@ -0,0 +1,97 @@
+# Summary: List Page Rendering Tests
+# Description:
+# Checks the derived exercise fields, that result cards are rendered once
+# and then served from the fragment cache, and that repeat visits to
+# "My Exercises" and search results answer 304 Not Modified until the
+# underlying data changes.
+
+# tests/test_rendering.py
+import pytest
+
+from app import db
+from app.catalog import exercise_catalog
+from app.models import User, UserExercise
+from app.rendering import fragment_cache, prepare_exercise
+
+
+EXERCISES = [
+    {"id": "0101", "name": "cable row", "bodyPart": "back", "target": "lats", "equipment": "cable"},
+    {"id": "0102", "name": "pull up", "bodyPart": "back", "target": "lats", "equipment": "body weight"},
+]
+
+
+@pytest.fixture
+def member(test_client):
+    user = User(
+        first_name="Render", last_name="Pages", national_id="render-1",
+        email="test@example.com", password_hash="x",
+        age=30, gender="Male", subscription="Monthly",
+    )
+    db.session.add(user)
+    db.session.commit()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = user.id
+        sess["role"] = "user"
+    yield user
+    UserExercise.query.filter_by(user_id=user.id).delete()
+    db.session.commit()
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+@pytest.fixture
+def catalog():
+    exercise_catalog.load(EXERCISES)
+    fragment_cache.clear()
+    yield exercise_catalog
+    exercise_catalog.load([])
+
+
+def test_prepare_exercise_derives_display_fields():
+    """The YouTube link and card fingerprint are computed once, on a copy."""
+    entry = {"id": "0101", "name": "cable row", "target": "lats"}
+    prepared = prepare_exercise(entry)
+
+    assert prepared["youtubeUrl"].endswith("search_query=cable+row+exercise")
+    assert "cardKey" not in entry
+    assert prepare_exercise(dict(entry, target="upper back"))["cardKey"] != prepared["cardKey"]
+
+
+def test_result_cards_are_rendered_once(test_client, member, catalog, monkeypatch):
+    """A repeated search reuses the cached card markup."""
+    monkeypatch.setattr(catalog, "ensure_loaded", lambda: None)
+
+    first = test_client.get("/exercises?body_part=back")
+    assert b"pull up" in first.data and b"cable+row+exercise" in first.data
+    assert len(fragment_cache) == 2
+
+    test_client.get("/exercises?body_part=back", headers={"If-None-Match": "other"})
+    assert len(fragment_cache) == 2
+
+
+def test_search_results_answer_304(test_client, member, catalog, monkeypatch):
+    """A repeat search with the same ETag is not rendered again."""
+    monkeypatch.setattr(catalog, "ensure_loaded", lambda: None)
+
+    first = test_client.get("/exercises?body_part=back")
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    repeat = test_client.get("/exercises?body_part=back", headers={"If-None-Match": first.headers["ETag"]})
+    assert repeat.status_code == 304
+    assert repeat.data == b""
+
+
+def test_my_exercises_answer_304_until_changed(test_client, member):
+    """The validator changes once the saved list changes."""
+    test_client.post("/save_exercise/0101", data={"name": "Cable Row", "target": "lats"})
+
+    first = test_client.get("/my_exercises")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.headers["Last-Modified"]
+    assert test_client.get("/my_exercises", headers={"If-None-Match": etag}).status_code == 304
+
+    # Saving again flashes a message and changes the list: both force a full page
+    test_client.post("/save_exercise/0102", data={"name": "Pull Up", "target": "lats"})
+    changed = test_client.get("/my_exercises", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert b"Pull Up" in changed.data
@@ -0,0 +1,100 @@
+# Summary: Saved Exercise Data Path Tests
+# Description:
+# Checks that saving the same exercise twice keeps one (refreshed) row, that
+# "My Exercises" pages newest first with a cursor, that deletes are scoped to
+# the owner, and that the migration removes duplicate saves before adding
+# the unique index.
+
+# tests/test_saved_exercises.py
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.migrations import _has_index, _user_exercise_indexes
+from app.models import User, UserExercise
+from app.saved_exercises import saved_page
+
+
+@pytest.fixture
+def member(test_client):
+    user = User(
+        first_name="Saved", last_name="Lists", national_id="saved-1",
+        email="test@example.com", password_hash="x",
+        age=30, gender="Female", subscription="Monthly",
+    )
+    db.session.add(user)
+    db.session.commit()
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = user.id
+    yield user
+    with test_client.session_transaction() as sess:
+        sess.clear()
+
+
+def test_saving_twice_keeps_one_row(test_client, member):
+    """A repeated save updates the existing row instead of duplicating it."""
+    test_client.post("/save_exercise/0001", data={"name": "Push Ups", "target": "pectorals"})
+    test_client.post("/save_exercise/0001", data={"name": "Push-Ups", "target": "pectorals"})
+
+    rows = UserExercise.query.filter_by(user_id=member.id).all()
+    assert len(rows) == 1
+    assert rows[0].exercise_name == "Push-Ups"
+
+
+def test_my_exercises_pages_newest_first(test_client, member):
+    """Pages follow (created_at, id) descending and the cursor continues the list."""
+    start = datetime(2024, 1, 1)
+    db.session.add_all(
+        UserExercise(user_id=member.id, exercise_id=f"{i:04d}", exercise_name=f"Move {i}",
+                     created_at=start + timedelta(minutes=i))
+        for i in range(5)
+    )
+    db.session.commit()
+
+    first, cursor = saved_page(member.id, per_page=3)
+    second, last_cursor = saved_page(member.id, after=cursor, per_page=3)
+
+    assert [row.exercise_name for row in first] == ["Move 4", "Move 3", "Move 2"]
+    assert [row.exercise_name for row in second] == ["Move 1", "Move 0"]
+    assert last_cursor is None
+
+    response = test_client.get("/my_exercises?per_page=3")
+    assert b"Move 4" in response.data and b"Move 1" not in response.data
+    assert b"Older" in response.data
+
+
+def test_delete_is_scoped_to_owner(test_client, member):
+    """Another member's saved exercise id is ignored."""
+    owner = User(
+        first_name="Other", last_name="Member", national_id="saved-2",
+        email="dana@example.com", password_hash="x",
+        age=31, gender="Male", subscription="Yearly",
+    )
+    db.session.add(owner)
+    db.session.commit()
+    other = UserExercise(user_id=owner.id, exercise_id="0002", exercise_name="Squat")
+    db.session.add(other)
+    db.session.commit()
+
+    test_client.post(f"/delete_exercise/{other.id}")
+
+    assert db.session.get(UserExercise, other.id) is not None
+
+
+def test_migration_removes_duplicates_before_unique_index(test_client, member):
+    """Duplicate saves made before the constraint existed are collapsed to the oldest."""
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP INDEX ux_user_exercises_user_exercise"))
+        for name in ("First", "Second"):
+            conn.execute(
+                text("INSERT INTO user_exercises (user_id, exercise_id, exercise_name) "
+                     "VALUES (:user_id, '0003', :name)"),
+                {"user_id": member.id, "name": name},
+            )
+        _user_exercise_indexes(conn)
+        assert _has_index(conn, "ux_user_exercises_user_exercise")
+
+    rows = UserExercise.query.filter_by(user_id=member.id, exercise_id="0003").all()
+    assert [row.exercise_name for row in rows] == ["First"]
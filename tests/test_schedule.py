@@ -0,0 +1,144 @@
+# Summary: Class Timetable and Booking Tests
+# Description:
+# Books a small class until it is full, checks the waitlist and its
+# promotion on cancel, rejects double bookings, fires a burst of concurrent
+# bookings at one session to show it never overbooks, and checks that an
+# admin edit reloads the timetable, seats the waitlist when the capacity
+# grows and is refused below the seats already booked.
+
+# tests/test_schedule.py
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import ClassBooking, ClassSession, GymClass, User
+from app.schedule import BookingError, book, cancel, resize_sessions, timetable
+
+
+@pytest.fixture
+def members(test_client):
+    users = [
+        User(
+            first_name="Class", last_name=f"Member{n}", national_id=f"class-{n}",
+            email=f"class{n}@example.com", password_hash="x",
+            age=30, gender="Other", subscription="Monthly",
+        )
+        for n in range(12)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    yield users
+    with test_client.session_transaction() as sess:
+        sess.clear()
+    for user in users:
+        db.session.delete(user)
+    db.session.commit()
+
+
+@pytest.fixture
+def small_class(test_client):
+    gym_class = GymClass(
+        name="Test Spin", weekdays="0,1,2,3,4,5,6", start_time="23:59", duration_minutes=30,
+        capacity=2, active=True, updated_at=datetime.utcnow(),
+    )
+    db.session.add(gym_class)
+    db.session.commit()
+    timetable.load_from_db()
+    starts_at = next(when for cls, when in timetable.occurrences() if cls["id"] == gym_class.id)
+    yield gym_class, starts_at
+    for row in ClassSession.query.filter_by(class_id=gym_class.id):
+        ClassBooking.query.filter_by(session_id=row.id).delete()
+        db.session.delete(row)
+    db.session.delete(gym_class)
+    db.session.commit()
+    timetable.load_from_db()
+
+
+def seats(class_id):
+    row = ClassSession.query.filter_by(class_id=class_id).one()
+    db.session.refresh(row)
+    return row.booked, row.waitlisted
+
+
+def test_full_class_waitlists_and_promotes_on_cancel(members, small_class):
+    gym_class, starts_at = small_class
+    first = book(members[0].id, gym_class.id, starts_at)
+    book(members[1].id, gym_class.id, starts_at)
+    status, waiting_id = book(members[2].id, gym_class.id, starts_at)
+
+    assert first[0] == "booked" and status == "waitlisted"
+    assert seats(gym_class.id) == (2, 1)
+
+    assert cancel(members[0].id, first[1])
+    assert seats(gym_class.id) == (2, 0)
+    assert db.session.get(ClassBooking, waiting_id).status == "booked"
+
+
+def test_double_booking_and_unknown_times_are_rejected(members, small_class):
+    gym_class, starts_at = small_class
+    book(members[0].id, gym_class.id, starts_at)
+
+    with pytest.raises(BookingError):
+        book(members[0].id, gym_class.id, starts_at)
+    with pytest.raises(BookingError):
+        book(members[0].id, gym_class.id, starts_at.replace(minute=30))
+
+
+def test_concurrent_burst_never_overbooks(test_client, members, small_class):
+    gym_class, starts_at = small_class
+    app = test_client.application
+
+    def attempt(user_id):
+        with app.app_context():
+            try:
+                return book(user_id, gym_class.id, starts_at)[0]
+            finally:
+                db.session.remove()
+
+    with ThreadPoolExecutor(max_workers=len(members)) as pool:
+        results = list(pool.map(attempt, [user.id for user in members]))
+
+    assert results.count("booked") == 2
+    assert results.count("waitlisted") == len(members) - 2
+    assert seats(gym_class.id) == (2, len(members) - 2)
+
+
+def test_home_page_lists_sessions_and_admin_edit_reloads(test_client, members, small_class):
+    gym_class, _ = small_class
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = members[0].id
+    assert b"Test Spin" in test_client.get("/home").data
+
+    with test_client.session_transaction() as sess:
+        sess["role"] = "admin"
+    test_client.post(f"/admin/classes/{gym_class.id}", data={
+        "name": "Test Spin Pro", "weekdays": ["0", "1", "2", "3", "4", "5", "6"],
+        "start_time": "23:59", "duration_minutes": "30", "capacity": "3",
+    })
+
+    assert timetable.get(gym_class.id)["name"] == "Test Spin Pro"
+    assert timetable.get(gym_class.id)["capacity"] == 3
+
+
+def test_capacity_changes_seat_the_waitlist_in_order(members, small_class):
+    gym_class, starts_at = small_class
+    for member in members[:5]:
+        book(member.id, gym_class.id, starts_at)
+    assert seats(gym_class.id) == (2, 3)
+
+    resize_sessions(gym_class.id, 4)
+    db.session.commit()
+
+    assert seats(gym_class.id) == (4, 1)
+    statuses = {row.user_id: row.status for row in ClassBooking.query.filter(
+        ClassBooking.user_id.in_([member.id for member in members[:5]]))}
+    assert [statuses[member.id] for member in members[:5]] == ["booked"] * 4 + ["waitlisted"]
+    # The last waitlisted member is still ahead of a new booker
+    assert book(members[5].id, gym_class.id, starts_at)[0] == "waitlisted"
+
+    with pytest.raises(ValueError):
+        resize_sessions(gym_class.id, 3)
+    db.session.rollback()
+    assert seats(gym_class.id) == (4, 2)
@@ -0,0 +1,108 @@
+# Summary: Local Exercise Search Tests
+# Description:
+# Checks the ranked search index on its own (stemming, joined words,
+# typos, prefixes, incremental add/remove) and through the catalog: the
+# /exercises route answers misspelled queries locally and
+# /exercises/suggest serves autocomplete.
+
+# tests/test_search.py
+import pytest
+
+from app import db
+from app.catalog import exercise_catalog
+from app.models import CatalogExercise
+from app.search import SearchIndex, stem
+
+
+EXERCISES = [
+    {"id": "0001", "name": "push-up", "bodyPart": "chest", "target": "pectorals", "equipment": "body weight"},
+    {"id": "0002", "name": "barbell bench press", "bodyPart": "chest", "target": "pectorals", "equipment": "barbell"},
+    {"id": "0003", "name": "barbell curl", "bodyPart": "upper arms", "target": "biceps", "equipment": "barbell"},
+    {"id": "0004", "name": "dumbbell hammer curl", "bodyPart": "upper arms", "target": "biceps", "equipment": "dumbbell"},
+]
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    for entry in EXERCISES:
+        index.add(entry)
+    return index
+
+
+@pytest.fixture
+def catalog(test_client):
+    exercise_catalog.store(EXERCISES)
+    with test_client.session_transaction() as sess:
+        sess["user_id"] = 1
+    yield exercise_catalog
+    with test_client.session_transaction() as sess:
+        sess.clear()
+    CatalogExercise.query.delete()
+    db.session.commit()
+    exercise_catalog.load_from_db()
+
+
+def test_stemming():
+    assert stem("biceps") == "bicep"
+    assert stem("presses") == "press"
+    assert stem("curling") == "curl"
+    assert stem("press") == "press"
+
+
+def test_joined_words_and_plurals(index):
+    assert index.search("pushup")[0] == "0001"
+    assert index.search("push up")[0] == "0001"
+    assert set(index.search("bicep")) == {"0003", "0004"}
+
+
+def test_typos_and_prefixes(index):
+    assert index.search("barbel curl")[0] == "0003"
+    assert index.search("bech press") == ["0002"]
+    assert index.search("dumbbel") == ["0004"]
+    assert set(index.search("cur")) == {"0003", "0004"}
+    assert index.search("zzzz") == []
+
+
+def test_suggest_matches_name_prefixes(index):
+    assert index.suggest("barbell c") == ["0003"]
+    assert index.suggest("barbell b") == ["0002"]
+    assert index.suggest("barb") == ["0003", "0002"]
+    assert index.suggest("") == []
+
+
+def test_incremental_updates(index):
+    index.remove("0003")
+    assert index.search("biceps") == ["0004"]
+    assert "barbell" in index._vocabulary and "barbellcurl" not in index._vocabulary
+
+    index.add(dict(EXERCISES[3], name="dumbbell concentration curl"))
+    assert index.suggest("dumbbell con") == ["0004"]
+    assert index.suggest("dumbbell ham") == []
+
+
+def test_catalog_reindexes_only_changed_entries(catalog, monkeypatch):
+    added = []
+    monkeypatch.setattr(catalog.text_index, "add", lambda entry: added.append(entry["id"]))
+
+    catalog.store([dict(EXERCISES[0], name="wide push-up")])
+
+    assert added == ["0001"]
+
+
+def test_misspelled_search_is_answered_locally(test_client, catalog):
+    response = test_client.get("/exercises?muscle=hamer+curl")
+
+    assert response.status_code == 200
+    assert b"dumbbell hammer curl" in response.data
+
+
+def test_suggest_endpoint(test_client, catalog):
+    response = test_client.get("/exercises/suggest?q=barbell+b")
+
+    assert response.status_code == 200
+    assert [ex["name"] for ex in response.get_json()["suggestions"]] == ["barbell bench press"]
+
+
+def test_suggest_requires_login(test_client):
+    assert test_client.get("/exercises/suggest?q=curl").status_code == 401
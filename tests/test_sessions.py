@@ -0,0 +1,140 @@
+# Summary: Server-Side Session Tests
+# Description:
+# Runs sign-in flows against the memory and database session stores and
+# checks that the cookie carries only an id and version, that the id changes
+# on sign-in, that an admin can revoke a member's sessions instantly (also in
+# other workers' local copies), that a stale local copy is never served, and
+# that expired sessions are dropped.
+
+# tests/test_sessions.py
+import time
+
+import pytest
+
+from app import db
+from app.models import SessionRevocation, User, UserSession
+from app.passwords import password_hasher
+from app.sessions import (
+    DatabaseSessionStore, MemorySessionStore, ServerSideSessionInterface, revoke_user,
+)
+
+
+@pytest.fixture(params=["memory", "database"])
+def store(request, test_client):
+    app = test_client.application
+    store = MemorySessionStore() if request.param == "memory" else DatabaseSessionStore()
+    original = app.session_interface
+    app.session_interface = ServerSideSessionInterface(store)
+    app.extensions["session_store"] = store
+    test_client.delete_cookie("session")
+    yield store
+    app.session_interface = original
+    app.extensions.pop("session_store")
+    test_client.delete_cookie("session")
+
+
+@pytest.fixture
+def member(test_client):
+    user = User(
+        first_name="Session", last_name="Holder", national_id="session-1",
+        email="test@example.com", password_hash=password_hasher.hash("1234"),
+        age=30, gender="Male", subscription="Monthly",
+    )
+    db.session.add(user)
+    db.session.commit()
+    yield user
+
+
+def login(client):
+    return client.post("/login", data={"email": "test@example.com", "password": "1234"})
+
+
+def session_cookie(client):
+    sid, _, version = client.get_cookie("session").value.partition(".")
+    return sid, version
+
+
+def test_cookie_holds_only_a_rotated_id(test_client, store, member):
+    """Sign-in issues a fresh opaque id; the session data stays server-side."""
+    test_client.get("/home")  # flashes "Please log in first." into an anonymous session
+    anonymous_sid, _ = session_cookie(test_client)
+
+    login(test_client)
+    sid, version = session_cookie(test_client)
+
+    assert sid != anonymous_sid
+    assert "." not in version  # not a signed payload
+    assert store.get(sid, version)[0]["user_id"] == member.id
+    assert store.get(anonymous_sid) is None
+    assert test_client.get("/home").status_code == 200
+
+
+def test_revoke_user_ends_live_sessions(test_client, store, member):
+    """Revocation (delete_user / role change) logs the member out at once."""
+    login(test_client)
+    assert test_client.get("/home").status_code == 200
+
+    with test_client.application.test_request_context():
+        revoke_user(member.id)
+
+    response = test_client.get("/home")
+    assert response.status_code == 302
+    assert "/login" in response.headers["Location"]
+    if isinstance(store, DatabaseSessionStore):
+        assert UserSession.query.filter_by(user_id=member.id).count() == 0
+        assert SessionRevocation.query.filter_by(user_id=member.id).count() == 1
+
+
+def test_logout_deletes_server_side_session(test_client, store, member):
+    """Clearing the session removes it from the store and the cookie."""
+    login(test_client)
+    sid, _ = session_cookie(test_client)
+
+    test_client.get("/logout")
+
+    assert store.get(sid) is None
+    assert test_client.get_cookie("session") is None
+
+
+def test_expired_sessions_swept_in_batches():
+    """Expired entries vanish on read and in the periodic sweep."""
+    store = MemorySessionStore(sweep_every=3)
+    past = time.time() - 1
+    store.save("old-1", {"user_id": 1}, 1, past)
+    store.save("old-2", {"user_id": 1}, 1, past)
+    assert len(store) == 2
+
+    store.save("live", {"user_id": 2}, 2, time.time() + 60)
+
+    assert len(store) == 1
+    assert store.get("live")[0] == {"user_id": 2}
+
+
+def test_local_copy_follows_cookie_version(test_client, member):
+    """A worker serves its local copy only while it matches the cookie's version."""
+    worker_a, worker_b = DatabaseSessionStore(), DatabaseSessionStore()
+    expires_at = time.time() + 60
+    worker_a.save("shared", {"user_id": member.id, "n": 1}, member.id, expires_at, "v1")
+    assert worker_b.get("shared", "v1")[0]["n"] == 1
+
+    worker_a.save("shared", {"user_id": member.id, "n": 2}, member.id, expires_at, "v2")
+    assert worker_b.get("shared", "v2")[0]["n"] == 2
+
+    # Cached: a matching version is answered without reading user_sessions
+    UserSession.query.filter_by(sid="shared").delete()
+    db.session.commit()
+    assert worker_b.get("shared", "v2")[0]["n"] == 2
+    assert worker_b.get("shared", "v3") is None
+
+
+def test_revocation_reaches_other_workers(test_client, member):
+    """Revoking in one worker drops the cached session in another after its next poll."""
+    worker_a = DatabaseSessionStore()
+    worker_b = DatabaseSessionStore(revocation_poll=0)
+    worker_a.save("elsewhere", {"user_id": member.id}, member.id, time.time() + 60, "v1")
+    assert worker_b.get("elsewhere", "v1") is not None
+
+    worker_a.revoke_user(member.id)
+
+    assert worker_b.get("elsewhere", "v1") is None
+    assert len(worker_b.local) == 0
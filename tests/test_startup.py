@@ -0,0 +1,56 @@
+# Summary: Startup and Migration Tests
+# Description:
+# Checks that DB_STARTUP_MODE=lazy builds the app without any SQL, that the
+# startup phases are reported, and that `flask db-upgrade` records applied
+# migrations and is a no-op when run again.
+
+# tests/test_startup.py
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from app import create_app, db
+from app.migrations import HEAD, schema_migrations
+
+
+def test_lazy_startup_issues_no_sql(test_client, monkeypatch):
+    """create_app() in lazy mode never touches the database."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    monkeypatch.setenv("DB_STARTUP_MODE", "lazy")
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        app = create_app()
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert statements == []
+    assert app.extensions["schema_pending"] is True
+    assert set(app.extensions["startup"].phases) == {"config", "extensions", "schema", "routes"}
+
+
+def test_db_upgrade_records_versions_once(test_client):
+    """The first upgrade stamps every migration; the second applies nothing."""
+    runner = test_client.application.test_cli_runner()
+
+    first = runner.invoke(args=["db-upgrade", "--retries", "1"])
+    second = runner.invoke(args=["db-upgrade", "--retries", "1"])
+    status = runner.invoke(args=["db-status"])
+
+    assert first.exit_code == 0, first.output
+    assert f"Schema at version {HEAD}" in first.output
+    assert "(0 migration(s) applied)" in second.output
+    assert "up to date" in status.output
+
+    versions = db.session.execute(select(schema_migrations.c.version)).scalars().all()
+    assert versions == list(range(1, HEAD + 1))
+
+
+def test_startup_phases_exported_as_metrics(test_client):
+    """Startup timings are visible on /metrics."""
+    body = test_client.get("/metrics").get_data(as_text=True)
+
+    assert 'app_startup_phase_seconds{phase="total"}' in body
+    assert 'app_startup_phase_seconds{phase="schema"}' in body
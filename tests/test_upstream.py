@@ -0,0 +1,131 @@
+# Summary: ExerciseDB Upstream Protection Tests
+# Description:
+# Checks that concurrent identical lookups share one call, that the circuit
+# breaker opens after repeated failures, probes once when half-open and
+# closes on success, that the token buckets (per process and shared in the
+# database) stop calls beyond the quota, and that a shed lookup is answered
+# from an expired cache entry.
+
+# tests/test_upstream.py
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.cache import MemoryCacheBackend, ResponseCache
+from app.exercise_api import ExerciseAPIClient
+from app.models import UpstreamQuota
+from app.upstream import CircuitBreaker, DatabaseTokenBucket, MemoryTokenBucket, SingleFlight
+
+
+def test_single_flight_shares_one_call():
+    """Eight concurrent callers for one key cause a single call."""
+    flights = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["chest"]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("chest", slow_call)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [["chest"]] * 8
+    assert len(flights) == 0
+
+
+def test_breaker_opens_probes_and_closes():
+    """Closed -> open after the threshold; one half-open probe closes it again."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    breaker.record_failure()
+    time.sleep(0.15)
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_memory_bucket_limits_burst():
+    bucket = MemoryTokenBucket(rate=0.001, burst=3)
+    assert [bucket.acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_database_bucket_is_shared(test_client):
+    """Two buckets on the same row spend one quota."""
+    first = DatabaseTokenBucket(rate=0.001, burst=2, name="test-quota")
+    second = DatabaseTokenBucket(rate=0.001, burst=2, name="test-quota")
+    try:
+        assert first.acquire()
+        assert second.acquire()
+        assert not first.acquire()
+    finally:
+        UpstreamQuota.query.filter_by(name="test-quota").delete()
+        db.session.commit()
+
+
+def test_open_circuit_serves_expired_cache(test_client):
+    """A shed lookup falls back to the expired cached answer without calling out."""
+    api = ExerciseAPIClient()
+    api.base_url = "http://127.0.0.1:9"  # nothing listens here
+    api.breaker.trip()
+
+    cache = ResponseCache(backend=MemoryCacheBackend(), ttl=60)
+    cache.backend.set("/exercises/bodyPart/chest", [{"id": "0001"}], 0, 0)
+
+    result = cache.get_or_fetch("/exercises/bodyPart/chest", lambda: api.fetch("/exercises/bodyPart/chest"))
+
+    assert result == [{"id": "0001"}]
+    assert cache.stats["fallbacks"] == 1
+
+
+@pytest.mark.parametrize("status", [500, 503])
+def test_failures_open_the_client_breaker(test_client, monkeypatch, status):
+    """Repeated upstream errors trip the breaker; later calls are not made."""
+    api = ExerciseAPIClient()
+    api.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    calls = []
+
+    class Response:
+        status_code = status
+        headers = {}
+
+    def fake_get(path, **kwargs):
+        calls.append(path)
+        return Response()
+
+    monkeypatch.setattr(api, "get", fake_get)
+    for _ in range(4):
+        assert api.fetch("/exercises/name/chest") is None
+
+    assert len(calls) == 2
+    assert api.breaker.state == CircuitBreaker.OPEN